@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Lookups by name in TAG_Compound, with its name index and linearly.
+
+The linear lookups go through the tags comparing names, as TAG_Compound
+did before it had an index. Times are the best of REPEAT runs.
+
+Usage: python benchmarks/nbt_compound_index.py
+
+"""
+
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbt.nbt as nbt
+from synthetic import chunk_datas
+
+
+REPEAT = 5
+
+# Looked up in every chunk, the last one is missing
+CHUNK_KEYS = ["DataVersion", "sections", "structures", "xPos", "zPos",
+              "entities", "Status", "block_entities", "yPos", "Missing"]
+
+
+def best(function):
+    times = []
+    for i in range(REPEAT):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def linear_find(compound, name):
+    for tag in compound.tags:
+        if tag.name == name:
+            return tag
+    return None
+
+
+def linear_set(compound, name, value):
+    value.name = name
+    for i, tag in enumerate(compound.tags):
+        if tag.name == name:
+            compound.tags[i] = value
+            return
+    compound.tags.append(value)
+
+
+def report(title, indexed, linear):
+    print("{0:<36} {1:8.2f} ms {2:8.2f} ms  ({3:.2f})".format(
+          title, 1000 * indexed, 1000 * linear, indexed / linear))
+
+
+def main():
+    datas = chunk_datas(300)
+    chunks = [nbt.NBTFile(data=d) for d in datas]
+
+    def indexed_probes():
+        for chunk in chunks:
+            for k in CHUNK_KEYS:
+                if k in chunk:
+                    chunk[k]
+
+    def linear_probes():
+        for chunk in chunks:
+            for k in CHUNK_KEYS:
+                linear_find(chunk, k)
+
+    print("{0:<36} {1:>11} {2:>11}".format("", "index", "linear"))
+    report("10 probes per parsed chunk", best(indexed_probes), best(linear_probes))
+
+    for n in (16, 64, 1024):
+        compound = nbt.TAG_Compound()
+        for i in range(n):
+            compound.tags.append(nbt.TAG_Int(i, "key{0}".format(i)))
+        keys = ["key{0}".format(i) for i in range(0, n, max(1, n // 16))] + ["missing"]
+
+        def indexed_lookups():
+            for i in range(100):
+                for k in keys:
+                    if k in compound:
+                        compound[k]
+
+        def linear_lookups():
+            for i in range(100):
+                for k in keys:
+                    linear_find(compound, k)
+
+        report("{0} lookups, {1}-tag compound".format(100 * len(keys), n),
+               best(indexed_lookups), best(linear_lookups))
+
+    def indexed_set():
+        compound = nbt.TAG_Compound()
+        for i in range(1000):
+            compound["k{0}".format(i % 500)] = nbt.TAG_Int(i)
+
+    def linear_set_all():
+        compound = nbt.TAG_Compound()
+        for i in range(1000):
+            linear_set(compound, "k{0}".format(i % 500), nbt.TAG_Int(i))
+
+    report("1000 __setitem__, 500 replacing", best(indexed_set), best(linear_set_all))
+
+    def parse():
+        for d in datas:
+            nbt.NBTFile(data=d)
+
+    print("parse {0} chunks: {1:.1f} ms".format(len(datas), 1000 * best(parse)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Reading chunks with NBTFile, decode() and iterparse().
+
+Times, in microseconds per chunk and median of REPEAT runs, parsing the
+same data with NBTFile(data=...), decode(), decode(types=True) and
+consuming the events of iterparse(). The chunks are synthetic, shaped
+like the formats of Minecraft 1.12, 1.16 and 1.18.
+
+Usage: python benchmarks/nbt_decode.py
+
+"""
+
+import os
+import random
+import sys
+from statistics import median
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbt.nbt as nbt
+from synthetic import chunk_datas
+
+
+REPEAT = 9
+CHUNKS = 100
+
+rnd = random.Random(0)
+
+
+def _add(compound, tag, name):
+    tag.name = name
+    compound.tags.append(tag)
+    return tag
+
+
+def _array(tag_class, number, bits):
+    tag = tag_class()
+    tag.value = [rnd.getrandbits(bits) for i in range(number)]
+    return tag
+
+
+def _byte_array(number):
+    tag = nbt.TAG_Byte_Array()
+    tag.value = bytearray(rnd.getrandbits(8) for i in range(number))
+    return tag
+
+
+def _entity():
+    entity = nbt.TAG_Compound()
+    _add(entity, nbt.TAG_String("minecraft:zombie"), "id")
+    for name in ("Pos", "Motion"):
+        values = _add(entity, nbt.TAG_List(nbt.TAG_Double), name)
+        values.tags.extend(nbt.TAG_Double(rnd.random()) for i in range(3))
+    rotation = _add(entity, nbt.TAG_List(nbt.TAG_Float), "Rotation")
+    rotation.tags.extend([nbt.TAG_Float(1.0), nbt.TAG_Float(2.0)])
+    for name in ("Health", "Air", "Fire"):
+        _add(entity, nbt.TAG_Short(20), name)
+    _add(entity, nbt.TAG_Byte(1), "OnGround")
+    _add(entity, nbt.TAG_Long(rnd.getrandbits(60)), "UUIDMost")
+    _add(entity, nbt.TAG_Long(rnd.getrandbits(60)), "UUIDLeast")
+    return entity
+
+
+def _level(data_version):
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    _add(chunk, nbt.TAG_Int(data_version), "DataVersion")
+    level = _add(chunk, nbt.TAG_Compound(), "Level")
+    _add(level, nbt.TAG_Int(3), "xPos")
+    _add(level, nbt.TAG_Int(4), "zPos")
+    _add(level, nbt.TAG_Long(1234), "LastUpdate")
+    return chunk, level
+
+
+def chunk_1_12():
+    chunk, level = _level(1343)
+    _add(level, _byte_array(256), "Biomes")
+    _add(level, _array(nbt.TAG_Int_Array, 256, 16), "HeightMap")
+    sections = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Sections")
+    for y in range(8):
+        section = nbt.TAG_Compound()
+        _add(section, nbt.TAG_Byte(y), "Y")
+        _add(section, _byte_array(4096), "Blocks")
+        for name in ("Data", "BlockLight", "SkyLight"):
+            _add(section, _byte_array(2048), name)
+        sections.tags.append(section)
+    entities = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Entities")
+    entities.tags.extend(_entity() for i in range(10))
+    _add(level, nbt.TAG_List(nbt.TAG_Compound), "TileEntities")
+    return bytes(chunk.render_data())
+
+
+def chunk_1_16():
+    chunk, level = _level(2586)
+    _add(level, nbt.TAG_String("full"), "Status")
+    _add(level, _array(nbt.TAG_Int_Array, 1024, 16), "Biomes")
+    heightmaps = _add(level, nbt.TAG_Compound(), "Heightmaps")
+    for name in ("MOTION_BLOCKING", "OCEAN_FLOOR", "WORLD_SURFACE"):
+        _add(heightmaps, _array(nbt.TAG_Long_Array, 37, 62), name)
+    sections = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Sections")
+    for y in range(10):
+        section = nbt.TAG_Compound()
+        _add(section, nbt.TAG_Byte(y), "Y")
+        palette = _add(section, nbt.TAG_List(nbt.TAG_Compound), "Palette")
+        for b in range(12):
+            block = nbt.TAG_Compound()
+            _add(block, nbt.TAG_String("minecraft:block_{0}".format(b)), "Name")
+            if b % 3 == 0:
+                properties = _add(block, nbt.TAG_Compound(), "Properties")
+                _add(properties, nbt.TAG_String("north"), "facing")
+            palette.tags.append(block)
+        _add(section, _array(nbt.TAG_Long_Array, 256, 62), "BlockStates")
+        _add(section, _byte_array(2048), "BlockLight")
+        _add(section, _byte_array(2048), "SkyLight")
+        sections.tags.append(section)
+    entities = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Entities")
+    entities.tags.extend(_entity() for i in range(10))
+    return bytes(chunk.render_data())
+
+
+def consume_events(data):
+    for event in nbt.iterparse(data):
+        pass
+
+
+READERS = [("NBTFile", lambda d: nbt.NBTFile(data=d)),
+           ("decode", nbt.decode),
+           ("types=True", lambda d: nbt.decode(d, True)),
+           ("iterparse", consume_events)]
+
+
+def main():
+    formats = [("1.12", [chunk_1_12() for i in range(CHUNKS)]),
+               ("1.16", [chunk_1_16() for i in range(CHUNKS)]),
+               ("1.18", chunk_datas(10 * CHUNKS))]
+    print("{0:<18}".format("us per chunk") + "".join("{0:>12}".format(name) for name, f in READERS))
+    for title, datas in formats:
+        times = dict((name, []) for name, f in READERS)
+        for i in range(REPEAT):
+            for name, read in READERS:
+                start = perf_counter()
+                for d in datas:
+                    read(d)
+                times[name].append((perf_counter() - start) / len(datas) * 1e6)
+        size = sum(len(d) for d in datas) / len(datas) / 1024
+        print("{0:<18}".format("{0} ({1:.0f} KiB)".format(title, size)) +
+              "".join("{0:12.0f}".format(median(times[name])) for name, f in READERS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Memory retained by parsed NBT trees.
+
+Parses synthetic data with NBTFile(data=...) and reports the memory it
+retains, measured with tracemalloc, and the bytes per tag:
+ - a compound with ENTITIES entities, like a chunk with too many of them;
+ - CHUNKS synthetic chunks.
+
+Usage: python benchmarks/nbt_memory.py
+
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbt.nbt as nbt
+from synthetic import chunk_datas
+
+
+ENTITIES = 20000
+CHUNKS = 1000
+
+
+def entities_data(number):
+    root = nbt.NBTFile()
+    root.name = ""
+    entities = nbt.TAG_List(nbt.TAG_Compound, name="Entities")
+    for i in range(number):
+        entity = nbt.TAG_Compound()
+        pos = nbt.TAG_List(nbt.TAG_Double, name="Pos")
+        pos.tags.extend([nbt.TAG_Double(i), nbt.TAG_Double(64.0), nbt.TAG_Double(-i)])
+        entity.tags.extend([nbt.TAG_String("minecraft:item", "id"), pos,
+                            nbt.TAG_Short(20, "Health"), nbt.TAG_Int(i, "Age")])
+        entities.tags.append(entity)
+    root.tags.append(entities)
+    return bytes(root.render_data())
+
+
+def count_tags(tag):
+    count = 0
+    stack = [tag]
+    while stack:
+        tag = stack.pop()
+        count += 1
+        if isinstance(tag, (nbt.TAG_Compound, nbt.TAG_List)):
+            stack.extend(tag.tags)
+    return count
+
+
+def retained(datas):
+    """ Returns the memory retained by the trees of datas and their tags. """
+
+    gc.collect()
+    tracemalloc.start()
+    trees = [nbt.NBTFile(data=d) for d in datas]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, sum(count_tags(t) for t in trees)
+
+
+def main():
+    for title, datas in (("{0} entities".format(ENTITIES), [entities_data(ENTITIES)]),
+                         ("{0} chunks".format(CHUNKS), chunk_datas(CHUNKS))):
+        memory, tags = retained(datas)
+        print("{0:<16} {1:7d} tags  {2:6.1f} MiB  {3:4.0f} B/tag".format(
+              title, tags, memory / 2 ** 20, memory / tags))
+
+    times = []
+    for i in range(5):
+        start = perf_counter()
+        for d in datas:
+            nbt.NBTFile(data=d)
+        times.append(perf_counter() - start)
+    print("parse {0} chunks: {1:.3f}s (median of 5)".format(len(datas), sorted(times)[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Wall time of scans with the processes and the threads backends.
+
+Writes two synthetic region sets, a tiny one and a bigger one, and times
+regionfixer.py scanning them with --backend processes and threads and
+1, 2 and 4 workers. Runs are interleaved and the median is reported.
+
+Usage: python benchmarks/scan_backends.py [runs]
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter
+
+from synthetic import write_region
+
+
+RUNS = 5
+
+REGIONFIXER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "regionfixer.py")
+
+# Title, number of region files and fraction of chunks created
+SETS = [("tiny", 4, 0.02),
+        ("region set", 16, 0.4)]
+
+
+def scan_time(paths, processes, backend):
+    start = perf_counter()
+    subprocess.run([sys.executable, REGIONFIXER, "-p", str(processes),
+                    "--backend", backend] + paths,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return perf_counter() - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+
+    directory = tempfile.mkdtemp()
+    try:
+        print("median of {0} runs, processes / threads".format(runs))
+        for title, number, fill in SETS:
+            paths = []
+            for i in range(number):
+                path = os.path.join(directory, "r.{0}.{1}.mca".format(i, len(title)))
+                write_region(path, fill, seed=i)
+                paths.append(path)
+            size = sum(os.path.getsize(p) for p in paths) / 1e6
+            line = "{0}, {1} files, {2:.0f} MB:".format(title, number, size)
+            for processes in (1, 2, 4):
+                times = {"processes": [], "threads": []}
+                for i in range(runs):
+                    for backend in times:
+                        times[backend].append(scan_time(paths, processes, backend))
+                line += "  -p {0} {1:.2f} / {2:.2f}".format(processes, median(times["processes"]),
+                                                           median(times["threads"]))
+            print(line)
+            for path in paths:
+                os.remove(path)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Parent process CPU while the workers of a scan are busy.
+
+Scans JOBS fake data files with one worker, every job just sleeps for
+JOB_TIME seconds, and reports the CPU time and the voluntary context
+switches (wakeups) of the parent process while it waits for the results.
+An idle parent should cost almost nothing however long the jobs take.
+
+Usage: python benchmarks/scan_idle.py [jobs] [job time]
+
+Only runs on Unix (resource module).
+
+"""
+
+import os
+import resource
+import sys
+from time import sleep, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import regionfixer_core.constants as c
+from regionfixer_core import scan, world
+
+
+JOBS = 10
+JOB_TIME = 1.0
+
+
+def sleeping_job(data_file):
+    sleep(sleeping_job.job_time)
+    data_file.status = c.DATAFILE_OK
+    return data_file
+
+
+def init_job(d):
+    sleeping_job.job_time = d['job_time']
+
+
+class IdleScanner(scan.AsyncScanner):
+    def update_str_last_scanned(self, d):
+        pass
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else JOBS
+    job_time = float(sys.argv[2]) if len(sys.argv) > 2 else JOB_TIME
+
+    dataset = world.DataFileSet(os.devnull, "fake data files")
+    for i in range(jobs):
+        d = world.ScannedDataFile("fake{0}.dat".format(i))
+        dataset._set[d.path] = d
+    scanner = IdleScanner(dataset, 1, sleeping_job, {'job_time': job_time}, init_job)
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time()
+    scanner.scan()
+    results = sum(1 for r in scanner.results)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    print("{0} results in {1:.1f}s, parent CPU {2:.3f}s, {3} wakeups".format(
+          results, time() - start, cpu, after.ru_nvcsw - before.ru_nvcsw))
+
+
+if __name__ == '__main__':
+    main()
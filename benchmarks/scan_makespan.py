@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Makespan of a region set scan with and without ordering the jobs.
+
+Writes a skewed region set, SMALL region files with a few chunks and BIG
+dense ones, whose names put the big files last. The time of every job is
+measured scanning it in this process, and the makespan on P workers is
+simulated with greedy dispatch (a free worker takes the next task, as the
+pool does) and OVERHEAD seconds per task:
+ - FIFO: one task per file, in the order of the region set.
+ - LJF+batches: the tasks made by AsyncScanner.scan(), the most expensive
+   files first and the cheap ones grouped in batches (see _make_batches()).
+
+The simulation makes the comparison possible on a machine with a single
+CPU, where the real wall time of both is the same.
+
+Usage: python benchmarks/scan_makespan.py [small files] [big files]
+
+"""
+
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regionfixer_core import scan, world
+from synthetic import write_region
+
+
+SMALL = 60
+BIG = 6
+
+# Round trip of a task through the pool, in seconds
+OVERHEAD = 0.0005
+
+
+def makespan(tasks, processes):
+    workers = [0.0] * processes
+    for t in tasks:
+        heapq.heapreplace(workers, workers[0] + t + OVERHEAD)
+    return max(workers)
+
+
+def main():
+    small = int(sys.argv[1]) if len(sys.argv) > 1 else SMALL
+    big = int(sys.argv[2]) if len(sys.argv) > 2 else BIG
+
+    directory = tempfile.mkdtemp()
+    try:
+        files = []
+        for i in range(small + big):
+            path = os.path.join(directory, "r.{0}.0.mca".format(i))
+            write_region(path, 0.45 if i >= small else 0.02, seed=i)
+            files.append(path)
+
+        job_time = {}
+        for path in files:
+            start = perf_counter()
+            scan.scan_region_file(world.ScannedRegionFile(path), 300, False)
+            job_time[path] = perf_counter() - start
+        total = sum(job_time.values())
+        print("{0} small and {1} big region files, {2:.1f} MB, scan {3:.2f}s".format(
+              small, big, sum(os.path.getsize(f) for f in files) / 1e6, total))
+
+        costs = dict((path, scan._region_file_cost(path)) for path in files)
+        jobs = sorted(files, key=costs.__getitem__, reverse=True)
+        for processes in (2, 4, 8, 16):
+            batches = scan._make_batches(jobs, [costs[j] for j in jobs], processes)
+            fifo = makespan([job_time[f] for f in files], processes)
+            ljf = makespan([sum(job_time[f] for f in b) for b in batches], processes)
+            bound = max(total / processes, max(job_time.values()))
+            print("P={0:<2}  FIFO {1:.2f}s  LJF+batches {2:.2f}s  (lower bound {3:.2f}s)".format(
+                  processes, fifo, ljf, bound))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Synthetic chunks and region files for the benchmarks.
+
+The chunks look like the ones of Minecraft 1.18: block states with random
+data, so they don't compress much, and a few entities.
+
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbt.nbt as nbt
+import nbt.region as region
+
+
+def level_chunk(x, z, entities=3, sections=4, rnd=random):
+    """ Returns a NBTFile with a level chunk of global coords x, z. """
+
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    chunk.tags.extend([nbt.TAG_Int(2975, "DataVersion"), nbt.TAG_Int(x, "xPos"),
+                       nbt.TAG_Int(-4, "yPos"), nbt.TAG_Int(z, "zPos"),
+                       nbt.TAG_String("full", "Status")])
+    section_list = nbt.TAG_List(nbt.TAG_Compound, name="sections")
+    for y in range(sections):
+        section = nbt.TAG_Compound()
+        section.tags.append(nbt.TAG_Byte(y, "Y"))
+        block_states = nbt.TAG_Compound(name="block_states")
+        palette = nbt.TAG_List(nbt.TAG_Compound, name="palette")
+        for name in ("minecraft:stone", "minecraft:dirt", "minecraft:air"):
+            block = nbt.TAG_Compound()
+            block.tags.append(nbt.TAG_String(name, "Name"))
+            palette.tags.append(block)
+        data = nbt.TAG_Long_Array(name="data")
+        data.value = [rnd.getrandbits(62) for i in range(256)]
+        block_states.tags.extend([palette, data])
+        section.tags.append(block_states)
+        section_list.tags.append(section)
+    chunk.tags.append(section_list)
+    entity_list = nbt.TAG_List(nbt.TAG_Compound, name="entities")
+    for i in range(entities):
+        entity = nbt.TAG_Compound()
+        entity.tags.append(nbt.TAG_String("minecraft:zombie", "id"))
+        pos = nbt.TAG_List(nbt.TAG_Double, name="Pos")
+        pos.tags.extend([nbt.TAG_Double(16.0 * x), nbt.TAG_Double(64.0),
+                         nbt.TAG_Double(16.0 * z)])
+        entity.tags.extend([pos, nbt.TAG_Short(20, "Health")])
+        entity_list.tags.append(entity)
+    chunk.tags.extend([entity_list, nbt.TAG_List(nbt.TAG_Compound, name="block_entities"),
+                       nbt.TAG_Compound(name="structures")])
+    return chunk
+
+
+def write_region(path, fill=0.5, sections=4, seed=0):
+    """ Writes a region file with a fraction fill of the chunks created.
+
+    The region coordinates are taken from the name of the file. With the
+    default 4 sections every chunk takes about 8KiB.
+
+    """
+
+    rnd = random.Random(seed)
+    rx, rz = [int(n) for n in os.path.basename(path).split(".")[1:3]]
+    open(path, "wb").close()
+    region_file = region.RegionFile(path)
+    for x in range(32):
+        for z in range(32):
+            if rnd.random() < fill:
+                region_file.write_chunk(x, z, level_chunk(32 * rx + x, 32 * rz + z,
+                                                          rnd.randint(0, 5), sections, rnd))
+    region_file.close()
+
+
+def chunk_datas(number, seed=0):
+    """ Returns a list with the uncompressed data of number chunks. """
+
+    rnd = random.Random(seed)
+    return [bytes(level_chunk(i, 0, rnd.randint(0, 5), rnd.randint(1, 8), rnd).render_data())
+            for i in range(number)]
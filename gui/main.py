@@ -2,13 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import wx
-from time import sleep
 from os.path import split, abspath
 from os import name as os_name
 
 from .backups import BackupsWindow
 from regionfixer_core.scan import AsyncWorldRegionScanner, AsyncDataScanner,\
-    ChildProcessException
+    ChildProcessException, create_pool
 from regionfixer_core import world
 from regionfixer_core.world import World
 
@@ -195,17 +194,21 @@ class MainWindow(wx.Frame):
         entity_limit = int(self.el_text.GetValue())
         delete_entities = False
 
-        ps = AsyncDataScanner(self.world.players, processes)
-        ops = AsyncDataScanner(self.world.old_players, processes)
-        ds = AsyncDataScanner(self.world.data_files, processes)
+        # All the scanners share the pool and are started at once
+        pool = create_pool(processes, entity_limit, delete_entities)
+        ps = AsyncDataScanner(self.world.players, processes, pool)
+        ops = AsyncDataScanner(self.world.old_players, processes, pool)
+        ds = AsyncDataScanner(self.world.data_files, processes, pool)
         ws = AsyncWorldRegionScanner(self.world, processes, entity_limit,
-                       delete_entities)
+                       delete_entities, pool=pool)
 
         things_to_scan = [ws, ops, ps, ds]
         dialog_texts = ["Scanning region files",
                         "Scanning old format player files",
                         "Scanning players",
                         "Scanning data files"]
+        for scanner in things_to_scan:
+            scanner.scan()
         try:
             for scanner, dialog_title in zip(things_to_scan, dialog_texts):
                 progressdlg = wx.ProgressDialog(
@@ -215,14 +218,14 @@ class MainWindow(wx.Frame):
                             style=wx.PD_ELAPSED_TIME | wx.PD_ESTIMATED_TIME |
                                   wx.PD_REMAINING_TIME | wx.PD_CAN_ABORT |
                                   wx.PD_AUTO_HIDE | wx.PD_SMOOTH)
-                scanner.scan()
                 counter = 0
                 # NOTE TO SELF: ShowModal behaves different in windows and Linux!
                 # Use it with care.
                 progressdlg.Show()
                 while not scanner.finished:
-                    sleep(0.001)
-                    result = scanner.get_last_result()
+                    # Wait for the next result, but not so long that the
+                    # dialog stops responding
+                    result = scanner.get_last_result(timeout=0.1)
 
                     if result:
                         counter += 1
@@ -237,6 +240,7 @@ class MainWindow(wx.Frame):
                     break
             else:
                 # The scan finished successfully
+                pool.terminate()
                 self.world.scanned = True
                 self.results_text.SetValue(self.world.generate_report(True))
                 self.update_delete_buttons_status(True)
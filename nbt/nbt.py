@@ -6,7 +6,11 @@ https://minecraft.gamepedia.com/NBT_format
 """
 
 from struct import Struct, error as StructError
+from array import array
 from gzip import GzipFile
+from io import BytesIO
+import json
+import re
 try:
     from collections.abc import MutableMapping, MutableSequence, Sequence
 except ImportError:  # for Python 2.7
@@ -20,6 +24,9 @@ if _PY3:
 else:
     range = xrange
 
+# NBT is big endian, array.array uses the byte order of the machine
+_SWAP_ARRAYS = sys.byteorder == "little"
+
 TAG_END = 0
 TAG_BYTE = 1
 TAG_SHORT = 2
@@ -40,19 +47,81 @@ class MalformedFileError(Exception):
     pass
 
 
+# Used to parse the lengths and types in the data, see _parse_data()
+_BYTE = Struct(">b")
+_SHORT = Struct(">h")
+_INT = Struct(">i")
+# Headers written by _render_data(): type and name length of a named tag,
+# type and length of the items of a list
+_TAG_HEADER = Struct(">bh")
+_LIST_HEADER = Struct(">bi")
+
+
+def _truncated():
+    return MalformedFileError("Partial File Parse: file possibly truncated.")
+
+
+def _as_bytes(data):
+    # Slices of bytes are the fastest to decode, other bytes-like objects
+    # (bytearray, memoryview, mmap...) are copied once
+    return data if isinstance(data, bytes) else bytes(data)
+
+
+# Number of times a tag in the name index of a TAG_Compound has been renamed.
+# Any change invalidates all the name indexes, see _TagList.
+_renames = 0
+
+
 class TAG(object):
-    """TAG, a variable with an intrinsic name."""
+    """TAG, a variable with an intrinsic name.
+
+    There are thousands of tags in a chunk, so the tag classes use
+    __slots__ and have no __dict__, except NBTFile. Subclasses must define
+    __slots__ too, with the attributes they add.
+    """
+    __slots__ = ("_name", "_indexed")
     id = None
 
     def __init__(self, value=None, name=None):
-        self.name = name
+        self._name = name
+        self._indexed = False
         self.value = value
 
+    @property
+    def name(self):
+        """Name of the tag."""
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if self._indexed:
+            # The name index of the TAG_Compound holding this tag is stale
+            global _renames
+            _renames += 1
+            self._indexed = False
+        self._name = name
+
     # Parsers and Generators
     def _parse_buffer(self, buffer):
         raise NotImplementedError(self.__class__.__name__)
 
+    def _parse_data(self, data, pos):
+        """Parse the payload of the tag starting at position pos of data, a
+        bytes-like object, and return the position after it."""
+        raise NotImplementedError(self.__class__.__name__)
+
+    def _parse_lazy(self, data, pos):
+        """Like _parse_data(), but tags with children don't parse them until
+        they are used, see _LazyTags."""
+        return self._parse_data(data, pos)
+
     def _render_buffer(self, buffer):
+        out = bytearray()
+        self._render_data(out)
+        buffer.write(out)
+
+    def _render_data(self, out):
+        """Append the payload of the tag to out, a bytearray."""
         raise NotImplementedError(self.__class__.__name__)
 
     # Printing and Formatting of tree
@@ -102,6 +171,7 @@ class TAG(object):
 
 class _TAG_Numeric(TAG):
     """_TAG_Numeric, comparable to int with an intrinsic name"""
+    __slots__ = ("value",)
 
     def __init__(self, value=None, name=None, buffer=None):
         super(_TAG_Numeric, self).__init__(value, name)
@@ -114,11 +184,16 @@ class _TAG_Numeric(TAG):
         # corrupt gzip.GzipFile
         self.value = self.fmt.unpack(buffer.read(self.fmt.size))[0]
 
-    def _render_buffer(self, buffer):
-        buffer.write(self.fmt.pack(self.value))
+    def _parse_data(self, data, pos):
+        self.value = self.fmt.unpack_from(data, pos)[0]
+        return pos + self.fmt.size
+
+    def _render_data(self, out):
+        out += self.fmt.pack(self.value)
 
 
 class _TAG_End(TAG):
+    __slots__ = ("value",)
     id = TAG_END
     fmt = Struct(">b")
 
@@ -130,25 +205,28 @@ class _TAG_End(TAG):
             raise ValueError(
                 "A Tag End must be rendered as '0', not as '%d'." % value)
 
-    def _render_buffer(self, buffer):
-        buffer.write(b'\x00')
+    def _render_data(self, out):
+        out.append(0)
 
 
 # == Value Tags ==#
 class TAG_Byte(_TAG_Numeric):
     """Represent a single tag storing 1 byte."""
+    __slots__ = ()
     id = TAG_BYTE
     fmt = Struct(">b")
 
 
 class TAG_Short(_TAG_Numeric):
     """Represent a single tag storing 1 short."""
+    __slots__ = ()
     id = TAG_SHORT
     fmt = Struct(">h")
 
 
 class TAG_Int(_TAG_Numeric):
     """Represent a single tag storing 1 int."""
+    __slots__ = ()
     id = TAG_INT
     fmt = Struct(">i")
     """Struct(">i"), 32-bits integer, big-endian"""
@@ -156,12 +234,14 @@ class TAG_Int(_TAG_Numeric):
 
 class TAG_Long(_TAG_Numeric):
     """Represent a single tag storing 1 long."""
+    __slots__ = ()
     id = TAG_LONG
     fmt = Struct(">q")
 
 
 class TAG_Float(_TAG_Numeric):
     """Represent a single tag storing 1 IEEE-754 floating point number."""
+    __slots__ = ()
     id = TAG_FLOAT
     fmt = Struct(">f")
 
@@ -169,6 +249,7 @@ class TAG_Float(_TAG_Numeric):
 class TAG_Double(_TAG_Numeric):
     """Represent a single tag storing 1 IEEE-754 double precision floating
     point number."""
+    __slots__ = ()
     id = TAG_DOUBLE
     fmt = Struct(">d")
 
@@ -178,6 +259,7 @@ class TAG_Byte_Array(TAG, MutableSequence):
     TAG_Byte_Array, comparable to a collections.UserList with
     an intrinsic name whose values must be bytes
     """
+    __slots__ = ("value",)
     id = TAG_BYTE_ARRAY
 
     def __init__(self, name=None, buffer=None):
@@ -191,10 +273,20 @@ class TAG_Byte_Array(TAG, MutableSequence):
         length = TAG_Int(buffer=buffer)
         self.value = bytearray(buffer.read(length.value))
 
-    def _render_buffer(self, buffer):
-        length = TAG_Int(len(self.value))
-        length._render_buffer(buffer)
-        buffer.write(bytes(self.value))
+    def _parse_data(self, data, pos):
+        length = _INT.unpack_from(data, pos)[0]
+        end = pos + 4 + length
+        if length < 0 or end > len(data):
+            raise _truncated()
+        self.value = bytearray(data[pos + 4:end])
+        return end
+
+    def _render_data(self, out):
+        value = self.value
+        if not isinstance(value, (bytes, bytearray)):
+            value = bytes(value)
+        out += _INT.pack(len(value))
+        out += value
 
     # Mixin methods
     def __len__(self):
@@ -231,38 +323,89 @@ class TAG_Byte_Array(TAG, MutableSequence):
         return '[' + ",".join([str(x) for x in self.value]) + ']'
 
 
-class TAG_Int_Array(TAG, MutableSequence):
+class _TAG_Array(TAG, MutableSequence):
     """
-    TAG_Int_Array, comparable to a collections.UserList with
-    an intrinsic name whose values must be integers
+    _TAG_Array, comparable to a collections.UserList with an intrinsic name
+    whose values must be integers. Base class of TAG_Int_Array and
+    TAG_Long_Array.
+
+    The value is an array.array, which takes itemsize bytes per item instead
+    of a Python int per item. The parsed data is kept as it is, big endian,
+    and it's converted to an array the first time the value is used. An
+    array whose value is never used is written back copying the data.
     """
-    id = TAG_INT_ARRAY
+    # _raw is the big endian data of the array while the value hasn't been
+    # used, None after that
+    __slots__ = ("_value", "_raw")
+    typecode = None
+    """Type code of the array.array, the same as in the struct format."""
+    itemsize = None
+    fmt = None
+    """Struct of a single item, as in the numeric tags."""
 
     def __init__(self, name=None, buffer=None):
-        # TODO: add a value parameter as well
-        super(TAG_Int_Array, self).__init__(name=name)
+        super(_TAG_Array, self).__init__(name=name)
         if buffer:
             self._parse_buffer(buffer)
 
+    @property
+    def value(self):
+        """array.array with the items. Assigning any other iterable converts
+        it to an array.array."""
+        if self._raw is not None:
+            value = array(self.typecode)
+            value.frombytes(self._raw)
+            if _SWAP_ARRAYS:
+                value.byteswap()
+            self._value = value
+            self._raw = None
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        if value is None:
+            value = array(self.typecode)
+        elif not isinstance(value, array) or value.typecode != self.typecode:
+            value = array(self.typecode, value)
+        self._value = value
+        self._raw = None
+
     def update_fmt(self, length):
-        """ Adjust struct format description to length given """
-        self.fmt = Struct(">" + str(length) + "i")
+        """ Return the struct format description of length items """
+        return Struct(">" + str(length) + self.typecode)
 
     # Parsers and Generators
     def _parse_buffer(self, buffer):
         length = TAG_Int(buffer=buffer).value
-        self.update_fmt(length)
-        self.value = list(self.fmt.unpack(buffer.read(self.fmt.size)))
+        raw = buffer.read(length * self.itemsize) if length > 0 else b''
+        if length < 0 or len(raw) != length * self.itemsize:
+            raise StructError()
+        self._raw = raw
 
-    def _render_buffer(self, buffer):
-        length = len(self.value)
-        self.update_fmt(length)
-        TAG_Int(length)._render_buffer(buffer)
-        buffer.write(self.fmt.pack(*self.value))
+    def _parse_data(self, data, pos):
+        length = _INT.unpack_from(data, pos)[0]
+        end = pos + 4 + length * self.itemsize
+        if length < 0 or end > len(data):
+            raise StructError()
+        self._raw = bytes(data[pos + 4:end])
+        return end
+
+    def _render_data(self, out):
+        out += _INT.pack(len(self))
+        if self._raw is not None:
+            out += self._raw
+        elif _SWAP_ARRAYS:
+            value = self._value[:]
+            value.byteswap()
+            out += value
+        else:
+            out += self._value
 
     # Mixin methods
     def __len__(self):
-        return len(self.value)
+        if self._raw is not None:
+            return len(self._raw) // self.itemsize
+        return len(self._value)
 
     def __iter__(self):
         return iter(self.value)
@@ -283,63 +426,43 @@ class TAG_Int_Array(TAG, MutableSequence):
         self.value.insert(key, value)
 
     # Printing and Formatting of tree
-    def valuestr(self):
-        return "[%i int(s)]" % len(self.value)
+    def __unicode__(self):
+        return unicode(self.value.tolist())
+
+    def __str__(self):
+        return str(self.value.tolist())
 
 
-class TAG_Long_Array(TAG, MutableSequence):
+class TAG_Int_Array(_TAG_Array):
     """
-    TAG_Long_Array, comparable to a collections.UserList with
+    TAG_Int_Array, comparable to a collections.UserList with
     an intrinsic name whose values must be integers
     """
-    id = TAG_LONG_ARRAY
-
-    def __init__(self, name=None, buffer=None):
-        super(TAG_Long_Array, self).__init__(name=name)
-        if buffer:
-            self._parse_buffer(buffer)
-
-    def update_fmt(self, length):
-        """ Adjust struct format description to length given """
-        self.fmt = Struct(">" + str(length) + "q")
-
-    # Parsers and Generators
-    def _parse_buffer(self, buffer):
-        length = TAG_Int(buffer=buffer).value
-        self.update_fmt(length)
-        self.value = list(self.fmt.unpack(buffer.read(self.fmt.size)))
-
-    def _render_buffer(self, buffer):
-        length = len(self.value)
-        self.update_fmt(length)
-        TAG_Int(length)._render_buffer(buffer)
-        buffer.write(self.fmt.pack(*self.value))
-
-    # Mixin methods
-    def __len__(self):
-        return len(self.value)
-
-    def __iter__(self):
-        return iter(self.value)
-
-    def __contains__(self, item):
-        return item in self.value
-
-    def __getitem__(self, key):
-        return self.value[key]
+    __slots__ = ()
+    id = TAG_INT_ARRAY
+    typecode = "i"
+    itemsize = 4
+    fmt = Struct(">i")
 
-    def __setitem__(self, key, value):
-        self.value[key] = value
+    # Printing and Formatting of tree
+    def valuestr(self):
+        return "[%i int(s)]" % len(self)
 
-    def __delitem__(self, key):
-        del (self.value[key])
 
-    def insert(self, key, value):
-        self.value.insert(key, value)
+class TAG_Long_Array(_TAG_Array):
+    """
+    TAG_Long_Array, comparable to a collections.UserList with
+    an intrinsic name whose values must be integers
+    """
+    __slots__ = ()
+    id = TAG_LONG_ARRAY
+    typecode = "q"
+    itemsize = 8
+    fmt = Struct(">q")
 
     # Printing and Formatting of tree
     def valuestr(self):
-        return "[%i long(s)]" % len(self.value)
+        return "[%i long(s)]" % len(self)
 
 
 class TAG_String(TAG, Sequence):
@@ -347,6 +470,7 @@ class TAG_String(TAG, Sequence):
     TAG_String, comparable to a collections.UserString with an
     intrinsic name
     """
+    __slots__ = ("value",)
     id = TAG_STRING
 
     def __init__(self, value=None, name=None, buffer=None):
@@ -362,11 +486,18 @@ class TAG_String(TAG, Sequence):
             raise StructError()
         self.value = read.decode("utf-8")
 
-    def _render_buffer(self, buffer):
+    def _parse_data(self, data, pos):
+        length = _SHORT.unpack_from(data, pos)[0]
+        end = pos + 2 + length
+        if length < 0 or end > len(data):
+            raise StructError()
+        self.value = data[pos + 2:end].decode("utf-8")
+        return end
+
+    def _render_data(self, out):
         save_val = self.value.encode("utf-8")
-        length = TAG_Short(len(save_val))
-        length._render_buffer(buffer)
-        buffer.write(save_val)
+        out += _SHORT.pack(len(save_val))
+        out += save_val
 
     # Mixin methods
     def __len__(self):
@@ -387,10 +518,50 @@ class TAG_String(TAG, Sequence):
 
 
 # == Collection Tags ==#
-class TAG_List(TAG, MutableSequence):
+class _LazyTags(object):
+    """
+    Mixin of TAG_List and TAG_Compound to parse their children lazily.
+
+    A lazily parsed tag only records where its payload is in the data, and
+    its _tags attribute is missing. The children are parsed, lazily too, the
+    first time _tags is used. A payload that was never parsed can't have
+    changed, so it's rendered copying it from the data.
+
+    The classes using it need the slots _tags and _span, which is (data,
+    start, end) of the payload while the children are not parsed, and None
+    otherwise.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # Only called for missing attributes
+        if name == '_tags' and self._span is not None:
+            data, start, end = self._span
+            self._span = None
+            self._tags = []
+            self._parse_data(data, start, True)
+            return self._tags
+        raise AttributeError("%r object has no attribute %r" %
+                             (self.__class__.__name__, name))
+
+    def _parse_lazy(self, data, pos):
+        # Check the whole payload now, so broken data fails here and not
+        # when the children are used
+        end = _skip(data, pos, self.id)
+        del self._tags
+        self._span = (data, pos, end)
+        return end
+
+    def _render_span(self, out):
+        data, start, end = self._span
+        out += data[start:end]
+
+
+class TAG_List(_LazyTags, TAG, MutableSequence):
     """
     TAG_List, comparable to a collections.UserList with an intrinsic name
     """
+    __slots__ = ("value", "tagID", "_tags", "_span")
     id = TAG_LIST
 
     def __init__(self, type=None, value=None, name=None, buffer=None):
@@ -405,6 +576,16 @@ class TAG_List(TAG, MutableSequence):
         # if self.tagID == None:
         #     raise ValueError("No type specified for list: %s" % (name))
 
+    @property
+    def tags(self):
+        """List with the tags of the list."""
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags):
+        self._tags = tags
+        self._span = None
+
     # Parsers and Generators
     def _parse_buffer(self, buffer):
         self.tagID = TAG_Byte(buffer=buffer).value
@@ -413,19 +594,60 @@ class TAG_List(TAG, MutableSequence):
         for x in range(length.value):
             self.tags.append(TAGLIST[self.tagID](buffer=buffer))
 
-    def _render_buffer(self, buffer):
-        TAG_Byte(self.tagID)._render_buffer(buffer)
-        length = TAG_Int(len(self.tags))
-        length._render_buffer(buffer)
-        for i, tag in enumerate(self.tags):
+    def _parse_data(self, data, pos, lazy=False):
+        self.tagID = _BYTE.unpack_from(data, pos)[0]
+        length = _INT.unpack_from(data, pos + 1)[0]
+        pos += 5
+        self.tags = tags = []
+        if length <= 0:
+            return pos
+        try:
+            tag_class = TAGLIST[self.tagID]
+        except KeyError:
+            raise ValueError("Unrecognised tag type %d" % self.tagID)
+        if self.tagID == TAG_END:
+            raise MalformedFileError("List of %d TAG_End" % length)
+        if self.tagID in _FIXED_SIZES:
+            # All the numbers at once
+            fmt = Struct(">%d%s" % (length, tag_class.fmt.format[-1]))
+            tags.extend([tag_class(value) for value in fmt.unpack_from(data, pos)])
+            return pos + fmt.size
+        for _ in range(length):
+            tag = tag_class()
+            if lazy:
+                pos = tag._parse_lazy(data, pos)
+            else:
+                pos = tag._parse_data(data, pos)
+            tags.append(tag)
+        return pos
+
+    def _parse_lazy(self, data, pos):
+        self.tagID = _BYTE.unpack_from(data, pos)[0]
+        return super(TAG_List, self)._parse_lazy(data, pos)
+
+    def _render_data(self, out):
+        if self._span is not None:
+            return self._render_span(out)
+        tags = self.tags
+        for i, tag in enumerate(tags):
             if tag.id != self.tagID:
                 raise ValueError(
                     "List element %d(%s) has type %d != container type %d" %
                     (i, tag, tag.id, self.tagID))
-            tag._render_buffer(buffer)
+        out += _LIST_HEADER.pack(self.tagID, len(tags))
+        if self.tagID in _FIXED_SIZES and tags:
+            # All the numbers at once
+            fmt = Struct(">%d%s" % (len(tags), tags[0].fmt.format[-1]))
+            out += fmt.pack(*[tag.value for tag in tags])
+        else:
+            for tag in tags:
+                tag._render_data(out)
 
     # Mixin methods
     def __len__(self):
+        if self._span is not None:
+            # The length is in the header, the items are not needed
+            return max(_INT.unpack_from(self._span[0], self._span[1] + 1)[0], 0)
         return len(self.tags)
 
     def __iter__(self):
@@ -470,17 +692,115 @@ class TAG_List(TAG, MutableSequence):
         return '\n'.join(output)
 
 
-class TAG_Compound(TAG, MutableMapping):
+class _TagList(list):
+    """
+    List with the tags of a TAG_Compound, that keeps an index of the
+    position of the first tag with each name.
+
+    The index is built the first time a name is looked up. Appending a tag,
+    or replacing one by a tag with the same name, updates it. Any other
+    change drops it, as well as renaming a tag in any index.
+    """
+    # The index is valid while _renames is the same as the global _renames
+    _index = None
+    _renames = None
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def find(self, name):
+        """Return the position of the first tag named name, or None."""
+        if self._renames != _renames:
+            index = {}
+            for i in range(len(self) - 1, -1, -1):
+                tag = self[i]
+                index[tag.name] = i
+                tag._indexed = True
+            self._index = index
+            self._renames = _renames
+        return self._index.get(name)
+
+    def _drop_index(self):
+        if self._index is not None:
+            self._index = self._renames = None
+
+    def append(self, tag):
+        list.append(self, tag)
+        if self._index is not None:
+            if self._renames == _renames:
+                self._index.setdefault(tag.name, len(self) - 1)
+                tag._indexed = True
+            else:
+                self._index = self._renames = None
+
+    def __setitem__(self, key, value):
+        if self._index is not None:
+            if (isinstance(key, int) and self._renames == _renames and
+                    self[key].name == value.name):
+                value._indexed = True
+            else:
+                self._index = self._renames = None
+        list.__setitem__(self, key, value)
+
+    # The rest of the methods changing the list drop the index
+    def __delitem__(self, key):
+        self._drop_index()
+        list.__delitem__(self, key)
+
+    def __iadd__(self, tags):
+        self._drop_index()
+        return list.__iadd__(self, tags)
+
+    def __imul__(self, n):
+        self._drop_index()
+        return list.__imul__(self, n)
+
+    def extend(self, tags):
+        self._drop_index()
+        list.extend(self, tags)
+
+    def insert(self, i, tag):
+        self._drop_index()
+        list.insert(self, i, tag)
+
+    def pop(self, i=-1):
+        self._drop_index()
+        return list.pop(self, i)
+
+    def remove(self, tag):
+        self._drop_index()
+        list.remove(self, tag)
+
+    def clear(self):
+        self._drop_index()
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self._drop_index()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._drop_index()
+        list.reverse(self)
+
+
+class TAG_Compound(_LazyTags, TAG, MutableMapping):
     """
     TAG_Compound, comparable to a collections.OrderedDict with an
     intrinsic name
+
+    Looking up a tag by name doesn't go through all the tags, the position
+    of the tags is indexed by name, see _TagList. If there are several tags
+    with the same name the first one is used.
     """
+    __slots__ = ("value", "_tags", "_span")
     id = TAG_COMPOUND
 
     def __init__(self, buffer=None, name=None):
         # TODO: add a value parameter as well
         super(TAG_Compound, self).__init__()
-        self.tags = []
+        self._tags = []
+        self._span = None
         if name:
             self.name = name
         else:
@@ -488,59 +808,120 @@ class TAG_Compound(TAG, MutableMapping):
         if buffer:
             self._parse_buffer(buffer)
 
+    @property
+    def tags(self):
+        """List with the tags of the compound."""
+        tags = self._tags
+        if tags.__class__ is not _TagList:
+            # Parsed tags are kept in a plain list until they are used,
+            # most compounds are never looked up
+            tags = self._tags = _TagList(tags)
+        return tags
+
+    @tags.setter
+    def tags(self, tags):
+        self._tags = tags if isinstance(tags, _TagList) else _TagList(tags)
+        self._span = None
+
     # Parsers and Generators
     def _parse_buffer(self, buffer):
-        while True:
-            type = TAG_Byte(buffer=buffer)
-            if type.value == TAG_END:
-                # print("found tag_end")
-                break
+        tags = []
+        try:
+            while True:
+                type = TAG_Byte(buffer=buffer)
+                if type.value == TAG_END:
+                    # print("found tag_end")
+                    break
+                else:
+                    name = TAG_String(buffer=buffer).value
+                    try:
+                        tag = TAGLIST[type.value]()
+                    except KeyError:
+                        raise ValueError("Unrecognised tag type %d" % type.value)
+                    # A new tag is in no name index, skip the setter
+                    tag._name = name
+                    tags.append(tag)
+                    tag._parse_buffer(buffer)
+        finally:
+            if self._tags:
+                self.tags.extend(tags)
             else:
-                name = TAG_String(buffer=buffer).value
+                self._tags = tags
+
+    def _parse_data(self, data, pos, lazy=False):
+        tags = []
+        try:
+            while True:
+                tagid = data[pos]
+                if tagid == TAG_END:
+                    return pos + 1
+                length = _SHORT.unpack_from(data, pos + 1)[0]
+                start = pos + 3
+                pos = start + length
+                if length < 0 or pos > len(data):
+                    raise StructError()
+                name = data[start:pos].decode("utf-8")
                 try:
-                    tag = TAGLIST[type.value]()
+                    tag = TAGLIST[tagid]()
                 except KeyError:
-                    raise ValueError("Unrecognised tag type %d" % type.value)
-                tag.name = name
-                self.tags.append(tag)
-                tag._parse_buffer(buffer)
-
-    def _render_buffer(self, buffer):
-        for tag in self.tags:
-            TAG_Byte(tag.id)._render_buffer(buffer)
-            TAG_String(tag.name)._render_buffer(buffer)
-            tag._render_buffer(buffer)
-        buffer.write(b'\x00')  # write TAG_END
+                    raise ValueError("Unrecognised tag type %d" % tagid)
+                tag._name = name
+                tags.append(tag)
+                if tagid in _FIXED_SIZES:
+                    # Inlined _TAG_Numeric._parse_data(), most tags are numbers
+                    fmt = tag.fmt
+                    tag.value = fmt.unpack_from(data, pos)[0]
+                    pos += fmt.size
+                elif lazy:
+                    pos = tag._parse_lazy(data, pos)
+                else:
+                    pos = tag._parse_data(data, pos)
+        finally:
+            if self._tags:
+                self.tags.extend(tags)
+            else:
+                self._tags = tags
+
+    def _render_data(self, out):
+        if self._span is not None:
+            return self._render_span(out)
+        for tag in self._tags:
+            name = tag._name.encode("utf-8")
+            out += _TAG_HEADER.pack(tag.id, len(name))
+            out += name
+            if tag.id in _FIXED_SIZES:
+                # Inlined _TAG_Numeric._render_data()
+                out += tag.fmt.pack(tag.value)
+            else:
+                tag._render_data(out)
+        out.append(TAG_END)
 
     # Mixin methods
     def __len__(self):
-        return len(self.tags)
+        return len(self._tags)
 
     def __iter__(self):
-        for key in self.tags:
+        for key in self._tags:
             yield key.name
 
     def __contains__(self, key):
-        if isinstance(key, int):
+        if isinstance(key, basestring):
+            return self.tags.find(key) is not None
+        elif isinstance(key, int):
             return key <= len(self.tags)
-        elif isinstance(key, basestring):
-            for tag in self.tags:
-                if tag.name == key:
-                    return True
-            return False
         elif isinstance(key, TAG):
             return key in self.tags
         return False
 
     def __getitem__(self, key):
-        if isinstance(key, int):
-            return self.tags[key]
-        elif isinstance(key, basestring):
-            for tag in self.tags:
-                if tag.name == key:
-                    return tag
-            else:
+        if isinstance(key, basestring):
+            tags = self.tags
+            i = tags.find(key)
+            if i is None:
                 raise KeyError("Tag %s does not exist" % key)
+            return tags[i]
+        elif isinstance(key, int):
+            return self.tags[key]
         else:
             raise TypeError(
                 "key needs to be either name of tag, or index of tag, "
@@ -553,43 +934,46 @@ class TAG_Compound(TAG, MutableMapping):
             self.tags[key] = value
         elif isinstance(key, basestring):
             value.name = key
-            for i, tag in enumerate(self.tags):
-                if tag.name == key:
-                    self.tags[i] = value
-                    return
-            self.tags.append(value)
+            i = self.tags.find(key)
+            if i is None:
+                self.tags.append(value)
+            else:
+                self.tags[i] = value
 
     def __delitem__(self, key):
         if isinstance(key, int):
             del (self.tags[key])
         elif isinstance(key, basestring):
-            self.tags.remove(self.__getitem__(key))
+            i = self.tags.find(key)
+            if i is None:
+                raise KeyError("Tag %s does not exist" % key)
+            del self.tags[i]
         else:
             raise ValueError(
                 "key needs to be either name of tag, or index of tag")
 
     def keys(self):
-        return [tag.name for tag in self.tags]
+        return [tag.name for tag in self._tags]
 
     def iteritems(self):
-        for tag in self.tags:
+        for tag in self._tags:
             yield (tag.name, tag)
 
     # Printing and Formatting of tree
     def __unicode__(self):
-        return "{" + ", ".join([tag.tag_info() for tag in self.tags]) + "}"
+        return "{" + ", ".join([tag.tag_info() for tag in self._tags]) + "}"
 
     def __str__(self):
-        return "{" + ", ".join([tag.tag_info() for tag in self.tags]) + "}"
+        return "{" + ", ".join([tag.tag_info() for tag in self._tags]) + "}"
 
     def valuestr(self):
-        return '{%i Entries}' % len(self.tags)
+        return '{%i Entries}' % len(self._tags)
 
     def pretty_tree(self, indent=0):
         output = [super(TAG_Compound, self).pretty_tree(indent)]
-        if len(self.tags):
+        if len(self._tags):
             output.append(("\t" * indent) + "{")
-            output.extend([tag.pretty_tree(indent + 1) for tag in self.tags])
+            output.extend([tag.pretty_tree(indent + 1) for tag in self._tags])
             output.append(("\t" * indent) + "}")
         return '\n'.join(output)
 
@@ -605,12 +989,18 @@ TAGLIST = {TAG_END: _TAG_End, TAG_BYTE: TAG_Byte, TAG_SHORT: TAG_Short,
 class NBTFile(TAG_Compound):
     """Represent an NBT file object."""
 
-    def __init__(self, filename=None, buffer=None, fileobj=None):
+    def __init__(self, filename=None, buffer=None, fileobj=None, data=None,
+                 lazy=False):
         """
         Create a new NBTFile object.
-        Specify either a filename, file object or data buffer.
+        Specify either a filename, file object, data buffer or data.
         If filename of file object is specified, data should be GZip-compressed.
         If a data buffer is specified, it is assumed to be uncompressed.
+        If data is specified, it is a bytes-like object with uncompressed
+        data, which is parsed in place without copying it to a buffer (other
+        than bytes objects are copied once). This is faster than using a
+        buffer. With data, lazy can be set to True,
+        see parse_data().
 
         If filename is specified, the file is closed after reading and writing.
         If file object is specified, the caller is responsible for closing the
@@ -637,7 +1027,9 @@ class NBTFile(TAG_Compound):
             self.file = None
             closefile = False
         # parse the file given initially
-        if self.file:
+        if data is not None:
+            self.parse_data(data, lazy)
+        elif self.file:
             self.parse_file()
             if closefile:
                 # Note: GzipFile().close() does NOT close the fileobj,
@@ -683,6 +1075,46 @@ class NBTFile(TAG_Compound):
                 "filename or a file object"
             )
 
+    def parse_data(self, data, lazy=False):
+        """Completely parse uncompressed NBT data from a bytes-like object
+        (bytes, bytearray, memoryview, mmap...), extracting all tags. Other
+        than bytes objects are copied once.
+
+        If lazy is True the data is only checked, and the children of each
+        list and compound are parsed the first time they are used. The data
+        is kept while the tree exists. The tags that
+        are never used are written back copying their data, which is much
+        faster when only a few tags are used or changed. Invalid UTF-8 in
+        names and strings raises UnicodeDecodeError when they are parsed,
+        not here."""
+        data = _as_bytes(data)
+        try:
+            if data[0] != self.id:
+                raise MalformedFileError("First record is not a Compound Tag")
+            length = _SHORT.unpack_from(data, 1)[0]
+            if length < 0 or 3 + length > len(data):
+                raise _truncated()
+            name = data[3:3 + length].decode("utf-8")
+            if lazy:
+                self._parse_lazy(data, 3 + length)
+            else:
+                self._parse_data(data, 3 + length)
+            self.name = name
+        except (StructError, IndexError):
+            raise _truncated()
+
+    def render_data(self):
+        """Return a bytearray with the uncompressed NBT data of the file.
+
+        The whole tree is rendered into this single bytearray, without
+        intermediate buffers or TAG objects."""
+        out = bytearray()
+        name = self.name.encode("utf-8")
+        out += _TAG_HEADER.pack(self.id, len(name))
+        out += name
+        self._render_data(out)
+        return out
+
     def write_file(self, filename=None, buffer=None, fileobj=None):
         """Write this NBT file to a file."""
         closefile = True
@@ -704,9 +1136,7 @@ class NBTFile(TAG_Compound):
                 "filename or a file object"
             )
         # Render tree to file
-        TAG_Byte(self.id)._render_buffer(self.file)
-        TAG_String(self.name)._render_buffer(self.file)
-        self._render_buffer(self.file)
+        self.file.write(self.render_data())
         # make sure the file is complete
         try:
             self.file.flush()
@@ -734,3 +1164,620 @@ class NBTFile(TAG_Compound):
                 self.__class__.__name__, TAG_Compound.__name__,
                 self.name, id(self)
             )
+
+
+# == Path extraction ==#
+
+_FIXED_SIZES = {TAG_BYTE: 1, TAG_SHORT: 2, TAG_INT: 4, TAG_LONG: 8,
+                TAG_FLOAT: 4, TAG_DOUBLE: 8}
+_ARRAY_ITEM_SIZES = {TAG_BYTE_ARRAY: 1, TAG_INT_ARRAY: 4, TAG_LONG_ARRAY: 8}
+
+LENGTH_SUFFIX = "#len"
+"""Suffix of the paths given to extract_paths() that return a length."""
+
+EXISTS_SUFFIX = "#exists"
+"""Suffix of the paths given to extract_paths() that only tell if the tag
+exists."""
+
+
+class _PathNode(object):
+    """A tag in the tree of paths of extract_paths()."""
+
+    def __init__(self):
+        self.value_path = None
+        self.len_path = None
+        self.exists_path = None
+        self.children = {}
+
+
+def _path_tree(paths):
+    """Return the root _PathNode of the paths, children keyed by encoded name."""
+    root = _PathNode()
+    for path in paths:
+        names = path
+        wants_len = path.endswith(LENGTH_SUFFIX)
+        wants_exists = path.endswith(EXISTS_SUFFIX)
+        if wants_len:
+            names = path[:-len(LENGTH_SUFFIX)]
+        elif wants_exists:
+            names = path[:-len(EXISTS_SUFFIX)]
+        node = root
+        for name in names.split("/"):
+            node = node.children.setdefault(name.encode("utf-8"), _PathNode())
+        if wants_len:
+            node.len_path = path
+        elif wants_exists:
+            node.exists_path = path
+        else:
+            node.value_path = path
+    return root
+
+
+class _StopExtraction(Exception):
+    """Raised to stop extract_paths() before the end of the data."""
+
+
+def _add_path(result, path, value, stop):
+    """Add a path to the result of extract_paths(), asking stop if it's
+    enough."""
+    result[path] = value
+    if stop is not None and stop(result):
+        raise _StopExtraction()
+
+
+def _skip(data, pos, tagid):
+    """Return the position after the payload of the tag of type tagid that
+    starts at pos, without creating any TAG."""
+    size = _FIXED_SIZES.get(tagid)
+    if size is not None:
+        pos += size
+    elif tagid in _ARRAY_ITEM_SIZES:
+        length = _INT.unpack_from(data, pos)[0]
+        if length < 0:
+            raise MalformedFileError("Negative array length %d" % length)
+        pos += 4 + length * _ARRAY_ITEM_SIZES[tagid]
+    elif tagid == TAG_STRING:
+        length = _SHORT.unpack_from(data, pos)[0]
+        if length < 0:
+            raise _truncated()
+        pos += 2 + length
+    elif tagid == TAG_LIST:
+        itemid = data[pos]
+        length = _INT.unpack_from(data, pos + 1)[0]
+        pos += 5
+        if length > 0:
+            size = _FIXED_SIZES.get(itemid)
+            if size is not None:
+                pos += length * size
+            elif itemid == TAG_END:
+                raise MalformedFileError("List of %d TAG_End" % length)
+            else:
+                for _ in range(length):
+                    pos = _skip(data, pos, itemid)
+    elif tagid == TAG_COMPOUND:
+        while True:
+            itemid = data[pos]
+            if itemid == TAG_END:
+                pos += 1
+                break
+            length = _SHORT.unpack_from(data, pos + 1)[0]
+            if length < 0:
+                raise _truncated()
+            pos = _skip(data, pos + 3 + length, itemid)
+    else:
+        raise MalformedFileError("Unrecognised tag type %d" % tagid)
+    if pos > len(data):
+        raise _truncated()
+    return pos
+
+
+def _payload_len(data, start, end, tagid):
+    """Return the length of the payload between start and end, as len() of
+    the TAG would. None for numbers."""
+    if tagid == TAG_LIST:
+        return max(_INT.unpack_from(data, start + 1)[0], 0)
+    elif tagid in _ARRAY_ITEM_SIZES:
+        return _INT.unpack_from(data, start)[0]
+    elif tagid == TAG_STRING:
+        return len(bytes(data[start + 2:end]).decode("utf-8"))
+    elif tagid == TAG_COMPOUND:
+        count = 0
+        pos = start
+        while data[pos] != TAG_END:
+            length = _SHORT.unpack_from(data, pos + 1)[0]
+            pos = _skip(data, pos + 3 + length, data[pos])
+            count += 1
+        return count
+    return None
+
+
+def _extract_compound(data, pos, children, result, stop=None):
+    """Extract the paths in children from the payload of the compound at pos,
+    return the position after it. See extract_paths() for stop."""
+    while True:
+        tagid = data[pos]
+        if tagid == TAG_END:
+            return pos + 1
+        length = _SHORT.unpack_from(data, pos + 1)[0]
+        if length < 0:
+            raise _truncated()
+        start = pos + 3 + length
+        node = children.get(bytes(data[pos + 3:start]))
+        if node is None:
+            pos = _skip(data, start, tagid)
+            continue
+        if node.exists_path is not None and node.exists_path not in result:
+            # Known before walking the payload, even for compounds
+            _add_path(result, node.exists_path, True, stop)
+        if node.len_path is not None and node.len_path not in result and \
+                (tagid == TAG_LIST or tagid in _ARRAY_ITEM_SIZES):
+            # The length is in the header, known before walking the items
+            _add_path(result, node.len_path,
+                      _payload_len(data, start, None, tagid), stop)
+        if node.children and tagid == TAG_COMPOUND:
+            pos = _extract_compound(data, start, node.children, result, stop)
+        else:
+            pos = _skip(data, start, tagid)
+        if node.value_path is not None and node.value_path not in result:
+            if tagid == TAG_LIST or tagid == TAG_COMPOUND:
+                tag = TAGLIST[tagid]()
+                tag._parse_data(data, start)
+                tag.name = bytes(data[start - length:start]).decode("utf-8")
+                _add_path(result, node.value_path, tag, stop)
+            else:
+                # No TAG needed for the value
+                _add_path(result, node.value_path,
+                          _decode_payload(data, start, tagid)[0], stop)
+        if node.len_path is not None and node.len_path not in result:
+            _add_path(result, node.len_path,
+                      _payload_len(data, start, pos, tagid), stop)
+
+
+def _extract_tags(compound, children, result):
+    """Same as _extract_compound() for an already parsed TAG_Compound."""
+    for tag in compound._tags:
+        node = children.get(tag.name.encode("utf-8"))
+        if node is None:
+            continue
+        if node.exists_path is not None and node.exists_path not in result:
+            result[node.exists_path] = True
+        if node.children and isinstance(tag, TAG_Compound):
+            _extract_tags(tag, node.children, result)
+        if node.value_path is not None and node.value_path not in result:
+            if isinstance(tag, (TAG_List, TAG_Compound)):
+                result[node.value_path] = tag
+            else:
+                result[node.value_path] = tag.value
+        if node.len_path is not None and node.len_path not in result:
+            result[node.len_path] = None if isinstance(tag, _TAG_Numeric) else len(tag)
+
+
+def extract_paths(data, paths, stop=None):
+    """
+    Extract the tags in paths from NBT data in a single pass.
+
+    data is a bytes-like object with uncompressed NBT data, like the one
+    returned by RegionFile.get_blockdata(), or an already parsed TAG_Compound.
+    paths is an iterable with the names of the tags separated by "/", relative
+    to the root compound (e.g. "Level/xPos"). A path ending in "#len" (e.g.
+    "Level/Entities#len") returns the number of elements of the tag instead of
+    its value, the elements are not parsed. A path ending in "#exists" (e.g.
+    "Level#exists") returns True if the tag exists, it's added as soon as the
+    tag is found, before its payload is walked.
+
+    Return a dict with the paths found. Numbers, strings and arrays are
+    returned as their value, lists and compounds as TAG objects. The length of
+    numbers is None. Paths that don't exist are not in the dict, if a name is
+    repeated in a compound only the first tag is used.
+
+    The tags that are not in any path are skipped using the lengths encoded in
+    the data, without creating TAG objects or decoding strings. The whole data
+    is still walked, so truncated data raises a MalformedFileError, as well
+    as unknown tag types.
+
+    stop is an optional function called with the result every time a path is
+    added to it. If it returns True the rest of the data is neither walked
+    nor checked and the result is returned as it is. The length of lists and
+    arrays is added as soon as their header is read, before their items are
+    walked. stop is not used with an already parsed TAG_Compound.
+    """
+    root = _path_tree(paths)
+    result = {}
+    if isinstance(data, TAG_Compound):
+        _extract_tags(data, root.children, result)
+        return result
+    data = _as_bytes(data)
+    try:
+        if data[0] != TAG_COMPOUND:
+            raise MalformedFileError("First record is not a Compound Tag")
+        length = _SHORT.unpack_from(data, 1)[0]
+        if length < 0:
+            raise _truncated()
+        _extract_compound(data, 3 + length, root.children, result, stop)
+    except _StopExtraction:
+        pass
+    except (IndexError, StructError):
+        raise _truncated()
+    return result
+
+
+# == Decoding to plain values ==#
+
+_NUMBER_STRUCTS = dict((tagid, TAGLIST[tagid].fmt) for tagid in _FIXED_SIZES)
+_ARRAY_TYPECODES = {TAG_INT_ARRAY: TAG_Int_Array.typecode,
+                    TAG_LONG_ARRAY: TAG_Long_Array.typecode}
+
+
+def _decode_payload(data, pos, tagid, types=False):
+    """Return the plain value of the payload of the tag of type tagid that
+    starts at pos and the position after it. See decode() for types."""
+    fmt = _NUMBER_STRUCTS.get(tagid)
+    if fmt is not None:
+        value = fmt.unpack_from(data, pos)[0]
+        pos += fmt.size
+    elif tagid == TAG_COMPOUND:
+        value = {}
+        while True:
+            itemid = data[pos]
+            if itemid == TAG_END:
+                pos += 1
+                break
+            length = _SHORT.unpack_from(data, pos + 1)[0]
+            start = pos + 3
+            pos = start + length
+            if length < 0 or pos > len(data):
+                raise _truncated()
+            name = data[start:pos].decode("utf-8")
+            fmt = _NUMBER_STRUCTS.get(itemid)
+            if fmt is not None and not types:
+                item = fmt.unpack_from(data, pos)[0]
+                pos += fmt.size
+            else:
+                item, pos = _decode_payload(data, pos, itemid, types)
+            if name not in value:
+                value[name] = item
+    elif tagid == TAG_LIST:
+        itemid = _BYTE.unpack_from(data, pos)[0]
+        length = _INT.unpack_from(data, pos + 1)[0]
+        pos += 5
+        if length <= 0:
+            value = []
+        elif itemid in _NUMBER_STRUCTS:
+            # All the numbers at once
+            fmt = Struct(">%d%s" % (length, _NUMBER_STRUCTS[itemid].format[-1]))
+            value = list(fmt.unpack_from(data, pos))
+            pos += fmt.size
+            if types:
+                value = [(itemid, item) for item in value]
+        elif itemid == TAG_END or itemid not in TAGLIST:
+            raise MalformedFileError("List of %d items of type %d" % (length, itemid))
+        else:
+            value = []
+            for _ in range(length):
+                item, pos = _decode_payload(data, pos, itemid, types)
+                value.append(item)
+    elif tagid == TAG_STRING:
+        length = _SHORT.unpack_from(data, pos)[0]
+        end = pos + 2 + length
+        if length < 0 or end > len(data):
+            raise _truncated()
+        value = data[pos + 2:end].decode("utf-8")
+        pos = end
+    elif tagid in _ARRAY_ITEM_SIZES:
+        length = _INT.unpack_from(data, pos)[0]
+        end = pos + 4 + length * _ARRAY_ITEM_SIZES[tagid]
+        if length < 0 or end > len(data):
+            raise _truncated()
+        if tagid == TAG_BYTE_ARRAY:
+            value = bytearray(data[pos + 4:end])
+        else:
+            value = array(_ARRAY_TYPECODES[tagid])
+            value.frombytes(data[pos + 4:end])
+            if _SWAP_ARRAYS:
+                value.byteswap()
+        pos = end
+    else:
+        raise MalformedFileError("Unrecognised tag type %d" % tagid)
+    if types:
+        value = (tagid, value)
+    return value, pos
+
+
+def decode(data, types=False):
+    """
+    Decode uncompressed NBT data into plain Python values, without creating
+    any TAG object. Much faster than NBTFile for callers that only read.
+
+    data is a bytes-like object, like the one returned by
+    RegionFile.get_blockdata(). Return the value of the root compound:
+    compounds are decoded as dicts, lists as lists, numbers as int or float,
+    strings as str, byte arrays as bytearray and int and long arrays as
+    array.array, the same types as the value of the TAGs. If a name is
+    repeated in a compound only the first tag is used.
+
+    The type of each tag is lost (e.g. TAG_Byte and TAG_Long are both int).
+    If types is True every value, including the root and the items of
+    lists, is instead a tuple (tag type, value), e.g. (TAG_SHORT, 20).
+
+    Broken data raises MalformedFileError, invalid UTF-8 UnicodeDecodeError.
+    """
+    data = _as_bytes(data)
+    try:
+        if data[0] != TAG_COMPOUND:
+            raise MalformedFileError("First record is not a Compound Tag")
+        length = _SHORT.unpack_from(data, 1)[0]
+        if length < 0 or 3 + length > len(data):
+            raise _truncated()
+        # The name is not returned, but it's checked as NBTFile does
+        data[3:3 + length].decode("utf-8")
+        return _decode_payload(data, 3 + length, TAG_COMPOUND, types)[0]
+    except (IndexError, StructError):
+        raise _truncated()
+
+
+def _iter_events(data, pos, tagid, name):
+    """Generate the iterparse() events of the tag of type tagid and name
+    whose payload starts at pos."""
+    try:
+        # Compounds and lists being walked, [type, name, items left, item type]
+        stack = []
+        while True:
+            if tagid == TAG_COMPOUND:
+                stack.append([TAG_COMPOUND, name, None, None])
+                yield ("start", TAG_COMPOUND, name, None)
+            elif tagid == TAG_LIST:
+                itemid = _BYTE.unpack_from(data, pos)[0]
+                length = max(_INT.unpack_from(data, pos + 1)[0], 0)
+                pos += 5
+                if length and (itemid == TAG_END or itemid not in TAGLIST):
+                    raise MalformedFileError(
+                        "List of %d items of type %d" % (length, itemid))
+                stack.append([TAG_LIST, name, length, itemid])
+                yield ("start", TAG_LIST, name, length)
+            else:
+                value, pos = _decode_payload(data, pos, tagid)
+                yield ("value", tagid, name, value)
+            # Next tag, ending the compounds and lists that have no more
+            while stack:
+                frame = stack[-1]
+                if frame[0] == TAG_COMPOUND:
+                    tagid = data[pos]
+                    if tagid == TAG_END:
+                        pos += 1
+                        stack.pop()
+                        yield ("end", TAG_COMPOUND, frame[1], None)
+                        continue
+                    length = _SHORT.unpack_from(data, pos + 1)[0]
+                    start = pos + 3
+                    pos = start + length
+                    if length < 0 or pos > len(data):
+                        raise _truncated()
+                    name = data[start:pos].decode("utf-8")
+                    break
+                if not frame[2]:
+                    stack.pop()
+                    yield ("end", TAG_LIST, frame[1], None)
+                    continue
+                frame[2] -= 1
+                tagid = frame[3]
+                name = None
+                break
+            else:
+                return
+    except (IndexError, StructError):
+        raise _truncated()
+
+
+def _find_tag(data, path):
+    """Return the type, name and payload position of the tag in path, see
+    write_snbt(). Raise KeyError if it doesn't exist."""
+    try:
+        if data[0] != TAG_COMPOUND:
+            raise MalformedFileError("First record is not a Compound Tag")
+        length = _SHORT.unpack_from(data, 1)[0]
+        pos = 3 + length
+        if length < 0 or pos > len(data):
+            raise _truncated()
+        tagid = TAG_COMPOUND
+        name = data[3:pos].decode("utf-8")
+        if not path:
+            return tagid, name, pos
+        for name in path.split("/"):
+            if tagid != TAG_COMPOUND:
+                raise KeyError(path)
+            wanted = name.encode("utf-8")
+            while True:
+                tagid = data[pos]
+                if tagid == TAG_END:
+                    raise KeyError(path)
+                length = _SHORT.unpack_from(data, pos + 1)[0]
+                if length < 0:
+                    raise _truncated()
+                start = pos + 3 + length
+                if data[pos + 3:start] == wanted:
+                    pos = start
+                    break
+                pos = _skip(data, start, tagid)
+        return tagid, name, pos
+    except (IndexError, StructError):
+        raise _truncated()
+
+
+def iterparse(data):
+    """
+    Iterate over the tags of uncompressed NBT data as a stream of events,
+    without creating TAG objects or keeping the decoded values.
+
+    data is a bytes-like object. Each event is a tuple
+    (event, tag type, name, value), where event is one of:
+
+     - "start": a compound or a list begins. value is None for compounds
+       and the number of items for lists.
+     - "end": the compound or list that began last ends. value is None.
+     - "value": any other tag, value is decoded as in decode().
+
+    The items of lists have None as name. The first event is the start of
+    the root compound, and the last one its end. Only the current path is
+    kept, so memory doesn't grow with the size of the data. Broken data
+    raises MalformedFileError when it's reached, after the events before it
+    have been produced.
+    """
+    data = _as_bytes(data)
+    tagid, name, pos = _find_tag(data, None)
+    for event in _iter_events(data, pos, tagid, name):
+        yield event
+
+
+# == Streaming text export ==#
+
+# Names that don't need quotes in SNBT
+_SNBT_BARE_NAME = re.compile(r"[A-Za-z0-9._+-]+\Z")
+_SNBT_SUFFIXES = {TAG_BYTE: "b", TAG_SHORT: "s", TAG_INT: "", TAG_LONG: "L",
+                  TAG_FLOAT: "f", TAG_DOUBLE: "d"}
+# Prefix and item suffix of the arrays in SNBT
+_SNBT_ARRAYS = {TAG_BYTE_ARRAY: ("B", "b"), TAG_INT_ARRAY: ("I", ""),
+                TAG_LONG_ARRAY: ("L", "L")}
+# Byte, int and long arrays are written as lists of numbers in JSON
+_json_encode = json.JSONEncoder(default=list, separators=(",", ":"),
+                                allow_nan=False).encode
+# JSON has no NaN nor infinities, they are written as strings
+_JSON_NON_FINITE = {"nan": '"NaN"', "inf": '"Infinity"', "-inf": '"-Infinity"'}
+
+
+def _snbt_string(value):
+    return '"%s"' % value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _snbt_value(tagid, value):
+    suffix = _SNBT_SUFFIXES.get(tagid)
+    if suffix is not None:
+        if value != value:
+            # SNBT has no NaN
+            return '"NaN"'
+        text = repr(value)
+        if text == "inf" or text == "-inf":
+            # Too big for any float, read as infinity
+            text = text.replace("inf", "1.0e999")
+        elif "e" in text and "." not in text:
+            # 1e-05 is not a number in SNBT, 1.0e-05 is
+            text = text.replace("e", ".0e")
+        return text + suffix
+    elif tagid == TAG_STRING:
+        return _snbt_string(value)
+    prefix, suffix = _SNBT_ARRAYS[tagid]
+    if tagid == TAG_BYTE_ARRAY:
+        # SNBT bytes are signed
+        value = array("b", value)
+    return "[%s;%s]" % (prefix, ",".join([repr(i) + suffix for i in value]))
+
+
+def _json_value(value):
+    try:
+        return _json_encode(value)
+    except ValueError:
+        return _JSON_NON_FINITE[repr(value)]
+
+
+def write_snbt(data, fileobj, path=None, indent=None):
+    """
+    Write uncompressed NBT data as SNBT, the text format of the Minecraft
+    commands, to a text file object.
+
+    data is a bytes-like object. path is the names of the tags separated by
+    "/" from the root compound to the tag to write (e.g. "Level/Entities"),
+    the whole root compound if None. KeyError is raised if it doesn't exist.
+    indent is the number of spaces to indent each level, None writes
+    everything in a single line.
+
+    SNBT has no NaN nor infinities. Infinite floats and doubles are written
+    as 1.0e999 (with their suffix), that is read back as infinity, and NaN
+    as the string "NaN".
+
+    The text is written while the data is walked, see iterparse(), and never
+    held as a whole, so huge lists of entities can be written with little
+    memory. Broken data raises MalformedFileError after the text before it
+    has been written.
+    """
+    data = _as_bytes(data)
+    tagid, name, pos = _find_tag(data, path)
+    write = fileobj.write
+    separator = ":" if indent is None else ": "
+    # Number of items written in every compound and list being written
+    counts = []
+    for event, tagid, name, value in _iter_events(data, pos, tagid, name):
+        if event == "end":
+            if counts.pop() and indent is not None:
+                write("\n" + " " * (indent * len(counts)))
+            write("}" if tagid == TAG_COMPOUND else "]")
+            continue
+        if counts:
+            if counts[-1]:
+                write(",")
+            counts[-1] += 1
+            if indent is not None:
+                write("\n" + " " * (indent * len(counts)))
+            if name is not None:
+                if _SNBT_BARE_NAME.match(name):
+                    write(name + separator)
+                else:
+                    write(_snbt_string(name) + separator)
+        if event == "start":
+            counts.append(0)
+            write("{" if tagid == TAG_COMPOUND else "[")
+        else:
+            write(_snbt_value(tagid, value))
+    if indent is not None:
+        write("\n")
+
+
+def write_json_lines(data, fileobj, path=None):
+    """
+    Write uncompressed NBT data as JSON lines to a text file object.
+
+    data and path are the same as in write_snbt(). Each item of the list or
+    compound in path is written in its own line, the items of a list as
+    their value and the items of a compound as an object with a single
+    name, e.g. {"DataVersion": 2975}. Other tags are written as a single
+    line with their value. Compounds are written as objects and lists and
+    arrays as arrays, the type of the tags is lost. NaN and infinities, that
+    JSON doesn't have, are written as the strings "NaN", "Infinity" and
+    "-Infinity".
+
+    As write_snbt(), the text is written while the data is walked. Broken
+    data raises MalformedFileError after the text before it has been
+    written.
+    """
+    data = _as_bytes(data)
+    tagid, name, pos = _find_tag(data, path)
+    write = fileobj.write
+    events = _iter_events(data, pos, tagid, name)
+    event, top, name, value = next(events)
+    if event == "value":
+        write(_json_value(value) + "\n")
+        return
+    # Number of items written in every compound and list being written,
+    # the first one is the tag in path
+    counts = [0]
+    for event, tagid, name, value in events:
+        if event == "end":
+            counts.pop()
+            if not counts:
+                break
+            write("}" if tagid == TAG_COMPOUND else "]")
+        else:
+            if len(counts) > 1:
+                if counts[-1]:
+                    write(",")
+                counts[-1] += 1
+                if name is not None:
+                    write(_json_value(name) + ":")
+            elif name is not None:
+                write("{" + _json_value(name) + ":")
+            if event == "start":
+                counts.append(0)
+                write("{" if tagid == TAG_COMPOUND else "[")
+                continue
+            write(_json_value(value))
+        if len(counts) == 1:
+            # An item of the tag in path ended
+            write("}\n" if top == TAG_COMPOUND else "\n")
@@ -6,14 +6,16 @@ https://minecraft.gamepedia.com/Region_file_format
 """
 
 from .nbt import NBTFile, MalformedFileError
-from struct import pack, unpack
+from struct import pack, unpack, Struct, error as struct_error
 try:
-    from collections.abc import Mapping
+    from collections.abc import Mapping, MutableMapping
 except ImportError:  # for Python 2.7
-    from collections import Mapping
+    from collections import Mapping, MutableMapping
 import zlib
 import gzip
-from io import BytesIO
+from io import BytesIO, UnsupportedOperation
+from bisect import bisect_right
+import mmap
 import time
 from os import SEEK_END
 
@@ -47,6 +49,16 @@ STATUS_CHUNK_OK = 0
 STATUS_CHUNK_NOT_CREATED = 1
 """Constant indicating an normal status: the chunk does not exist"""
 
+_HEADER_STRUCT = Struct(">1024I")
+"""Struct used to decode a whole sector of the region header at once."""
+
+_CHUNK_HEADER_STRUCT = Struct(">IB")
+"""Struct used to decode the length and compression of a chunk."""
+
+COALESCED_READ_SIZE = 1024 * 1024
+"""Maximum number of bytes read at once when reading chunks in file order,
+see :meth:`RegionFile.chunks_in_file_order`."""
+
 COMPRESSION_NONE = 0
 """Constant indicating that the chunk is not compressed."""
 COMPRESSION_GZIP = 1
@@ -82,6 +94,14 @@ class InconceivedChunk(LookupError):
     def __init__(self, msg=""):
         self.msg = msg
 
+class ChunkTooLarge(Exception):
+    """The decompressed data of a chunk is larger than the size given to get_blockdata().
+    Note: It is not a child class of RegionFileFormatError, the data itself may be fine."""
+    def __init__(self, msg=""):
+        self.msg = msg
+    def __str__(self):
+        return self.msg
+
 
 class ChunkMetadata(object):
     """
@@ -135,6 +155,64 @@ class ChunkMetadata(object):
         This includes chunks which are not readable for other reasons."""
         return self.blockstart != 0
 
+class _MetadataMap(MutableMapping):
+    """
+    Mapping of (x, z) to ChunkMetadata, used as :attr:`RegionFile.metadata`.
+
+    The values parsed from the headers are kept in flat lists indexed by
+    ``x + 32*z``. The ChunkMetadata objects are only created the first time
+    they are asked for, from then on the object holds the values.
+    """
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        """Forget every chunk, as in an empty region file."""
+        self._objects = {}
+        self.blockstart = [0] * 1024
+        self.blocklength = [0] * 1024
+        self.timestamp = [0] * 1024
+        self.length = [0] * 1024
+        self.compression = [None] * 1024
+        self.status = [STATUS_CHUNK_NOT_CREATED] * 1024
+    @staticmethod
+    def _index(xz):
+        x, z = xz
+        if not (0 <= x < 32 and 0 <= z < 32):
+            raise KeyError(xz)
+        return x + 32 * z
+    def get_status(self, x, z):
+        """Return the status of a chunk without creating its ChunkMetadata."""
+        m = self._objects.get((x, z))
+        if m is not None:
+            return m.status
+        return self.status[self._index((x, z))]
+    def __getitem__(self, xz):
+        m = self._objects.get(xz)
+        if m is None:
+            i = self._index(xz)
+            m = ChunkMetadata(*xz)
+            m.blockstart = self.blockstart[i]
+            m.blocklength = self.blocklength[i]
+            m.timestamp = self.timestamp[i]
+            m.length = self.length[i]
+            m.compression = self.compression[i]
+            m.status = self.status[i]
+            self._objects[xz] = m
+        return m
+    def __setitem__(self, xz, m):
+        self._index(xz)
+        self._objects[xz] = m
+    def __delitem__(self, xz):
+        # Forget the chunk, it becomes a not created chunk
+        self[xz] = ChunkMetadata(*xz)
+    def __iter__(self):
+        # Same order as the old dict
+        for x in range(32):
+            for z in range(32):
+                yield x, z
+    def __len__(self):
+        return 1024
+
 class _HeaderWrapper(Mapping):
     """Wrapper around self.metadata to emulate the old self.header variable"""
     def __init__(self, metadata):
@@ -193,18 +271,31 @@ class RegionFile(object):
     """Constant indicating an normal status: the chunk does not exist.
     Deprecated. Use :const:`nbt.region.STATUS_CHUNK_NOT_CREATED` instead."""
     
-    def __init__(self, filename=None, fileobj=None, chunkclass = None):
+    def __init__(self, filename=None, fileobj=None, chunkclass = None, readonly=False):
         """
         Read a region file by filename or file object. 
         If a fileobj is specified, it is not closed after use; it is the callers responibility to close it.
+
+        If readonly is True the file is opened for reading only and memory
+        mapped (or read at once if the file object can't be mapped). The
+        header and the chunks are taken from slices of the map without any
+        copy, and the methods that modify the file raise UnsupportedOperation.
         """
         self.file = None
         self.filename = None
         self._closefile = False
         self.chunkclass = chunkclass
+        self.readonly = readonly
+        self._map = None
+        self._data = None
+        # Coalesced reads, see chunks_in_file_order()
+        self._coalesce = False
+        self._runs = None
+        self._buffer = None
         if filename:
             self.filename = filename
-            self.file = open(filename, 'r+b') # open for read and write in binary mode
+            # open for read and write in binary mode, unless it's read only
+            self.file = open(filename, 'rb' if readonly else 'r+b')
             self._closefile = True
         elif fileobj:
             if hasattr(fileobj, 'name'):
@@ -212,12 +303,15 @@ class RegionFile(object):
             self.file = fileobj
         elif not self.file:
             raise ValueError("RegionFile(): Need to specify either a filename or a file object")
+        if readonly:
+            self._map_file()
 
         # Some variables
-        self.metadata = {}
+        self.metadata = _MetadataMap()
         """
-        dict containing ChunkMetadata objects, gathered from metadata found in the
-        8 kiByte header and 5-byte chunk header.
+        dict-like object containing ChunkMetadata objects, gathered from metadata
+        found in the 8 kiByte header and 5-byte chunk header. The objects are
+        created the first time they are accessed.
         
         ``metadata[x, z]: ChunkMetadata()``
         """
@@ -264,8 +358,29 @@ class RegionFile(object):
         self._parse_header()
         self._parse_chunk_headers()
 
+    def _map_file(self):
+        """Memory map the file, or read it at once if it can't be mapped."""
+        try:
+            size = self.get_size()
+            if size > 0:
+                self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data = memoryview(self._map)
+            else:
+                # empty files can't be mapped
+                self._data = memoryview(b'')
+        except (AttributeError, UnsupportedOperation, ValueError):
+            # Not a real file (e.g. BytesIO)
+            self.file.seek(0)
+            self._data = memoryview(self.file.read())
+
+    def _check_writable(self):
+        if self.readonly:
+            raise UnsupportedOperation("RegionFile(): %s was opened read only" % self.filename)
+
     def get_size(self):
         """ Returns the file size in bytes. """
+        if self._data is not None:
+            return len(self._data)
         # seek(0,2) jumps to 0-bytes from the end of the file.
         # Python 2.6 support: seek does not yet return the position.
         self.file.seek(0, SEEK_END)
@@ -287,6 +402,17 @@ class RegionFile(object):
         The method is automatically called by garbage collectors, but made public to
         allow explicit cleanup.
         """
+        if self._data is not None:
+            try:
+                self._data.release()
+                if self._map is not None:
+                    self._map.close()
+            except BufferError:
+                # Slices of the map are still in use, the garbage collector
+                # will close it when they are gone
+                pass
+            self._data = None
+            self._map = None
         if self._closefile:
             try:
                 self.file.close()
@@ -299,6 +425,8 @@ class RegionFile(object):
 
     def _init_file(self):
         """Initialise the file header. This will erase any data previously in the file."""
+        self._check_writable()
+        self._invalidate_reads()
         header_length = 2*SECTOR_LENGTH
         if self.size > header_length:
             self.file.truncate(header_length)
@@ -307,15 +435,16 @@ class RegionFile(object):
         self.size = header_length
 
     def _init_header(self):
-        for x in range(32):
-            for z in range(32):
-                self.metadata[x,z] = ChunkMetadata(x, z)
+        self.metadata.reset()
 
     def _parse_header(self):
         """Read the region header and stores: offset, length and status."""
         # update the file size, needed when parse_header is called after
         # we have unlinked a chunk or writed a new one
         self.size = self.get_size()
+        self._invalidate_reads()
+        # Nothing from a previous parse is kept, ChunkMetadata objects included
+        self.metadata.reset()
 
         if self.size == 0:
             # Some region files seems to have 0 bytes of size, and
@@ -325,64 +454,103 @@ class RegionFile(object):
         elif self.size < 2*SECTOR_LENGTH:
             raise NoRegionHeader('The region file is %d bytes, too small in size to have a header.' % self.size)
         
-        for index in range(0, SECTOR_LENGTH, 4):
-            x = int(index//4) % 32
-            z = int(index//4)//32
-            m = self.metadata[x, z]
-            
-            self.file.seek(index)
-            offset, length = unpack(">IB", b"\0" + self.file.read(4))
-            m.blockstart, m.blocklength = offset, length
-            self.file.seek(index + SECTOR_LENGTH)
-            m.timestamp = unpack(">I", self.file.read(4))[0]
-            
+        # Read both header sectors at once and decode them in bulk
+        header = self.get_header()
+        locations = _HEADER_STRUCT.unpack_from(header, 0)
+        timestamps = _HEADER_STRUCT.unpack_from(header, SECTOR_LENGTH)
+
+        md = self.metadata
+        md.timestamp = list(timestamps)
+        blockstarts = md.blockstart = [l >> 8 for l in locations]
+        blocklengths = md.blocklength = [l & 0xff for l in locations]
+        statuses = md.status
+        size = self.size
+        for i in range(1024):
+            offset = blockstarts[i]
+            length = blocklengths[i]
             if offset == 0 and length == 0:
-                m.status = STATUS_CHUNK_NOT_CREATED
+                continue # STATUS_CHUNK_NOT_CREATED
             elif length == 0:
-                m.status = STATUS_CHUNK_ZERO_LENGTH
+                statuses[i] = STATUS_CHUNK_ZERO_LENGTH
             elif offset < 2 and offset != 0:
-                m.status = STATUS_CHUNK_IN_HEADER
-            elif SECTOR_LENGTH * offset + 5 > self.size:
+                statuses[i] = STATUS_CHUNK_IN_HEADER
+            elif SECTOR_LENGTH * offset + 5 > size:
                 # Chunk header can't be read.
-                m.status = STATUS_CHUNK_OUT_OF_FILE
+                statuses[i] = STATUS_CHUNK_OUT_OF_FILE
             else:
-                m.status = STATUS_CHUNK_OK
-        
+                statuses[i] = STATUS_CHUNK_OK
+
         # Check for chunks overlapping in the file
-        for chunks in self._sectors()[2:]:
-            if len(chunks) > 1:
-                # overlapping chunks
-                for m in chunks:
-                    # Update status, unless these more severe errors take precedence
-                    if m.status not in (STATUS_CHUNK_ZERO_LENGTH, STATUS_CHUNK_IN_HEADER, 
-                                        STATUS_CHUNK_OUT_OF_FILE):
-                        m.status = STATUS_CHUNK_OVERLAPPING
+        for i in self._overlapping_chunks(blockstarts, blocklengths):
+            # Update status, unless these more severe errors take precedence
+            if statuses[i] not in (STATUS_CHUNK_ZERO_LENGTH, STATUS_CHUNK_IN_HEADER,
+                                   STATUS_CHUNK_OUT_OF_FILE):
+                statuses[i] = STATUS_CHUNK_OVERLAPPING
+
+    def _overlapping_chunks(self, blockstarts, blocklengths):
+        """
+        Return the indexes (x + 32*z) of the chunks that share at least one
+        sector with another chunk, according to the region header.
+
+        Same criteria as :meth:`_sectors`: sectors before the third one and
+        after the end of the file are not taken into account.
+        """
+        sectorsize = self._bytes_to_sector(self.size)
+        intervals = []
+        for i in range(1024):
+            start = blockstarts[i]
+            if start and blocklengths[i]:
+                begin = max(start, 2)
+                end = min(start + blocklengths[i], sectorsize)
+                if begin < end:
+                    intervals.append((begin, end, i))
+        intervals.sort()
+
+        # Sorted by start, a chunk overlaps a previous one if it starts
+        # before the farthest end seen so far, and overlaps a following one
+        # if it ends after the start of the next one.
+        overlapping = set()
+        max_end = 0
+        last = len(intervals) - 1
+        for n, (begin, end, i) in enumerate(intervals):
+            if begin < max_end:
+                overlapping.add(i)
+            if n < last and end > intervals[n + 1][0]:
+                overlapping.add(i)
+            if end > max_end:
+                max_end = end
+        return overlapping
 
     def _parse_chunk_headers(self):
-        for x in range(32):
-            for z in range(32):
-                m = self.metadata[x, z]
-                if m.status not in (STATUS_CHUNK_OK, STATUS_CHUNK_OVERLAPPING, \
-                                    STATUS_CHUNK_MISMATCHED_LENGTHS):
-                    # skip to next if status is NOT_CREATED, OUT_OF_FILE, IN_HEADER,
-                    # ZERO_LENGTH or anything else.
-                    continue
-                try:
-                    self.file.seek(m.blockstart*SECTOR_LENGTH) # offset comes in sectors of 4096 bytes
-                    length = unpack(">I", self.file.read(4))
-                    m.length = length[0] # unpack always returns a tuple, even unpacking one element
-                    compression = unpack(">B",self.file.read(1))
-                    m.compression = compression[0]
-                except IOError:
-                    m.status = STATUS_CHUNK_OUT_OF_FILE
-                    continue
-                if m.blockstart*SECTOR_LENGTH + m.length + 4 > self.size:
-                    m.status = STATUS_CHUNK_OUT_OF_FILE
-                elif m.length <= 1: # chunk can't be zero length
-                    m.status = STATUS_CHUNK_ZERO_LENGTH
-                elif m.length + 4 > m.blocklength * SECTOR_LENGTH:
-                    # There are not enough sectors allocated for the whole block
-                    m.status = STATUS_CHUNK_MISMATCHED_LENGTHS
+        md = self.metadata
+        statuses = md.status
+        data = self._data
+        # In the order of the file, so reading them is one sequential pass
+        for i in sorted(range(1024), key=md.blockstart.__getitem__):
+            if statuses[i] not in (STATUS_CHUNK_OK, STATUS_CHUNK_OVERLAPPING, \
+                                   STATUS_CHUNK_MISMATCHED_LENGTHS):
+                # skip to next if status is NOT_CREATED, OUT_OF_FILE, IN_HEADER,
+                # ZERO_LENGTH or anything else.
+                continue
+            blockstart = md.blockstart[i]
+            try:
+                if data is not None:
+                    length, compression = _CHUNK_HEADER_STRUCT.unpack_from(data, blockstart*SECTOR_LENGTH)
+                else:
+                    self.file.seek(blockstart*SECTOR_LENGTH) # offset comes in sectors of 4096 bytes
+                    length, compression = _CHUNK_HEADER_STRUCT.unpack(self.file.read(5))
+            except (IOError, struct_error):
+                statuses[i] = STATUS_CHUNK_OUT_OF_FILE
+                continue
+            md.length[i] = length
+            md.compression[i] = compression
+            if blockstart*SECTOR_LENGTH + length + 4 > self.size:
+                statuses[i] = STATUS_CHUNK_OUT_OF_FILE
+            elif length <= 1: # chunk can't be zero length
+                statuses[i] = STATUS_CHUNK_ZERO_LENGTH
+            elif length + 4 > md.blocklength[i] * SECTOR_LENGTH:
+                # There are not enough sectors allocated for the whole block
+                statuses[i] = STATUS_CHUNK_MISMATCHED_LENGTHS
 
     def _sectors(self, ignore_chunk=None):
         """
@@ -433,6 +601,92 @@ class RegionFile(object):
             i += 1
         return i
 
+    def chunks_in_file_order(self, coords=None):
+        """
+        Return a list with the coordinates of the chunks sorted by their
+        position in the file. If coords is None all the chunks with a location
+        in the region header are returned.
+
+        Reading the chunks in this order reads the file in one sequential
+        pass. After calling this method :meth:`get_blockdata` reads each run of
+        contiguous sectors with a single read (up to COALESCED_READ_SIZE bytes)
+        and takes the following chunks from it, instead of a seek and a read
+        per chunk. Read only files are memory mapped, the operating system is
+        told that they are going to be read sequentially.
+        """
+        md = self.metadata
+        if coords is None:
+            coords = [(i % 32, i // 32) for i in range(1024) if md.blockstart[i]]
+        blockstarts = md.blockstart
+        coords = sorted(coords, key=lambda xz: blockstarts[xz[0] + 32 * xz[1]])
+        self._coalesce = True
+        if self._map is not None and hasattr(self._map, 'madvise'):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        return coords
+
+    def _get_runs(self):
+        """
+        Return a tuple of two lists with the start and the end, in bytes, of
+        every run of contiguous sectors used by chunks, sorted by start.
+        """
+        if self._runs is None:
+            md = self.metadata
+            extents = []
+            for i in range(1024):
+                start = md.blockstart[i]
+                if start >= 2 and md.blocklength[i] and md.status[i] in \
+                        (STATUS_CHUNK_OK, STATUS_CHUNK_OVERLAPPING,
+                         STATUS_CHUNK_MISMATCHED_LENGTHS, STATUS_CHUNK_OUT_OF_FILE):
+                    extents.append((start * SECTOR_LENGTH,
+                                    min((start + md.blocklength[i]) * SECTOR_LENGTH, self.size)))
+            extents.sort()
+            begins, ends = [], []
+            for begin, end in extents:
+                if ends and begin <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    begins.append(begin)
+                    ends.append(end)
+            self._runs = (begins, ends)
+        return self._runs
+
+    def _read(self, start, length):
+        """
+        Return length bytes of the file from start, from the buffer of the
+        last coalesced read if possible. See :meth:`chunks_in_file_order`.
+        """
+        if self._buffer is not None:
+            begin, data = self._buffer
+            if begin <= start and start + length <= begin + len(data):
+                return memoryview(data)[start - begin:start - begin + length]
+        size = length
+        if self._coalesce:
+            begins, ends = self._get_runs()
+            n = bisect_right(begins, start) - 1
+            if n >= 0 and start < ends[n]:
+                size = max(length, min(ends[n] - start, COALESCED_READ_SIZE))
+        self.file.seek(start)
+        data = self.file.read(size)
+        if size > length:
+            self._buffer = (start, data)
+            return memoryview(data)[:length]
+        return data
+
+    def _invalidate_reads(self):
+        """Forget the coalesced reads, the file is going to change."""
+        self._runs = None
+        self._buffer = None
+
+    def get_header(self):
+        """
+        Return the raw 8 kiByte region header: the locations and the timestamps
+        of the chunks. Read only region files return a memoryview of the file.
+        """
+        if self._data is not None:
+            return self._data[:2 * SECTOR_LENGTH]
+        self.file.seek(0)
+        return self.file.read(2 * SECTOR_LENGTH)
+
     def get_metadata(self):
         """
         Return a list of the metadata of each chunk that is defined in te regionfile.
@@ -501,6 +755,13 @@ class RegionFile(object):
     def __iter__(self):
         return self.iter_chunks()
 
+    def get_status(self, x, z):
+        """
+        Return the status of the chunk as determined from the region header
+        and the chunk header. See the STATUS_CHUNK_* constants.
+        """
+        return self.metadata.get_status(x, z)
+
     def get_timestamp(self, x, z):
         """
         Return the timestamp of when this region file was last modified.
@@ -517,7 +778,7 @@ class RegionFile(object):
         """Return the number of defined chunks. This includes potentially corrupt chunks."""
         return len(self.get_metadata())
 
-    def get_blockdata(self, x, z):
+    def get_blockdata(self, x, z, max_size=None):
         """
         Return the decompressed binary data representing a chunk.
         
@@ -525,6 +786,9 @@ class RegionFile(object):
         If decompression of the data succeeds, all available data is returned, 
         even if it is shorter than what is specified in the header (e.g. in case
         of a truncated while and non-compressed data).
+
+        If max_size is given, no more than max_size + 1 bytes are decompressed,
+        and ChunkTooLarge is raised if the data is larger than max_size bytes.
         """
         # read metadata block
         m = self.metadata[x, z]
@@ -551,24 +815,40 @@ class RegionFile(object):
         err = None
         try:
             # offset comes in sectors of 4096 bytes + length bytes + compression byte
-            self.file.seek(m.blockstart * SECTOR_LENGTH + 5)
+            start = m.blockstart * SECTOR_LENGTH + 5
             # Do not read past the length of the file.
             # The length in the file includes the compression byte, hence the -1.
-            length = min(m.length - 1, self.size - (m.blockstart * SECTOR_LENGTH + 5))
-            chunk = self.file.read(length)
+            length = min(m.length - 1, self.size - start)
+            if self._data is not None:
+                # No copy, the decompressor reads the map directly
+                chunk = self._data[start:start + length]
+            else:
+                chunk = self._read(start, length)
             
             if (m.compression == COMPRESSION_GZIP):
                 # Python 3.1 and earlier do not yet support gzip.decompress(chunk)
                 f = gzip.GzipFile(fileobj=BytesIO(chunk))
-                chunk = bytes(f.read())
+                chunk = bytes(f.read(-1 if max_size is None else max_size + 1))
                 f.close()
             elif (m.compression == COMPRESSION_ZLIB):
-                chunk = zlib.decompress(chunk)
+                if max_size is None:
+                    chunk = zlib.decompress(chunk)
+                else:
+                    d = zlib.decompressobj()
+                    chunk = d.decompress(chunk, max_size + 1)
+                    if not d.eof and len(chunk) <= max_size:
+                        # zlib.decompress() raises the same
+                        raise zlib.error('incomplete or truncated stream')
             elif m.compression != COMPRESSION_NONE:
                 raise ChunkDataError('Unknown chunk compression/format (%s)' % m.compression)
+            else:
+                chunk = bytes(chunk)
+
+            if max_size is not None and len(chunk) > max_size:
+                raise ChunkTooLarge('Chunk %d,%d is larger than %d bytes' % (x, z, max_size))
             
             return chunk
-        except RegionFileFormatError:
+        except (RegionFileFormatError, ChunkTooLarge):
             raise
         except Exception as e:
             # Deliberately catch the Exception and re-raise.
@@ -585,17 +865,18 @@ class RegionFile(object):
             else:
                 raise ChunkDataError(err)
 
-    def get_nbt(self, x, z):
+    def get_nbt(self, x, z, lazy=False):
         """
         Return a NBTFile of the specified chunk.
         Raise InconceivedChunk if the chunk is not included in the file.
+        If lazy is True, the tags are parsed the first time they are used,
+        see NBTFile.parse_data().
         """
         # TODO: cache results?
         data = self.get_blockdata(x, z) # This may raise a RegionFileFormatError.
-        data = BytesIO(data)
         err = None
         try:
-            nbt = NBTFile(buffer=data)
+            nbt = NBTFile(data=data, lazy=lazy)
             if self.loc.x != None:
                 x += self.loc.x*32
             if self.loc.z != None:
@@ -608,7 +889,7 @@ class RegionFile(object):
         if err:
             raise ChunkDataError(err)
 
-    def get_chunk(self, x, z):
+    def get_chunk(self, x, z, lazy=False):
         """
         Return a NBTFile of the specified chunk.
         Raise InconceivedChunk if the chunk is not included in the file.
@@ -616,13 +897,15 @@ class RegionFile(object):
         Note: this function may be changed later to return a Chunk() rather 
         than a NBTFile() object. To keep the old functionality, use get_nbt().
         """
-        return self.get_nbt(x, z)
+        return self.get_nbt(x, z, lazy)
 
     def write_blockdata(self, x, z, data, compression=COMPRESSION_ZLIB):
         """
         Compress the data, write it to file, and add pointers in the header so it 
         can be found as chunk(x,z).
         """
+        self._check_writable()
+        self._invalidate_reads()
         if compression == COMPRESSION_GZIP:
             # Python 3.1 and earlier do not yet support `data = gzip.compress(data)`.
             compressed_file = BytesIO()
@@ -716,15 +999,18 @@ class RegionFile(object):
         """
         Pack the NBT file as binary data, and write to file in a compressed format.
         """
-        data = BytesIO()
-        nbt_file.write_file(buffer=data) # render to buffer; uncompressed
-        self.write_blockdata(x, z, data.getvalue())
+        self._check_writable()
+        # Rendered into a single bytearray, compressed without copying it
+        data = nbt_file.render_data()
+        self.write_blockdata(x, z, memoryview(data))
 
     def unlink_chunk(self, x, z):
         """
         Remove a chunk from the header of the region file.
         Fragmentation is not a problem, chunks are written to free sectors when possible.
         """
+        self._check_writable()
+        self._invalidate_reads()
         # This function fails for an empty file. If that is the case, just return.
         if self.size < 2*SECTOR_LENGTH:
             return
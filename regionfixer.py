@@ -24,15 +24,19 @@
 import argparse
 from getpass import getpass
 from multiprocessing import freeze_support
+from os.path import isfile
 import sys
 
 
 from regionfixer_core.bug_reporter import BugReporter
+from regionfixer_core.cache import ScanCache
 import regionfixer_core.constants as c
 from regionfixer_core.interactive import InteractiveLoop
+from regionfixer_core.store import ResultsStore
 from regionfixer_core.scan import (console_scan_world,
                                    console_scan_regionset,
-                                   ChildProcessException)
+                                   ChildProcessException,
+                                   ReadAhead)
 from regionfixer_core.util import entitle, is_bare_console
 from regionfixer_core.version import version_string
 from regionfixer_core import world
@@ -95,6 +99,7 @@ def delete_bad_chunks(options, scanned_obj):
                       options.delete_wrong_located,
                       options.delete_entities,
                       options.delete_shared_offset,
+                      options.delete_too_large,
                       options.delete_missing_tag]
     deleting = list(zip(options_delete, c.CHUNK_PROBLEMS))
     for delete, problem in deleting:
@@ -142,6 +147,32 @@ def delete_bad_regions(options, scanned_obj):
                 print(("No regions to delete with status: {0}".format(status)))
 
 
+def dump_bad_chunks(options, scanned_obj):
+    """ Takes a scanned object and writes all the bad chunks in text files.
+
+    Inputs:
+    options -- argparse arguments, the whole argparse.ArgumentParser() object
+    scanned_obj -- this can be a RegionSet or World objects from world.py
+
+    Returns nothing.
+
+    This function writes the chunks with every possible problem
+    in the directory given with the option --dump-chunks. Chunks
+    larger than --chunk-size-limit are skipped.
+    """
+
+    print("")
+    for problem, status, arg in c.CHUNK_PROBLEMS_ITERATOR:
+        total = scanned_obj.count_chunks(problem)
+        if total:
+            text = ' Dumping chunks with status: {0} '.format(status)
+            print(("\n{0:#^60}".format(text)))
+            counter = scanned_obj.dump_problematic_chunks(problem, options.dump_chunks,
+                                                          options.dump_format,
+                                                          options.chunk_size_limit * 1024 * 1024 or None)
+            print(("\nDumped {0} chunks with status: {1}".format(counter, status)))
+
+
 def main():
     usage = ('%(prog)s [options] <world-path> '
              '<other-world-path> ... <region-files> ...')
@@ -210,6 +241,15 @@ def main():
                         dest='replace_shared_offset',
                         action='store_true')
 
+    parser.add_argument('--replace-too-large',
+                        '--rl',
+                        help='Try to replace the chunks too large to be scanned (see '
+                             '--chunk-size-limit) using the backup directories. Can be '
+                             'only used scanning one world.',
+                        default=False,
+                        dest='replace_too_large',
+                        action='store_true')
+
     parser.add_argument('--replace-too-small',
                         '--rt',
                         help='Try to replace the region files that are too small to '
@@ -260,6 +300,14 @@ def main():
                         default=False,
                         dest='delete_shared_offset')
 
+    parser.add_argument('--delete-too-large',
+                        '--dl',
+                        help='[WARNING!] This option deletes! Delete all the chunks '
+                             'too large to be scanned, see --chunk-size-limit.',
+                        action='store_true',
+                        default=False,
+                        dest='delete_too_large')
+
     parser.add_argument('--delete-missing-tag',
                         '--dmt',
                         help='[WARNING!] This option deletes! Remove any chunks '
@@ -309,6 +357,16 @@ def main():
                         action='store',
                         type=int)
 
+    parser.add_argument('--chunk-size-limit',
+                        help='Chunks bigger than this once decompressed are not '
+                             'scanned, they are reported as too large instead. Parsing '
+                             'them would take minutes and a lot of memory in every '
+                             'worker. Use 0 to scan all the chunks. Default: 64',
+                        metavar='<MiB>',
+                        type=int,
+                        default=64,
+                        dest='chunk_size_limit')
+
     parser.add_argument('--processes',
                         '-p',
                         help='Set the number of workers to use for scanning. (default '
@@ -317,6 +375,16 @@ def main():
                         type=int,
                         default=1)
 
+    parser.add_argument('--backend',
+                        help='What scans the files using the number of workers set with '
+                             '--processes: child processes, threads in the same process, '
+                             'or auto, that uses threads for small scans (or if python '
+                             'runs without the GIL) and processes for the rest. '
+                             'Default: auto',
+                        choices=c.BACKENDS,
+                        default=c.BACKEND_AUTO,
+                        dest='backend')
+
     status_abbr = ""
     for status in c.CHUNK_PROBLEMS: 
         status_abbr += "{0}: {1}; ".format(c.CHUNK_PROBLEMS_ABBR[status], c.CHUNK_STATUS_TEXT[status])
@@ -349,6 +417,105 @@ def main():
                         default=None,
                         dest='summary')
 
+    parser.add_argument('--dump-chunks',
+                        help='Write the chunks with problems in text files in the '
+                             'specified directory, before any of the options that modify '
+                             'the world. Only the entities are written for chunks with '
+                             'too many entities. Chunks that can\'t be read or are larger '
+                             'than --chunk-size-limit are skipped. '
+                             'Entities deleted while scanning with --delete-entities are '
+                             'not written.',
+                        metavar='<directory>',
+                        type=str,
+                        default=None,
+                        dest='dump_chunks')
+
+    parser.add_argument('--dump-format',
+                        help='Format of the files written by --dump-chunks: snbt (the '
+                             'format of the Minecraft commands) or json (JSON lines, '
+                             'one line per entity or per tag of the chunk). Default: snbt',
+                        choices=c.DUMP_FORMATS,
+                        default=c.DUMP_SNBT,
+                        dest='dump_format')
+
+    parser.add_argument('--quick',
+                        '-q',
+                        help='Only read the region header and the chunk headers of '
+                             'the region files, no chunk is decompressed. Much faster '
+                             'than a full scan but only finds corrupted chunks with '
+                             'broken headers and chunks sharing offset (where both '
+                             'chunks are reported). Can\'t be used with the options '
+                             'that modify the world.',
+                        action='store_true',
+                        default=False,
+                        dest='quick')
+
+    parser.add_argument('--cache',
+                        help='Store the scan results in the specified file and use '
+                             'them in the next scans. Region files that didn\'t '
+                             'change since the last scan are not scanned again, and '
+                             'only the chunks that changed are scanned in the rest.',
+                        type=str,
+                        default=None,
+                        dest='cache')
+
+    parser.add_argument('--invalidate-cache',
+                        help='Discard all the results stored in the file used by '
+                             '--cache and scan everything again.',
+                        action='store_true',
+                        default=False,
+                        dest='invalidate_cache')
+
+    parser.add_argument('--checkpoint',
+                        help='Save the progress of the scan in the specified file every '
+                             'now and then, and when the scan is interrupted (Ctrl-C or '
+                             'a crash). Use it with --resume to continue the scan where '
+                             'it was left. The file is removed when the scan finishes.',
+                        type=str,
+                        default=None,
+                        dest='checkpoint')
+
+    parser.add_argument('--resume',
+                        help='Resume an interrupted scan using the file given with '
+                             '--checkpoint. Files changed since they were scanned are '
+                             'scanned again.',
+                        action='store_true',
+                        default=False,
+                        dest='resume')
+
+    parser.add_argument('--store',
+                        help='Save the scan results in the specified SQLite database. '
+                             'The results can be used later with --load-stored or '
+                             'queried with any SQLite client.',
+                        type=str,
+                        default=None,
+                        dest='store')
+
+    parser.add_argument('--load-stored',
+                        help='Use the results saved in the database given with --store '
+                             'instead of scanning again. Region files changed since '
+                             'they were stored, or not stored at all, are scanned.',
+                        action='store_true',
+                        default=False,
+                        dest='load_stored')
+
+    parser.add_argument('--prefetch-depth',
+                        help='Number of region files read from the disk ahead of the '
+                             'scan. Use 0 to disable it. Only used in full scans '
+                             'without --delete-entities. Default: 8',
+                        metavar='<number>',
+                        type=int,
+                        default=8,
+                        dest='prefetch_depth')
+
+    parser.add_argument('--prefetch-memory',
+                        help='Maximum amount of MiB of region files read ahead of the '
+                             'scan. Default: 256',
+                        metavar='<MiB>',
+                        type=int,
+                        default=256,
+                        dest='prefetch_memory')
+
     parser.add_argument('paths',
                         help='List with world or region paths',
                         nargs='*')
@@ -389,7 +556,8 @@ def main():
     any_chunk_replace_option = args.replace_corrupted or \
         args.replace_wrong_located or \
         args.replace_entities or \
-        args.replace_shared_offset
+        args.replace_shared_offset or \
+        args.replace_too_large
     any_region_replace_option = args.replace_too_small
 
     if False or args.summary: # removed interactive mode args.interactive
@@ -421,6 +589,77 @@ def main():
     if args.entity_limit < 0:
         parser.error("Error: The entity limit must be at least 0!")
 
+    if args.chunk_size_limit < 0:
+        parser.error("Error: The chunk size limit can't be negative")
+    chunk_size_limit = args.chunk_size_limit * 1024 * 1024 or None
+
+    if args.quick:
+        repair_options = [args.backups,
+                          args.delete_corrupted,
+                          args.delete_wrong_located,
+                          args.delete_entities,
+                          args.delete_shared_offset,
+                          args.delete_missing_tag,
+                          args.delete_too_large,
+                          args.fix_corrupted,
+                          args.fix_missing_tag,
+                          args.fix_wrong_located,
+                          args.delete_too_small]
+        if any_chunk_replace_option or any_region_replace_option or any(repair_options):
+            parser.error('Error: Can\'t use the options --replace-*, --delete-*, --fix-* '
+                         'or --backups with --quick')
+        scan_level = c.SCAN_LEVEL_QUICK
+    else:
+        scan_level = c.SCAN_LEVEL_FULL
+
+    if args.invalidate_cache and not args.cache:
+        parser.error("Error: The option --invalidate-cache needs the --cache option")
+
+    if args.load_stored and not args.store:
+        parser.error("Error: The option --load-stored needs the --store option")
+
+    if args.resume and not args.checkpoint:
+        parser.error("Error: The option --resume needs the --checkpoint option")
+
+    if args.checkpoint and args.cache:
+        parser.error("Error: Can't use --checkpoint with --cache, the cache is also "
+                     "saved when the scan is interrupted")
+
+    if args.dump_chunks and isfile(args.dump_chunks):
+        parser.error("Error: The directory given with --dump-chunks is a file")
+
+    # Load the cache with the results of previous scans
+    if args.cache:
+        scan_cache = ScanCache(args.cache, args.entity_limit, autosave=True,
+                               chunk_size_limit=chunk_size_limit)
+        if args.invalidate_cache:
+            scan_cache.invalidate()
+    elif args.checkpoint:
+        # A checkpoint is just a cache that only lives until the scan finishes
+        scan_cache = ScanCache(args.checkpoint, args.entity_limit, autosave=True,
+                               chunk_size_limit=chunk_size_limit)
+        if not args.resume:
+            scan_cache.invalidate()
+        elif len(scan_cache):
+            print("Resuming the scan, {0} region files were already scanned.".format(len(scan_cache)))
+    else:
+        scan_cache = None
+
+    if args.store:
+        results_store = ResultsStore(args.store, args.entity_limit, args.load_stored,
+                                     chunk_size_limit)
+    else:
+        results_store = None
+
+    if args.prefetch_depth < 0:
+        parser.error("Error: The prefetch depth can't be negative")
+    if args.prefetch_memory < 1:
+        parser.error("Error: The prefetch memory has to be at least 1 MiB")
+    if args.prefetch_depth and not args.delete_entities:
+        readahead = ReadAhead(args.prefetch_depth, args.prefetch_memory * 1024 * 1024)
+    else:
+        readahead = None
+
     # Do things with the option options args
     # Create a list of worlds containing the backups of the region files
     if args.backups:
@@ -435,7 +674,7 @@ def main():
     found_problems_in_regionsets = False
     found_problems_in_worlds = False
     if False: # removed args.interactive
-        ci = InteractiveLoop(world_list, regionset, args, backup_worlds)
+        ci = InteractiveLoop(world_list, regionset, args, backup_worlds, results_store)
         ci.cmdloop()
         return c.RV_OK
     else:
@@ -445,9 +684,15 @@ def main():
         if len(regionset) > 0:
 
             console_scan_regionset(regionset, args.processes, args.entity_limit,
-                                   args.delete_entities, args.verbose)
+                                   args.delete_entities, args.verbose,
+                                   scan_cache, scan_level, results_store, readahead,
+                                   args.backend, chunk_size_limit)
             print((regionset.generate_report(True)))
 
+            # Dump chunks
+            if args.dump_chunks:
+                dump_bad_chunks(args, regionset)
+
             # Delete chunks
             delete_bad_chunks(args, regionset)
 
@@ -479,13 +724,19 @@ def main():
             print((entitle(' Scanning world: {0} '.format(w_name), 0)))
 
             console_scan_world(w, args.processes, args.entity_limit,
-                               args.delete_entities, args.verbose)
+                               args.delete_entities, args.verbose,
+                               scan_cache, scan_level, results_store, readahead,
+                               args.backend, chunk_size_limit)
 
             print("")
             print((entitle('Scan results for: {0}'.format(w_name), 0)))
             print((w.generate_report(True)))
             print("")
 
+            # Dump chunks
+            if args.dump_chunks:
+                dump_bad_chunks(args, w)
+
             # Replace chunks
             if backup_worlds and len(world_list) <= 1:
                 del_ent = args.delete_entities
@@ -493,7 +744,8 @@ def main():
                 options_replace = [args.replace_corrupted,
                                    args.replace_wrong_located,
                                    args.replace_entities,
-                                   args.replace_shared_offset]
+                                   args.replace_shared_offset,
+                                   args.replace_too_large]
                 replacing = list(zip(options_replace, c.CHUNK_PROBLEMS_ITERATOR))
                 for replace, (problem, status, arg) in replacing:
                     if replace:
@@ -569,6 +821,13 @@ def main():
             except:
                 print("Something went wrong while saving the log file!")
 
+    if results_store is not None:
+        results_store.close()
+
+    # The scan has finished, nothing to resume
+    if args.checkpoint:
+        scan_cache.invalidate()
+
     if found_problems_in_regionsets or found_problems_in_worlds:
         return c.RV_BAD_WORLD
 
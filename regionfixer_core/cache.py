@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import pickle
+from os import stat, remove, replace
+from os.path import abspath, exists
+from time import time
+
+import regionfixer_core.constants as c
+
+
+# Bump this every time the format of the stored results changes, old
+# cache files will be silently discarded.
+CACHE_VERSION = 4
+
+# Minimum time in seconds between two automatic saves of a cache, see
+# ScanCache. Saving is never allowed to take more than a tenth of the time.
+AUTOSAVE_INTERVAL = 60
+
+
+def get_file_identity(path):
+    """ Returns a tuple that identifies the current state of a file.
+
+    Inputs:
+     - path -- String with the path of the file.
+
+    Return:
+     - identity -- Tuple (size, modification time in ns, inode). If any of
+                   these changes the file has to be scanned again.
+
+    """
+
+    st = stat(path)
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class ScanCache:
+    """ Persistent cache of region file scan results.
+
+    Inputs:
+     - path -- String with the path of the file used to store the cache.
+     - entity_limit -- Integer, the entity limit used in the scan. Results
+                       stored with a different entity limit are discarded.
+     - autosave -- Boolean, if True the cache is saved every now and then
+                   while results are stored (see AUTOSAVE_INTERVAL), so an
+                   interrupted scan can be resumed.
+     - chunk_size_limit -- Integer or None, the chunk size limit used in the
+                           scan. Results stored with a different limit are
+                           discarded.
+
+    The cache stores the ScannedRegionFile objects returned by the scan
+    keyed by the absolute path of the region file. Each of them carries the
+    identity of the file (see get_file_identity()) and a copy of the 8KiB
+    region header as they were at scan time.
+
+    If the identity of a region file hasn't changed the stored results are
+    used as they are. If it has changed the stored results are passed to
+    scan_region_file() which only decompresses the chunks whose entry in
+    the region header (offset, sector count or timestamp) has changed.
+
+    """
+
+    def __init__(self, path, entity_limit, autosave=False, chunk_size_limit=None):
+        self.path = path
+        self.entity_limit = entity_limit
+        self.chunk_size_limit = chunk_size_limit
+        self.autosave = autosave
+        self._regions = {}
+        self._next_save = time() + AUTOSAVE_INTERVAL
+        self.load()
+
+    def __len__(self):
+        return len(self._regions)
+
+    def load(self):
+        """ Loads the cache file. A missing or unusable file means an empty cache. """
+
+        self._regions = {}
+        if not exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            print("Warning: The cache file {0} can't be read. Ignoring it.".format(self.path))
+            return
+        if (not isinstance(data, dict) or
+                data.get('version') != CACHE_VERSION or
+                data.get('entity_limit') != self.entity_limit or
+                data.get('chunk_size_limit') != self.chunk_size_limit):
+            # Different format or limits, the results are useless
+            return
+        self._regions = data['regions']
+
+    def save(self):
+        """ Writes the cache to disk.
+
+        The cache is written to a temporary file first and then moved over
+        the old one, so an interrupted save never leaves a broken cache.
+
+        """
+
+        start = time()
+        data = {'version': CACHE_VERSION,
+                'entity_limit': self.entity_limit,
+                'chunk_size_limit': self.chunk_size_limit,
+                'regions': self._regions}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        replace(tmp_path, self.path)
+        end = time()
+        self._next_save = end + max(AUTOSAVE_INTERVAL, 10 * (end - start))
+
+    def invalidate(self):
+        """ Removes all the stored results and the cache file. """
+
+        self._regions = {}
+        if exists(self.path):
+            remove(self.path)
+
+    def get(self, path):
+        """ Returns the cached ScannedRegionFile for path or None. """
+
+        return self._regions.get(abspath(path))
+
+    def store(self, scanned_regionfile):
+        """ Stores the results of a region file scan.
+
+        Inputs:
+         - scanned_regionfile -- ScannedRegionFile object as returned by
+                                 scan_region_file(). Results without a file
+                                 identity are not stored.
+
+        """
+
+        r = scanned_regionfile
+        if r.scanned and r.identity is not None:
+            self._regions[abspath(r.path)] = r
+            if self.autosave and time() >= self._next_save:
+                self.save()
+
+    def is_unchanged(self, cached, remove_entities, scan_level=c.SCAN_LEVEL_FULL):
+        """ Returns True if the cached results can be used without scanning.
+
+        See is_result_usable().
+
+        """
+
+        return is_result_usable(cached, remove_entities, scan_level)
+
+
+def is_result_usable(scanned_regionfile, remove_entities, scan_level=c.SCAN_LEVEL_FULL):
+    """ Returns True if stored scan results can be used without scanning.
+
+    Inputs:
+     - scanned_regionfile -- ScannedRegionFile with results of a previous scan
+     - remove_entities -- Boolean, True if the entities are going to be
+                          removed while scanning.
+     - scan_level -- One of the SCAN_LEVEL_* constants, the level of the
+                     scan that is going to be done.
+
+    The region file must have the same identity as when it was scanned.
+    If entities are going to be removed, results with chunks with too many
+    entities need a scan to actually remove them. Results of a quick scan
+    are never used for a full scan.
+
+    """
+
+    r = scanned_regionfile
+    if r.scan_level != scan_level and r.scan_level != c.SCAN_LEVEL_FULL:
+        return False
+    try:
+        if r.identity is None or r.identity != get_file_identity(r.path):
+            return False
+    except OSError:
+        return False
+    if remove_entities and r.count_chunks(c.CHUNK_TOO_MANY_ENTITIES):
+        return False
+    return True
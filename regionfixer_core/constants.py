@@ -47,6 +47,7 @@ CHUNK_WRONG_LOCATED = 2
 CHUNK_TOO_MANY_ENTITIES = 3
 CHUNK_SHARED_OFFSET = 4
 CHUNK_MISSING_ENTITIES_TAG = 5
+CHUNK_TOO_LARGE = 6
 
 # Chunk statuses
 CHUNK_STATUSES = [CHUNK_NOT_CREATED,
@@ -55,13 +56,15 @@ CHUNK_STATUSES = [CHUNK_NOT_CREATED,
                   CHUNK_WRONG_LOCATED,
                   CHUNK_TOO_MANY_ENTITIES,
                   CHUNK_SHARED_OFFSET,
-                  CHUNK_MISSING_ENTITIES_TAG]
+                  CHUNK_MISSING_ENTITIES_TAG,
+                  CHUNK_TOO_LARGE]
 
 # Status that are considered problems
 CHUNK_PROBLEMS = [CHUNK_CORRUPTED,
                   CHUNK_WRONG_LOCATED,
                   CHUNK_TOO_MANY_ENTITIES,
                   CHUNK_SHARED_OFFSET,
+                  CHUNK_TOO_LARGE,
                   CHUNK_MISSING_ENTITIES_TAG]
 
 # Text describing each chunk status
@@ -71,7 +74,8 @@ CHUNK_STATUS_TEXT = {CHUNK_NOT_CREATED: "Not created",
                      CHUNK_WRONG_LOCATED: "Wrong located",
                      CHUNK_TOO_MANY_ENTITIES: "Too many entities",
                      CHUNK_SHARED_OFFSET: "Sharing offset",
-                     CHUNK_MISSING_ENTITIES_TAG: "Missing Entities tag"
+                     CHUNK_MISSING_ENTITIES_TAG: "Missing Entities tag",
+                     CHUNK_TOO_LARGE: "Too large"
                      }
 
 # arguments used in the options
@@ -79,7 +83,8 @@ CHUNK_PROBLEMS_ARGS = {CHUNK_CORRUPTED: 'corrupted',
                        CHUNK_WRONG_LOCATED: 'wrong',
                        CHUNK_TOO_MANY_ENTITIES: 'entities',
                        CHUNK_SHARED_OFFSET: 'sharing',
-                       CHUNK_MISSING_ENTITIES_TAG: 'miss_tag'
+                       CHUNK_MISSING_ENTITIES_TAG: 'miss_tag',
+                       CHUNK_TOO_LARGE: 'too_large'
                        }
 
 # used in some places where there is less space
@@ -87,7 +92,8 @@ CHUNK_PROBLEMS_ABBR = {CHUNK_CORRUPTED: 'c',
                        CHUNK_WRONG_LOCATED: 'w',
                        CHUNK_TOO_MANY_ENTITIES: 'tme',
                        CHUNK_SHARED_OFFSET: 'so',
-                       CHUNK_MISSING_ENTITIES_TAG: 'mt'
+                       CHUNK_MISSING_ENTITIES_TAG: 'mt',
+                       CHUNK_TOO_LARGE: 'tl'
                        }
 
 # Dictionary with possible solutions for the chunks problems,
@@ -102,7 +108,8 @@ CHUNK_PROBLEMS_SOLUTIONS = {CHUNK_CORRUPTED: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUT
                        CHUNK_WRONG_LOCATED: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUTION_REPLACE, CHUNK_SOLUTION_RELOCATE_USING_DATA],
                        CHUNK_TOO_MANY_ENTITIES: [CHUNK_SOLUTION_REMOVE_ENTITIES],
                        CHUNK_SHARED_OFFSET: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUTION_REPLACE],
-                       CHUNK_MISSING_ENTITIES_TAG: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUTION_REPLACE]}
+                       CHUNK_MISSING_ENTITIES_TAG: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUTION_REPLACE],
+                       CHUNK_TOO_LARGE: [CHUNK_SOLUTION_REMOVE, CHUNK_SOLUTION_REPLACE]}
 
 # chunk problems that can be fixed (so they don't need to be removed or replaced)
 FIXABLE_CHUNK_PROBLEMS = [CHUNK_CORRUPTED, CHUNK_MISSING_ENTITIES_TAG, CHUNK_WRONG_LOCATED]
@@ -187,6 +194,50 @@ REGION_PROBLEMS_ARGS = {REGION_TOO_SMALL: 'too-small'}
 
 
 
+# -------------------
+# Scan level related:
+# -------------------
+# Used to mark how deep a region file has been scanned:
+SCAN_LEVEL_FULL = 300  # every chunk is decompressed and parsed
+SCAN_LEVEL_QUICK = 301  # only the region header and the chunk headers are read
+
+# Text describing each scan level
+SCAN_LEVEL_TEXT = {SCAN_LEVEL_FULL: "Full",
+                   SCAN_LEVEL_QUICK: "Quick"
+                   }
+
+
+# ----------------
+# Backend related:
+# ----------------
+# What runs the scan of the files:
+BACKEND_PROCESSES = 'processes'  # a pool of child processes
+BACKEND_THREADS = 'threads'  # a pool of threads in the same process
+BACKEND_AUTO = 'auto'  # one of the above depending on the scan, see choose_backend() in scan.py
+
+BACKENDS = [BACKEND_AUTO, BACKEND_PROCESSES, BACKEND_THREADS]
+
+
+# --------------
+# Chunk dumps:
+# --------------
+# Text formats of the problematic chunks written by --dump-chunks
+DUMP_SNBT = 'snbt'  # SNBT, the format of the Minecraft commands, indented
+DUMP_JSON = 'json'  # JSON lines, one line per entity or per tag of the chunk
+
+DUMP_FORMATS = [DUMP_SNBT, DUMP_JSON]
+
+# Extension of the dump files
+DUMP_EXTENSIONS = {DUMP_SNBT: '.snbt',
+                   DUMP_JSON: '.jsonl'
+                   }
+
+# Spaces per level in the SNBT dumps
+DUMP_SNBT_INDENT = 2
+
+
+
+
 # ------------------
 # Data file related:
 # ------------------
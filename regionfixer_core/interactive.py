@@ -30,7 +30,7 @@ from regionfixer_core.scan import console_scan_world, console_scan_regionset
 
 
 class InteractiveLoop(Cmd):
-    def __init__(self, world_list, regionset, options, backup_worlds):
+    def __init__(self, world_list, regionset, options, backup_worlds, store=None):
         Cmd.__init__(self)
         self.world_list = world_list
         self.regionset = regionset
@@ -44,6 +44,8 @@ class InteractiveLoop(Cmd):
             self.current = None
         self.options = options
         self.backup_worlds = backup_worlds
+        # ResultsStore from store.py, used by scan and load
+        self.store = store
         self.prompt = "#-> "
         self.intro = ("Minecraft Region-Fixer interactive mode.\n(Use tab to "
                       "autocomplete. Type help for a list of commands.)\n")
@@ -202,6 +204,7 @@ class InteractiveLoop(Cmd):
         # TODO: what about scanning while deleting entities as done in non-interactive mode?
         # this would need an option to choose which of the two methods use
         o = self.options
+        chunk_size_limit = o.chunk_size_limit * 1024 * 1024 or None
         if len(arg.split()) > 0:
             print("Error: too many parameters.")
         else:
@@ -210,15 +213,40 @@ class InteractiveLoop(Cmd):
                     self.current = world.World(self.current.path)
                     console_scan_world(self.current, o.processes,
                                        o.entity_limit, o.delete_entities,
-                                       o.verbose)
+                                       o.verbose, store=self.store,
+                                       backend=o.backend,
+                                       chunk_size_limit=chunk_size_limit)
                 elif isinstance(self.current, world.RegionSet):
                     print("\n{0:-^60}".format(' Scanning region files '))
                     console_scan_regionset(self.current, o.processes,
                                            o.entity_limit, o.delete_entities,
-                                           o.verbose)
+                                           o.verbose, store=self.store,
+                                           backend=o.backend,
+                                           chunk_size_limit=chunk_size_limit)
             else:
                 print("No world set! Use \'set workload\'")
 
+    def do_load(self, arg):
+        """ Loads the results of the current workload from the results store. """
+        if len(arg.split()) > 0:
+            print("Error: too many parameters.")
+        elif self.store is None:
+            print("There is no results store! Use the option --store to set one.")
+        elif self.current:
+            if isinstance(self.current, world.World):
+                self.current = world.World(self.current.path)
+                missing = self.store.load_world(self.current)
+            else:
+                self.current = world.RegionSet(region_list=self.current.region_list)
+                self.regionset = self.current
+                missing = self.store.load_regionset(self.current)
+            if missing:
+                print("There are no usable stored results for {0} files. Use \'scan\' to scan them.".format(missing))
+            else:
+                print("Loaded the results of all the files.")
+        else:
+            print("No world set! Use \'set workload\'")
+
     def do_count_chunks(self, arg):
         """ Counts the number of chunks with the given problem and
             prints the result """
@@ -314,6 +342,29 @@ class InteractiveLoop(Cmd):
         else:
             print("The world hasn't be scanned (or it needs a rescan). Use \'scan\' to scan it.")
 
+    def do_dump_chunks(self, arg):
+        chunk_size_limit = self.options.chunk_size_limit * 1024 * 1024 or None
+        if self.current and self.current.scanned:
+            args = arg.split()
+            if len(args) == 0:
+                print("Possible arguments are: {0}".format(self.possible_chunk_args_text))
+            elif len(args) == 1:
+                print("Error: the directory to write the chunks is missing.")
+            elif len(args) > 2:
+                print("Error: too many parameters.")
+            else:
+                status_arg, directory = args
+                if status_arg in list(c.CHUNK_PROBLEMS_ARGS.values()) or status_arg == 'all':
+                    for problem, status_text, a in c.CHUNK_PROBLEMS_ITERATOR:
+                        if status_arg == 'all' or status_arg == a:
+                            n = self.current.dump_problematic_chunks(problem, directory, self.options.dump_format,
+                                                                     chunk_size_limit)
+                            print("Dumped {0} chunks with status \'{1}\'.\n".format(n, status_text))
+                else:
+                    print("Unknown argument.")
+        else:
+            print("The world hasn't be scanned (or it needs a rescan). Use \'scan\' to scan it.")
+
     def do_replace_chunks(self, arg):
         el = self.options.entity_limit
         de = self.options.delete_entities
@@ -415,6 +466,10 @@ class InteractiveLoop(Cmd):
         possible_args = list(c.CHUNK_PROBLEMS_ARGS.values()) + ['all']
         return self.complete_arg(text, possible_args)
 
+    def complete_dump_chunks(self, text, line, begidx, endidx):
+        possible_args = list(c.CHUNK_PROBLEMS_ARGS.values()) + ['all']
+        return self.complete_arg(text, possible_args)
+
     def complete_replace_chunks(self, text, line, begidx, endidx):
         possible_args = list(c.CHUNK_PROBLEMS_ARGS.values()) + ['all']
         return self.complete_arg(text, possible_args)
@@ -458,6 +513,9 @@ class InteractiveLoop(Cmd):
     def help_scan(self):
         print("\nScans the current world set or the region set.\n")
 
+    def help_load(self):
+        print("\nLoads the stored results of the current world set or region set, without scanning it. Needs the option --store.\n")
+
     def help_count_chunks(self):
         print("\n   Prints out the number of chunks with the given status. For example")
         print("\'count corrupted\' prints the number of corrupted chunks in the world.")
@@ -481,6 +539,17 @@ class InteractiveLoop(Cmd):
         print("Possible status are: {0}\n".format(self.possible_chunk_args_text))
         print()
 
+    def help_dump_chunks(self):
+        print("\nWrites the chunks with the given problem in text files in the given directory.")
+        print()
+        print("Example: \"dump_chunks entities dump\"")
+        print()
+        print("this will write the entities of the chunks with too many entities in the")
+        print("directory \"dump\", a file per chunk. The format of the files is the one")
+        print("given with --dump-format.")
+        print()
+        print("Possible status are: {0}\n".format(self.possible_chunk_args_text))
+
     def help_replace_chunks(self):
         print("\nReplaces bad chunks with the given status using the backups directories.")
         print()
@@ -25,9 +25,13 @@
 import sys
 import logging
 import multiprocessing
-from os.path import split, abspath, join
-from time import sleep, time
+from multiprocessing.pool import ThreadPool
+from os.path import split, abspath, join, getsize
+from time import time
 from copy import copy
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from traceback import extract_tb
 
 import nbt.region as region
@@ -36,14 +40,15 @@ from nbt.nbt import MalformedFileError
 from nbt.region import (ChunkDataError,
                         ChunkHeaderError,
                         RegionHeaderError,
-                        InconceivedChunk)
+                        InconceivedChunk,
+                        ChunkTooLarge)
 
 from progressbar import ProgressBar, Bar, AdaptiveETA, SimpleProgress
 
 import regionfixer_core.constants as c
 from regionfixer_core.util import entitle
 from regionfixer_core import world
-
+from regionfixer_core.cache import get_file_identity
 
 
 logging.basicConfig(filename=None, level=logging.CRITICAL)
@@ -54,7 +59,8 @@ class ChildProcessException(Exception):
 
     Inputs:
      - partial_scanned_file -- ScannedObject from world.py partially filled with 
-                               the results of the scan
+                               the results of the scan, or the path of the
+                               file if the object couldn't be created
      - exc_type -- Type of the exception being handled, extracted from sys.exc_info()
      - exc_class -- The exception instance, extracted from sys.exc_info()
      - tb_text -- The traceback text, extracted from traceback object from sys.exc_info()
@@ -66,6 +72,10 @@ class ChildProcessException(Exception):
     #TODO: not sure about the tb_text argument is that.
     def __init__(self, partial_scanned_file, exc_type, exc_class, tb_text):
         self.scanned_file = partial_scanned_file
+        if isinstance(partial_scanned_file, str):
+            self.filename = split(partial_scanned_file)[1]
+        else:
+            self.filename = partial_scanned_file.filename
         self.exc_type = exc_type
         self.exc_class = exc_class
         self.tb_text = tb_text
@@ -85,10 +95,9 @@ class ChildProcessException(Exception):
         """
 
         text = ""
-        scanned_file = self.scanned_file
         text += "*" * 10 + "\n"
         text += "*** Exception while scanning:" + "\n"
-        text += "*** " + str(scanned_file.filename) + "\n"
+        text += "*** " + str(self.filename) + "\n"
         text += "*" * 10 + "\n"
         text += "*** Printing the child's traceback:" + "\n"
         text += "*** Exception:" + str(self.exc_type) + str(self.exc_class) + "\n"
@@ -112,8 +121,7 @@ class ChildProcessException(Exception):
 
         f = open(filename, 'w')
         error_log_path = abspath(f.name)
-        filename = self.scanned_file.filename
-        f.write("Error while scanning: {0}\n".format(filename))
+        f.write("Error while scanning: {0}\n".format(self.filename))
         f.write(self.printable_traceback)
         f.write('\n')
         f.close()
@@ -121,36 +129,64 @@ class ChildProcessException(Exception):
         return error_log_path
 
 
+def multiprocess_scan_batch(batch):
+    """ Scans a batch of jobs in a child process.
+
+    The batch is a tuple (scan_function, jobs), the results of calling
+    scan_function for every job are returned in a list. See
+    AsyncScanner.scan().
+
+    """
+
+    scan_function, jobs = batch
+    return [scan_function(job) for job in jobs]
+
+
 def multiprocess_scan_data(data):
     """ Does the multithread stuff for scan_data """
     # Protect everything so an exception will be returned from the worker
     try:
-        result = scan_data(data)
-        multiprocess_scan_data.q.put(result)
+        return scan_data(data)
     except KeyboardInterrupt as e:
         raise e
     except:
         except_type, except_class, tb = sys.exc_info()
-        s = (data, (except_type, except_class, extract_tb(tb)))
-        multiprocess_scan_data.q.put(s)
+        return (data, (except_type, except_class, extract_tb(tb)))
+
+
+def multiprocess_scan_regionfile(work_item):
+    """ Does the multithread stuff for scan_region_file
+
+    The work item is a tuple (path, previous, chunk_range) where path is the
+    path of the region file, previous is the cached result of a previous scan
+    of the same file or None, and chunk_range is the range of chunks to scan
+    or None, see scan_region_file().
 
+    The results are returned as a record, see ScannedRegionFile.to_record().
 
-def multiprocess_scan_regionfile(region_file):
-    """ Does the multithread stuff for scan_region_file """
+    """
+    path, previous, chunk_range = work_item
+    # Returned with the exception if the ScannedRegionFile can't be created
+    region_file = path
     # Protect everything so an exception will be returned from the worker
     try:
-        r = region_file
+        region_file = world.ScannedRegionFile(path)
         entity_limit = multiprocess_scan_regionfile.entity_limit
         remove_entities = multiprocess_scan_regionfile.remove_entities
+        keep_stamps = multiprocess_scan_regionfile.use_cache
+        scan_level = multiprocess_scan_regionfile.scan_level
+        chunk_size_limit = multiprocess_scan_regionfile.chunk_size_limit
         # call the normal scan_region_file with this parameters
-        r = scan_region_file(r, entity_limit, remove_entities)
-        multiprocess_scan_regionfile.q.put(r)
+        r = scan_region_file(region_file, entity_limit, remove_entities, previous,
+                             keep_stamps, scan_level, chunk_range, chunk_size_limit)
+        if isinstance(r, tuple):
+            return r
+        return r.to_record(chunk_range or (0, 32))
     except KeyboardInterrupt as e:
         raise e
     except:
         except_type, except_class, tb = sys.exc_info()
-        s = (region_file, (except_type, except_class, extract_tb(tb)))
-        multiprocess_scan_regionfile.q.put(s)
+        return (region_file, (except_type, except_class, extract_tb(tb)))
 
 
 def _mp_data_pool_init(d):
@@ -159,14 +195,99 @@ def _mp_data_pool_init(d):
     Inputs:
     - d -- Dictionary containing the information to copy to the function of the child process.
 
-    This function adds the queue to each of the child processes objects. This queue
-    is used to get the results from the child process. 
+    Nothing to copy at the moment, the results are returned by the pool.
 
     """
 
     assert isinstance(d, dict)
-    assert 'queue' in d
-    multiprocess_scan_data.q = d['queue']
+
+
+def _regionset_init_args(entity_limit, remove_entities, use_cache, scan_level,
+                         chunk_size_limit=None):
+    """ Returns the dictionary used to initialize the pools scanning region files.
+
+    See AsyncRegionsetScanner for the meaning of the arguments,
+    use_cache is True if the results have to be cached or stored.
+
+    """
+
+    init_args = {}
+    init_args['entity_limit'] = entity_limit
+    init_args['remove_entities'] = remove_entities
+    init_args['use_cache'] = use_cache
+    init_args['scan_level'] = scan_level
+    init_args['chunk_size_limit'] = chunk_size_limit
+    return init_args
+
+
+def create_pool(processes, entity_limit, remove_entities=False, use_cache=False,
+                scan_level=c.SCAN_LEVEL_FULL, backend=c.BACKEND_PROCESSES,
+                chunk_size_limit=None):
+    """ Creates a pool of child processes able to scan any type of file.
+
+    Inputs:
+     - processes -- Integer with the number of child processes.
+     - entity_limit, remove_entities, scan_level, chunk_size_limit -- Options
+                    of the scan of the region files, see AsyncRegionsetScanner.
+     - use_cache -- Boolean, True if the results of the region files are
+                    going to be cached or stored.
+     - backend -- BACKEND_PROCESSES or BACKEND_THREADS from constants.py.
+                  With threads the files are scanned by a pool of threads
+                  in this process, see choose_backend().
+
+    Return:
+     - pool -- A multiprocessing.Pool, or a ThreadPool, to pass to the
+               scanners.
+
+    Several scanners can share the pool. All of them can be started at
+    once, the child processes work on the files of the next scanner while
+    the results of the first one are consumed. The creator of the pool
+    has to terminate it after the scan.
+
+    """
+
+    assert backend in (c.BACKEND_PROCESSES, c.BACKEND_THREADS)
+    init_args = _regionset_init_args(entity_limit, remove_entities, use_cache, scan_level,
+                                     chunk_size_limit)
+    if backend == c.BACKEND_THREADS:
+        pool_class = ThreadPool
+    else:
+        pool_class = multiprocessing.Pool
+    return pool_class(processes=processes,
+                      initializer=_mp_regionset_pool_init,
+                      initargs=(init_args,))
+
+
+def is_free_threaded():
+    """ Returns True if the interpreter runs without the GIL. """
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def choose_backend(backend, number_of_files):
+    """ Returns the backend to use for a scan.
+
+    Inputs:
+     - backend -- One of the BACKEND_* constants.
+     - number_of_files -- Integer, number of files going to be scanned.
+
+    Return:
+     - backend -- BACKEND_PROCESSES or BACKEND_THREADS.
+
+    BACKEND_AUTO uses threads when the interpreter is free-threaded, or when
+    there are so few files (see THREADS_MAX_FILES) that starting the child
+    processes and sending them the files and the results takes longer than
+    scanning. Otherwise it uses processes, with the GIL only decompressing
+    with zlib runs in parallel in threads, parsing the NBT data doesn't.
+
+    """
+
+    if backend != c.BACKEND_AUTO:
+        return backend
+    if is_free_threaded() or number_of_files <= THREADS_MAX_FILES:
+        return c.BACKEND_THREADS
+    return c.BACKEND_PROCESSES
 
 
 def _mp_regionset_pool_init(d):
@@ -175,20 +296,124 @@ def _mp_regionset_pool_init(d):
     Inputs:
     - d -- Dictionary containing the information to copy to the function of the child process.
 
-    This function adds the queue to each of the child processes objects. This queue
-    is used to get the results from the child process. 
+    This function adds the scan options to each of the child processes objects.
 
     """
 
     assert isinstance(d, dict)
-    assert 'regionset' in d
-    assert 'queue' in d
     assert 'entity_limit' in d
     assert 'remove_entities' in d
-    multiprocess_scan_regionfile.regionset = d['regionset']
-    multiprocess_scan_regionfile.q = d['queue']
+    assert 'use_cache' in d
+    assert 'scan_level' in d
+    assert 'chunk_size_limit' in d
     multiprocess_scan_regionfile.entity_limit = d['entity_limit']
     multiprocess_scan_regionfile.remove_entities = d['remove_entities']
+    multiprocess_scan_regionfile.use_cache = d['use_cache']
+    multiprocess_scan_regionfile.chunk_size_limit = d['chunk_size_limit']
+    multiprocess_scan_regionfile.scan_level = d['scan_level']
+
+
+class ReadAhead:
+    """ Reads region files ahead of the child processes scanning them.
+
+    Inputs:
+     - depth -- Integer, maximum number of region files read ahead and not
+                yet scanned. Also the number of threads reading them.
+     - max_bytes -- Integer, maximum number of bytes read ahead and not yet
+                    scanned. Files bigger than this are not read ahead.
+
+    The files are read in big sequential blocks by a small pool of threads
+    in the main process. That loads them in the memory of the operating
+    system (the page cache), shared with the child processes, so while a
+    child process decompresses a region file the next ones are being read
+    from the disk. The child processes map the region files (see
+    scan_region_file()), so they get the data straight from there.
+
+    Files are read in the order they are added. Every file counts towards
+    the limits until release() is called for it, when its results arrive.
+    Only to be used from the thread consuming the results.
+
+    """
+
+    # Size of the reads of the threads
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, depth, max_bytes):
+        assert depth > 0
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self._executor = None
+        # Paths waiting to be read, paths already scanned that are still
+        # in _waiting, and sizes of the paths read (or being read) ahead
+        self._waiting = deque()
+        self._released = set()
+        self._in_flight = {}
+        self._bytes = 0
+
+    def add(self, paths):
+        """ Adds region files to read, after the ones already added. """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.depth)
+        self._waiting.extend(paths)
+        self._fill()
+
+    def release(self, path):
+        """ Tells that path has been scanned, frees its part of the limits. """
+
+        size = self._in_flight.pop(path, None)
+        if size is None:
+            # Scanned before its turn to be read
+            self._released.add(path)
+        else:
+            self._bytes -= size
+        self._fill()
+
+    def close(self):
+        """ Stops reading files, it can be used again with add(). """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._waiting.clear()
+        self._released.clear()
+        self._in_flight.clear()
+        self._bytes = 0
+
+    def _fill(self):
+        """ Starts reading files until one of the limits is reached. """
+
+        while self._waiting and len(self._in_flight) < self.depth:
+            path = self._waiting[0]
+            if path in self._released:
+                self._released.discard(path)
+                self._waiting.popleft()
+                continue
+            try:
+                size = getsize(path)
+            except OSError:
+                size = 0
+            if size > self.max_bytes:
+                self._waiting.popleft()
+                continue
+            if self._bytes + size > self.max_bytes:
+                break
+            self._waiting.popleft()
+            self._in_flight[path] = size
+            self._bytes += size
+            self._executor.submit(self._read, path)
+
+    def _read(self, path):
+        """ Reads the whole file, the data is left in the page cache. """
+
+        buf = bytearray(self.BLOCK_SIZE)
+        try:
+            with open(path, 'rb') as f:
+                while f.readinto(buf):
+                    pass
+        except OSError:
+            # The child process will find out
+            pass
 
 
 class AsyncScanner:
@@ -200,6 +425,9 @@ class AsyncScanner:
      - scan_function -- Function used to scan the data
      - init_args -- These are the initialization arguments passed to __init__
      - _mp_init_function -- Function used to initialize the child processes
+     - pool -- A pool as returned by create_pool() or None. If None, the
+               scanner creates its own pool with the given init_args and
+               _mp_init_function.
     
     To implement a scanner you have to override:
     update_str_last_scanned()
@@ -207,10 +435,17 @@ class AsyncScanner:
     It's imperative to use try-finally to call terminate at the end of the run,
     if not processes will be hanging in the background for all eternity.
 
+    The results are delivered by the pool as soon as they are ready, the
+    calls to get_last_result() block until a result arrives (or until the
+    timeout expires). No polling involved.
+
+    Jobs are scanned from the most to the less expensive, as estimated by
+    _job_cost(), so the big files never start at the end of the scan.
+
     """
 
     def __init__(self, data_structure, processes, scan_function, init_args,
-                 _mp_init_function):
+                 _mp_init_function, pool=None):
         """ Init the scanner """
         assert isinstance(data_structure, world.DataSet)
         self.data_structure = data_structure
@@ -218,24 +453,21 @@ class AsyncScanner:
         self.processes = processes
         self.scan_function = scan_function
 
-        # Queue used by processes to pass results
-        self.queue = multiprocessing.SimpleQueue()
-        init_args.update({'queue': self.queue})
         # NOTE TO SELF: initargs doesn't handle kwargs, only args!
         # Pass a dict with all the args
-        self.pool = multiprocessing.Pool(processes=processes,
-                                         initializer=_mp_init_function,
-                                         initargs=(init_args,))
-
-        # Recommended time to sleep between polls for results
-        self.SCAN_START_SLEEP_TIME = 0.001
-        self.SCAN_MIN_SLEEP_TIME = 1e-6
-        self.SCAN_MAX_SLEEP_TIME = 0.1
-        self.scan_sleep_time = self.SCAN_START_SLEEP_TIME
-        self.queries_without_results = 0
-        self.last_time = time()
-        self.MIN_QUERY_NUM = 1
-        self.MAX_QUERY_NUM = 5
+        self._own_pool = pool is None
+        if self._own_pool:
+            pool = multiprocessing.Pool(processes=processes,
+                                        initializer=_mp_init_function,
+                                        initargs=(init_args,))
+        self.pool = pool
+
+        # Iterator with the batches of results of the pool, results of the
+        # last batch not yet delivered (in reverse order) and number of
+        # results not yet delivered
+        self._results = None
+        self._ready = []
+        self._pending = 0
 
         # Holds a friendly string with the name of the last file scanned
         self._str_last_scanned = None
@@ -248,43 +480,92 @@ class AsyncScanner:
         logging.debug("Starting scan in: %s", str(self))
         logging.debug("########################################################")
         logging.debug("########################################################")
-        # Tests indicate that smaller amount of jobs per worker make all type
-        # of scans faster
-        jobs_per_worker = 5
-        # jobs_per_worker = max(1, total_files // self.processes
-        self._results = self.pool.map_async(self.scan_function,
-                                            self.list_files_to_scan,
-                                            jobs_per_worker)
+        # Longest job first, see _make_batches(). imap_unordered() only
+        # returns an iterator with a timeout in next() with a chunksize of
+        # one, so the jobs are grouped in batches here instead.
+        costs = [self._job_cost(j) for j in self.list_files_to_scan]
+        order = sorted(range(len(costs)), key=costs.__getitem__, reverse=True)
+        jobs = [self.list_files_to_scan[i] for i in order]
+        batches = _make_batches(jobs, [costs[i] for i in order], self.processes)
+        self.list_files_to_scan = jobs
+        self._pending = len(jobs)
+        self._results = self.pool.imap_unordered(multiprocess_scan_batch,
+                                                 [(self.scan_function, b) for b in batches],
+                                                 1)
 
         # No more tasks to the pool, exit the processes once the tasks are done
-        self.pool.close()
+        if self._own_pool:
+            self.pool.close()
 
         # See method
         self._str_last_scanned = ""
 
-    def get_last_result(self):
-        """ Return results of last file scanned. """
+    def get_last_result(self, timeout=None):
+        """ Return results of last file scanned.
 
-        q = self.queue
-        ds = self.data_structure
-        if not q.empty():
-            d = q.get()
+        Inputs:
+         - timeout -- Float, seconds to wait for a result. None, the default,
+                      waits until a result arrives.
+
+        Return:
+         - result -- The scanned object, or None if there are no results left
+                     or the timeout has expired.
+
+        """
+
+        deadline = time() + timeout if timeout is not None else None
+        d = None
+        while d is None:
+            if not self._pending:
+                return None
+            if not self._ready:
+                try:
+                    if deadline is None:
+                        batch = self._results.next()
+                    else:
+                        batch = self._results.next(max(0, deadline - time()))
+                except multiprocessing.TimeoutError:
+                    return None
+                except StopIteration:
+                    self._pending = 0
+                    return None
+                self._ready = batch[::-1]
+            d = self._ready.pop()
+            self._pending -= 1
             if isinstance(d, tuple):
                 self.raise_child_exception(d)
-            # Copy it to the father process
-            ds._replace_in_data_structure(d)
-            ds._update_counts(d)
-            self.update_str_last_scanned(d)
-            # Got result! Reset it!
-            self.queries_without_results = 0
-            return d
-        else:
-            # Count amount of queries without result
-            self.queries_without_results += 1
-            return None
+            d = self._merge_result(d)
+        # Copy it to the father process
+        ds = self.data_structure
+        ds._replace_in_data_structure(d)
+        ds._update_counts(d)
+        self.update_str_last_scanned(d)
+        return d
+
+    def _job_cost(self, job):
+        """ Returns an estimation of the cost of a job, in any unit.
+
+        Scanners with jobs of very different sizes override this, jobs with
+        higher costs are scanned first.
+
+        """
+
+        return 1
+
+    def _merge_result(self, d):
+        """ Returns the complete scanned object for a result of the pool.
+
+        Scanners that split a file in several jobs override this to join the
+        partial results. They return None until the last part arrives.
+
+        """
+
+        return d
 
     def terminate(self):
         """ Terminate the pool, this will exit no matter what.
+
+        A shared pool is terminated too, stopping the rest of the scanners.
         """
         self.pool.terminate()
 
@@ -304,40 +585,6 @@ class AsyncScanner:
         """ Updates the string that represents the last file scanned. """
         raise NotImplementedError
 
-    def sleep(self):
-        """ Sleep waiting for results.
-
-        This method will adjust automatically the sleep time. It will sleep less
-        when results arrive faster and more when they arrive slower.
-
-        """
-
-        # If the query number is outside of our range...
-        if not ((self.queries_without_results < self.MAX_QUERY_NUM) &
-                (self.queries_without_results > self.MIN_QUERY_NUM)):
-            # ... increase or decrease it to optimize queries
-            if self.queries_without_results < self.MIN_QUERY_NUM:
-                self.scan_sleep_time *= 0.5
-            elif self.queries_without_results > self.MAX_QUERY_NUM:
-                self.scan_sleep_time *= 2.0
-            # and don't go farther than max/min
-            if self.scan_sleep_time > self.SCAN_MAX_SLEEP_TIME:
-                logging.debug("Setting sleep time to MAX")
-                self.scan_sleep_time = self.SCAN_MAX_SLEEP_TIME
-            elif self.scan_sleep_time < self.SCAN_MIN_SLEEP_TIME:
-                logging.debug("Setting sleep time to MIN")
-                self.scan_sleep_time = self.SCAN_MIN_SLEEP_TIME
-
-        # Log how it's going
-        logging.debug("")
-        logging.debug("Nº of queries without result: %s", str(self.queries_without_results))
-        logging.debug("Current sleep time: %s", str(self.scan_sleep_time))
-        logging.debug("Time between calls to sleep(): %s", str(time() - self.last_time))
-        self.last_time = time()
-
-        # Sleep, let the other processes do their job
-        sleep(self.scan_sleep_time)
-
     @property
     def str_last_scanned(self):
         """ A friendly string with last scanned result. """
@@ -348,20 +595,21 @@ class AsyncScanner:
     def finished(self):
         """ Return True if the scan has finished.
         
-        It checks if the queue is empty and if the results are ready.
+        It checks if all the results have been delivered.
 
         """
 
-        return self._results.ready() and self.queue.empty()
+        return self._results is not None and not self._pending
 
     @property
     def results(self):
         """ Yield all the results from the scan.
 
-        This is the simpler method to control the scanning process,
-        but also the most sloppy. If you want to closely control the
-        scan process (for example cancel the process in the middle,
-        whatever is happening) use get_last_result().
+        This is the simpler method to control the scanning process. Every
+        iteration blocks until the next result arrives. If you want to
+        closely control the scan process (for example cancel the process
+        in the middle, whatever is happening) use get_last_result() with a
+        timeout.
         
         Usage:
         for result in scanner.results:
@@ -369,16 +617,9 @@ class AsyncScanner:
 
         """
 
-        q = self.queue
-        T = self.SCAN_WAIT_TIME
-        while not q.empty() or not self.finished:
-            sleep(T)
-            if not q.empty():
-                d = q.get()
-                if isinstance(d, tuple):
-                    self.raise_child_exception(d)
-                # Overwrite it in the data dict
-                self.replace_in_data_structure(d)
+        while not self.finished:
+            d = self.get_last_result()
+            if d is not None:
                 yield d
 
     def __len__(self):
@@ -391,19 +632,25 @@ class AsyncDataScanner(AsyncScanner):
     Inputs:
      - data_structure -- A DataFileSet from world.py containing the files to scan
      - processes -- An integer with the number of child processes to use
+     - pool -- A pool as returned by create_pool() or None, see AsyncScanner.
     
     """
 
-    def __init__(self, data_structure, processes):
+    def __init__(self, data_structure, processes, pool=None):
         scan_function = multiprocess_scan_data
         init_args = {}
         _mp_init_function = _mp_data_pool_init
 
         AsyncScanner.__init__(self, data_structure, processes, scan_function,
-                              init_args, _mp_init_function)
+                              init_args, _mp_init_function, pool)
 
-        # Recommended time to sleep between polls for results
-        self.scan_wait_time = 0.0001
+    def _job_cost(self, data):
+        """ The cost of scanning a data file is its size. """
+
+        try:
+            return getsize(data.path)
+        except OSError:
+            return 0
 
     def update_str_last_scanned(self, data):
         self._str_last_scanned = data.filename
@@ -420,27 +667,157 @@ class AsyncRegionsetScanner(AsyncScanner):
      - remove_entities -- A boolean, defaults to False, to remove the entities whilel 
                          scanning. This is really handy because opening chunks with
                          too many entities for scanning can take minutes.
+     - cache -- A ScanCache object from cache.py or None. Region files that
+                haven't changed since they were cached are not scanned, and
+                only the changed chunks are scanned in the rest.
+     - scan_level -- One of the SCAN_LEVEL_* constants, defaults to a full
+                     scan. A quick scan only reads the region and chunk headers.
+     - store -- A ResultsStore object from store.py or None. The results of
+                the scan are written to it. If its use_stored attribute is
+                True the stored results of the unchanged region files are
+                used instead of scanning them.
+     - pool -- A pool as returned by create_pool() or None, see AsyncScanner.
+               It must have been created with the same options.
+     - readahead -- A ReadAhead object or None. If given the region files
+                    are read ahead of the child processes. Not used in quick
+                    scans, which only read the headers.
+     - chunk_size_limit -- Integer or None. Chunks bigger than this number of
+                           bytes once decompressed are not parsed, they get
+                           the status CHUNK_TOO_LARGE.
     
     """
 
     def __init__(self, regionset, processes, entity_limit,
-                 remove_entities=False):
+                 remove_entities=False, cache=None, scan_level=c.SCAN_LEVEL_FULL,
+                 store=None, pool=None, readahead=None, chunk_size_limit=None):
         assert isinstance(regionset, world.DataSet)
 
         scan_function = multiprocess_scan_regionfile
         _mp_init_function = _mp_regionset_pool_init
 
-        init_args = {}
-        init_args['regionset'] = regionset
-        init_args['processes'] = processes
-        init_args['entity_limit'] = entity_limit
-        init_args['remove_entities'] = remove_entities
+        if scan_level != c.SCAN_LEVEL_FULL:
+            readahead = None
+        init_args = _regionset_init_args(entity_limit, remove_entities,
+                                         cache is not None or store is not None,
+                                         scan_level, chunk_size_limit)
 
         AsyncScanner.__init__(self, regionset, processes, scan_function,
-                              init_args, _mp_init_function)
+                              init_args, _mp_init_function, pool)
+
+        self.cache = cache
+        self.store = store
+        self.readahead = readahead
+
+        # Split the files between the ones with usable cached results, which
+        # are returned as they are, and the ones that need a scan
+        self._cached_results = []
+        work = []
+        # Big region files are split in several jobs. Removing entities
+        # writes to the region file, so never split then.
+        split = (processes > 1 and not remove_entities and
+                 scan_level == c.SCAN_LEVEL_FULL)
+        # Coords: [number of parts left to arrive, list with the arrived parts]
+        self._partial_results = {}
+        for r in self.list_files_to_scan:
+            if (store is not None and store.use_stored and
+                    store.load_region(r, remove_entities, scan_level)):
+                self._cached_results.append(r)
+                continue
+            previous = cache.get(r.path) if cache is not None else None
+            if previous is not None and cache.is_unchanged(previous, remove_entities,
+                                                            scan_level):
+                self._cached_results.append(previous)
+                continue
+            parts = _number_of_parts(r.path, processes) if split else 1
+            if parts > 1:
+                step = -(-32 // parts)
+                self._partial_results[r.get_coords()] = [len(range(0, 32, step)), []]
+                for start in range(0, 32, step):
+                    work.append((r.path, previous, (start, min(start + step, 32))))
+            else:
+                work.append((r.path, previous, None))
+        self.list_files_to_scan = work
+
+    def scan(self):
+        """ Launch the child processes and scan all the files.
+
+        The region files are read ahead in the same order they are scanned.
+
+        """
+
+        AsyncScanner.scan(self)
+        if self.readahead is not None:
+            paths = []
+            for path, previous, chunk_range in self.list_files_to_scan:
+                if path not in paths:
+                    paths.append(path)
+            self.readahead.add(paths)
+
+    def get_last_result(self, timeout=None):
+        """ Return results of last file scanned.
+
+        Cached and stored results are returned first, as if they were just
+        scanned. See AsyncScanner.get_last_result(). """
+
+        if self._cached_results:
+            d = self._cached_results.pop()
+            ds = self.data_structure
+            ds._replace_in_data_structure(d)
+            ds._update_counts(d)
+            self.update_str_last_scanned(d)
+            return d
+
+        d = AsyncScanner.get_last_result(self, timeout)
+        if d is not None and self.cache is not None:
+            self.cache.store(d)
+        if d is not None and self.store is not None:
+            self.store.add_region(d, self.data_structure)
+        if d is not None and self.readahead is not None:
+            self.readahead.release(d.path)
+        return d
+
+    def _job_cost(self, work_item):
+        """ Returns the estimated cost of a work item, see _region_file_cost(). """
+
+        path, previous, chunk_range = work_item
+        cost = _region_file_cost(path)
+        if chunk_range is not None:
+            cost = cost * (chunk_range[1] - chunk_range[0]) // 32
+        return cost
 
-        # Recommended time to sleep between polls for results
-        self.scan_wait_time = 0.001
+    def _merge_result(self, record):
+        """ Loads a record sent by the child processes in the regionset.
+
+        Returns the ScannedRegionFile of the regionset filled with the results.
+        The records of the parts of a split region file are joined when the
+        last part arrives, None is returned before that.
+
+        """
+
+        coords = world.get_record_coords(record)
+        partial = self._partial_results.get(coords)
+        if partial is not None:
+            partial[0] -= 1
+            partial[1].append(record)
+            if partial[0]:
+                return None
+            del self._partial_results[coords]
+            record = world.merge_records(partial[1])
+
+        r = self.data_structure[coords]
+        r.load_record(record)
+        return r
+
+    @property
+    def finished(self):
+        """ Return True if the scan has finished.
+
+        It checks if there are cached results left and if all the results
+        of the pool have been delivered.
+
+        """
+
+        return not self._cached_results and AsyncScanner.finished.fget(self)
 
     def update_str_last_scanned(self, r):
         self._str_last_scanned = self.data_structure.get_name() + ": " + r.filename
@@ -457,83 +834,98 @@ class AsyncWorldRegionScanner:
      - remove_entities -- A boolean, defaults to False, to remove the entities while 
                          scanning. This is really handy because opening chunks with
                          too many entities for scanning can take minutes.
+     - cache -- A ScanCache object from cache.py or None, see
+                AsyncRegionsetScanner.
+     - scan_level -- One of the SCAN_LEVEL_* constants, see
+                     AsyncRegionsetScanner.
+     - store -- A ResultsStore object from store.py or None, see
+                AsyncRegionsetScanner.
+     - pool -- A pool as returned by create_pool() or None. If None, one
+               pool is created for all the region sets.
+     - readahead -- A ReadAhead object or None, see AsyncRegionsetScanner.
+     - chunk_size_limit -- Integer or None, see AsyncRegionsetScanner.
     
     This class is just a wrapper around AsyncRegionsetScanner to scan all the region sets
-    of the world.
+    of the world. All the region sets are sent to the same pool at once, the
+    results are delivered one region set after the other.
 
     
     """
 
     def __init__(self, world_obj, processes, entity_limit,
-                 remove_entities=False):
+                 remove_entities=False, cache=None, scan_level=c.SCAN_LEVEL_FULL,
+                 store=None, pool=None, readahead=None, chunk_size_limit=None):
 
         self._world_obj = world_obj
         self.processes = processes
         self.entity_limit = entity_limit
         self.remove_entities = remove_entities
+        self.cache = cache
+        self.scan_level = scan_level
+        self.store = store
+
+        if scan_level != c.SCAN_LEVEL_FULL:
+            readahead = None
+        self._own_pool = pool is None
+        if self._own_pool:
+            pool = create_pool(processes, entity_limit, remove_entities,
+                               cache is not None or store is not None, scan_level,
+                               chunk_size_limit=chunk_size_limit)
+        self.pool = pool
 
         self.regionsets = copy(world_obj.regionsets)
+        self._scanners = [AsyncRegionsetScanner(rs, processes, entity_limit,
+                                                remove_entities, cache,
+                                                scan_level, store, pool, readahead,
+                                                chunk_size_limit)
+                          for rs in self.regionsets]
 
         self._current_regionset = None
-        self._str_last_scanned = None
-
         # Holds a friendly string with the name of the last file scanned
-        self.scan_wait_time = 0.001
-
-    def sleep(self):
-        """ Sleep waiting for results.
-
-        This method will sleep less when results arrive faster and
-        more when they arrive slower. See AsyncScanner.sleep().
-
-        """
-
-        self._current_regionset.sleep()
+        self._str_last_scanned = None
 
     def scan(self):
-        """ Scan and fill the given regionset. """
+        """ Send all the region sets to the pool. """
 
-        cr = AsyncRegionsetScanner(self.regionsets.pop(0),
-                                   self.processes,
-                                   self.entity_limit,
-                                   self.remove_entities)
-        self._current_regionset = cr
-        cr.scan()
+        for cr in self._scanners:
+            cr.scan()
+        if self._own_pool:
+            self.pool.close()
+        self._current_regionset = self._scanners[0] if self._scanners else None
 
         # See method
         self._str_last_scanned = ""
 
-    def get_last_result(self):
+    def get_last_result(self, timeout=None):
         """ Return results of last region file scanned.
 
-        If there are left no scanned region files return None. The
-        ScannedRegionFile returned is the same instance in the regionset,
-        don't modify it or you will modify the regionset results.
+        Inputs:
+         - timeout -- Float, seconds to wait for a result. None, the default,
+                      waits until a result arrives.
+
+        If there are left no scanned region files, or the timeout expires,
+        return None. The ScannedRegionFile returned is the same instance in
+        the regionset, don't modify it or you will modify the regionset
+        results.
 
         This method is better if you want to closely control the scan
-        process.
+        process. When all the results of a regionset have been delivered
+        the ones of the next regionset follow.
 
         """
 
-        cr = self._current_regionset
-
-        if cr is not None:
+        for cr in self._scanners:
             if not cr.finished:
-                r = cr.get_last_result()
+                self._current_regionset = cr
+                r = cr.get_last_result(timeout)
                 self._str_last_scanned = cr.str_last_scanned
                 return r
-            elif self.regionsets:
-                self.scan()
-                return None
-            else:
-                return None
-        else:
-            return None
+        return None
 
     def terminate(self):
-        """ Terminates scan of the current RegionSet. """
+        """ Terminates the scan of all the RegionSets. """
 
-        self._current_regionset.terminate()
+        self.pool.terminate()
 
     @property
     def str_last_scanned(self):
@@ -544,17 +936,17 @@ class AsyncWorldRegionScanner:
     def current_regionset(self):
         """ Returns the current RegionSet being scanned. """
 
-        return self._current_regionset.regionset
+        return self._current_regionset.data_structure
 
     @property
     def finished(self):
         """ Return True if the scan has finished.
         
-        It checks if the queue is empty and if the results are ready.
+        It checks if all the regionsets have delivered all their results.
 
         """
 
-        return not self.regionsets and self._current_regionset.finished
+        return all(cr.finished for cr in self._scanners)
 
     @property
     def world_obj(self):
@@ -564,10 +956,11 @@ class AsyncWorldRegionScanner:
     def results(self):
         """ Yield all the results from the scan.
 
-        This is the simpler method to control the scanning process,
-        but also the most sloppy. If you want to closely control the
-        scan process (for example cancel the process in the middle,
-        whatever is happening) use get_last_result().
+        This is the simpler method to control the scanning process. Every
+        iteration blocks until the next result arrives. If you want to
+        closely control the scan process (for example cancel the process
+        in the middle, whatever is happening) use get_last_result() with a
+        timeout.
 
         Usage:
         for result in scanner.results:
@@ -575,12 +968,9 @@ class AsyncWorldRegionScanner:
         """
 
         while not self.finished:
-            cr = self._current_regionset
-            if cr and not cr.finished:
-                for r in cr.results:
-                    yield r
-            elif self.regionsets:
-                self.scan()
+            r = self.get_last_result()
+            if r is not None:
+                yield r
 
     def __len__(self):
         l = 0
@@ -597,10 +987,22 @@ def console_scan_loop(scanners, scan_titles, verbose):
      - scan_titles -- List of string with the names of the world/regionsets in the same
                      order as in scanners.
      - verbose -- Boolean, if true it will print a line per scanned region file.
+
+    All the scanners are started before waiting for any result, so they
+    should share a pool (see create_pool()). The results are printed one
+    scanner after the other.
     
      """
 
     try:
+        try:
+            for scanner in scanners:
+                if len(scanner):
+                    scanner.scan()
+        except KeyboardInterrupt as e:
+            for scanner in scanners:
+                scanner.terminate()
+            raise e
         for scanner, title in zip(scanners, scan_titles):
             print("\n{0:-^60}".format(title))
             if not len(scanner):
@@ -610,21 +1012,17 @@ def console_scan_loop(scanners, scan_titles, verbose):
                 if not verbose:
                     pbar = ProgressBar(widgets=[SimpleProgress(), Bar(), AdaptiveETA()], maxval=total).start()
                 try:
-                    scanner.scan()
                     counter = 0
-                    while not scanner.finished:
-                        scanner.sleep()
-                        result = scanner.get_last_result()
-                        if result:
-                            logging.debug("\nNew result: {0}\n\nOneliner: {1}\n".format(result, result.oneliner_status))
-                            counter += 1
-                            if not verbose:
-                                pbar.update(counter)
-                            else:
-                                status = "(" + result.oneliner_status + ")"
-                                fn = result.filename
-                                fol = result.folder
-                                print("Scanned {0: <12} {1:.<43} {2}/{3}".format(join(fol, fn), status, counter, total))
+                    for result in scanner.results:
+                        logging.debug("\nNew result: {0}\n\nOneliner: {1}\n".format(result, result.oneliner_status))
+                        counter += 1
+                        if not verbose:
+                            pbar.update(counter)
+                        else:
+                            status = "(" + result.oneliner_status + ")"
+                            fn = result.filename
+                            fol = result.folder
+                            print("Scanned {0: <12} {1:.<43} {2}/{3}".format(join(fol, fn), status, counter, total))
                     if not verbose:
                         pbar.finish()
                 except KeyboardInterrupt as e:
@@ -641,7 +1039,8 @@ def console_scan_loop(scanners, scan_titles, verbose):
 
 
 def console_scan_world(world_obj, processes, entity_limit, remove_entities,
-                       verbose):
+                       verbose, cache=None, scan_level=c.SCAN_LEVEL_FULL, store=None,
+                       readahead=None, backend=c.BACKEND_PROCESSES, chunk_size_limit=None):
     """ Scans a world folder prints status to console.
 
     Inputs:
@@ -653,6 +1052,16 @@ def console_scan_world(world_obj, processes, entity_limit, remove_entities,
                          scanning. This is really handy because opening chunks with
                          too many entities for scanning can take minutes.
      - verbose -- Boolean, if true it will print a line per scanned region file.
+     - cache -- A ScanCache object from cache.py or None. If given it is used
+                to skip unchanged region files and it's saved after the scan,
+                even if the scan is interrupted.
+     - scan_level -- One of the SCAN_LEVEL_* constants. A quick scan only reads
+                     the region and chunk headers of the region files.
+     - store -- A ResultsStore object from store.py or None. The results are
+                written to it, see AsyncRegionsetScanner.
+     - readahead -- A ReadAhead object or None. If given the region files are
+                    read ahead of the child processes.
+     - backend -- One of the BACKEND_* constants, see choose_backend().
 
     """
 
@@ -685,22 +1094,47 @@ def console_scan_world(world_obj, processes, entity_limit, remove_entities,
             print("[WARNING!]: \'level.dat\' is corrupted with the following error/s:")
             print("\t {0}".format(c.DATAFILE_STATUS_TEXT[w.scanned_level.status]))
 
-    ps = AsyncDataScanner(w.players, processes)
-    ops = AsyncDataScanner(w.old_players, processes)
-    ds = AsyncDataScanner(w.data_files, processes)
-    ws = AsyncWorldRegionScanner(w, processes, entity_limit, remove_entities)
-
-    scanners = [ps, ops, ds, ws]
-
-    scan_titles = [' Scanning UUID player files ',
-                   ' Scanning old format player files ',
-                   ' Scanning structures and map data files ',
-                   ' Scanning region, POI and entities files ']
-    console_scan_loop(scanners, scan_titles, verbose)
+    # One pool for everything, the files of all the sections are scanned
+    # while the results of the first ones are printed
+    if scan_level != c.SCAN_LEVEL_FULL:
+        readahead = None
+    number_of_files = sum(len(s) for s in w.datafilesets + w.regionsets)
+    pool = create_pool(processes, entity_limit, remove_entities,
+                       cache is not None or store is not None, scan_level,
+                       choose_backend(backend, number_of_files), chunk_size_limit)
+    try:
+        ps = AsyncDataScanner(w.players, processes, pool)
+        ops = AsyncDataScanner(w.old_players, processes, pool)
+        ds = AsyncDataScanner(w.data_files, processes, pool)
+        ws = AsyncWorldRegionScanner(w, processes, entity_limit, remove_entities,
+                                     cache, scan_level, store, pool, readahead,
+                                     chunk_size_limit)
+
+        scanners = [ps, ops, ds, ws]
+
+        scan_titles = [' Scanning UUID player files ',
+                       ' Scanning old format player files ',
+                       ' Scanning structures and map data files ',
+                       ' Scanning region, POI and entities files ']
+        console_scan_loop(scanners, scan_titles, verbose)
+        if store is not None:
+            for datafileset in w.datafilesets:
+                store.add_datafiles(datafileset)
+    finally:
+        pool.terminate()
+        if readahead is not None:
+            readahead.close()
+        if cache is not None:
+            cache.save()
+        if store is not None:
+            store.commit()
     w.scanned = True
 
 
-def console_scan_regionset(regionset, processes, entity_limit, remove_entities, verbose):
+def console_scan_regionset(regionset, processes, entity_limit, remove_entities, verbose,
+                           cache=None, scan_level=c.SCAN_LEVEL_FULL, store=None,
+                           readahead=None, backend=c.BACKEND_PROCESSES,
+                           chunk_size_limit=None):
     """ Scan a regionset printing status to console.
 
     Inputs:
@@ -712,14 +1146,37 @@ def console_scan_regionset(regionset, processes, entity_limit, remove_entities,
                          scanning. This is really handy because opening chunks with
                          too many entities for scanning can take minutes.
      - verbose -- Boolean, if true it will print a line per scanned region file.
+     - cache -- A ScanCache object from cache.py or None. If given it is used
+                to skip unchanged region files and it's saved after the scan,
+                even if the scan is interrupted.
+     - scan_level -- One of the SCAN_LEVEL_* constants. A quick scan only reads
+                     the region and chunk headers of the region files.
+     - store -- A ResultsStore object from store.py or None. The results are
+                written to it, see AsyncRegionsetScanner.
+     - readahead -- A ReadAhead object or None. If given the region files are
+                    read ahead of the child processes.
+     - backend -- One of the BACKEND_* constants, see choose_backend().
 
     """
 
+    pool = create_pool(processes, entity_limit, remove_entities,
+                       cache is not None or store is not None, scan_level,
+                       choose_backend(backend, len(regionset)), chunk_size_limit)
     rs = AsyncRegionsetScanner(regionset, processes, entity_limit,
-                               remove_entities)
+                               remove_entities, cache, scan_level, store,
+                               pool, readahead, chunk_size_limit)
     scanners = [rs]
     titles = [entitle("Scanning separate region files", 0)]
-    console_scan_loop(scanners, titles, verbose)
+    try:
+        console_scan_loop(scanners, titles, verbose)
+    finally:
+        pool.terminate()
+        if readahead is not None:
+            readahead.close()
+        if cache is not None:
+            cache.save()
+        if store is not None:
+            store.commit()
     regionset.scanned = True
 
 
@@ -766,7 +1223,118 @@ def scan_data(scanned_dat_file):
     return s
 
 
-def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities):
+# Chunk status used in a quick scan for every status of the chunk metadata
+# in nbt/region.py. Chunks not created are not in the dict. Note that both
+# chunks of a pair of overlapping chunks are marked as sharing offset, a
+# full scan is needed to tell which one is the good one.
+QUICK_SCAN_STATUS = {region.STATUS_CHUNK_OK: c.CHUNK_OK,
+                     region.STATUS_CHUNK_OVERLAPPING: c.CHUNK_SHARED_OFFSET,
+                     region.STATUS_CHUNK_MISMATCHED_LENGTHS: c.CHUNK_CORRUPTED,
+                     region.STATUS_CHUNK_ZERO_LENGTH: c.CHUNK_CORRUPTED,
+                     region.STATUS_CHUNK_IN_HEADER: c.CHUNK_CORRUPTED,
+                     region.STATUS_CHUNK_OUT_OF_FILE: c.CHUNK_CORRUPTED
+                     }
+
+
+# Region files bigger than this are split in one job per process. Dense
+# region files can take minutes to scan, one of them shouldn't keep a worker
+# busy while the rest are idle at the end of the scan.
+SPLIT_REGION_FILE_SIZE = 8 * 1024 * 1024
+
+
+# Estimated cost of scanning a chunk, besides reading and decompressing it,
+# in bytes of region file. See _region_file_cost().
+CHUNK_SCAN_COST = 4096
+
+# Jobs are sent to the child processes in batches of about this fraction
+# of the cost of the scan per process, see _make_batches().
+BATCH_COST_FRACTION = 0.125
+
+# With BACKEND_AUTO scans of up to this number of files use threads, see
+# choose_backend().
+THREADS_MAX_FILES = 32
+
+
+def _region_file_cost(path):
+    """ Returns the estimated cost of scanning a region file.
+
+    The cost is the size of the file plus CHUNK_SCAN_COST for every chunk
+    with an entry in the region header. Only the first 4KiB of the file
+    are read. Files too small to have a whole header only cost their size.
+
+    """
+
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(region.SECTOR_LENGTH)
+        size = getsize(path)
+    except OSError:
+        return 0
+    if len(header) < region.SECTOR_LENGTH:
+        return size
+    try:
+        # Only the empty entries are counted, the byte order doesn't matter
+        locations = array('I', header)
+    except ValueError:
+        return size
+    return size + CHUNK_SCAN_COST * (len(locations) - locations.count(0))
+
+
+def _make_batches(jobs, costs, processes):
+    """ Groups the jobs in batches to send them to the child processes.
+
+    Inputs:
+     - jobs -- List with the jobs, sorted from the most to the less costly.
+     - costs -- List with the estimated costs of the jobs, same order.
+     - processes -- Integer with the number of child processes.
+
+    Return:
+     - batches -- List of lists of jobs.
+
+    Every batch gets jobs until it costs BATCH_COST_FRACTION of the cost per
+    process or it has the average number of jobs of 8 batches per process.
+    Costly jobs get a batch for themselves and the cheap ones at the end of
+    the scan are grouped, so the overhead of the pool doesn't dominate the
+    scan of small files and no worker ends much later than the rest.
+
+    """
+
+    cost_limit = BATCH_COST_FRACTION * sum(costs) / processes
+    size_limit = max(1, len(jobs) // (8 * processes))
+    batches = []
+    batch = []
+    batch_cost = 0
+    for job, cost in zip(jobs, costs):
+        if batch and (batch_cost + cost > cost_limit or len(batch) >= size_limit):
+            batches.append(batch)
+            batch = []
+            batch_cost = 0
+        batch.append(job)
+        batch_cost += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _number_of_parts(path, processes):
+    """ Returns the number of jobs used to scan a region file.
+
+    Inputs:
+     - path -- String with the path of the region file.
+     - processes -- Integer with the number of child processes.
+
+    """
+
+    try:
+        size = getsize(path)
+    except OSError:
+        return 1
+    return min(processes, 32) if size > SPLIT_REGION_FILE_SIZE else 1
+
+
+def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities,
+                     previous=None, keep_stamps=False, scan_level=c.SCAN_LEVEL_FULL,
+                     chunk_range=None, chunk_size_limit=None):
     """ Scan a region file filling the ScannedRegionFile object
 
     Inputs:
@@ -776,17 +1344,41 @@ def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities):
      - remove_entities -- A boolean, defaults to False, to remove the entities while 
                          scanning. This is really handy because opening chunks with
                          too many entities for scanning can take minutes.
+     - previous -- ScannedRegionFile with the results of a previous scan of the
+                   same file (see cache.py) or None. Chunks whose entry in the
+                   region header hasn't changed since then are not scanned
+                   again, their previous results are used instead.
+     - keep_stamps -- Boolean, if True store in the ScannedRegionFile the
+                      identity of the file and a copy of the region header so
+                      the results can be cached.
+     - scan_level -- One of the SCAN_LEVEL_* constants. A quick scan doesn't
+                     decompress any chunk, the status of the chunks is taken
+                     from the region header and the chunk headers (see
+                     QUICK_SCAN_STATUS).
+     - chunk_range -- Tuple (start, stop) or None. If given only the chunks
+                      with x in range(start, stop) are scanned, used to split
+                      big region files between several workers (see
+                      AsyncRegionsetScanner).
+     - chunk_size_limit -- Integer or None. Chunks bigger than this number of
+                           bytes once decompressed are not parsed, see
+                           scan_chunk().
+
+    Unless entities are going to be removed the region file is opened read
+    only and memory mapped, see RegionFile in nbt/region.py.
 
     """
 
     try:
         r = scanned_regionfile_obj
+        r.scan_level = scan_level
 
         # try to open the file and see if we can parse the header
         try:
-            region_file = region.RegionFile(r.path)
+            region_file = region.RegionFile(r.path, readonly=not remove_entities)
         except region.NoRegionHeader:  # The region has no header
             r.status = c.REGION_TOO_SMALL
+            if keep_stamps:
+                r.identity = get_file_identity(r.path)
             r.scan_time = time()
             r.scanned = True
             return r
@@ -803,46 +1395,85 @@ def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities):
             r.scanned = True
             return r
 
-        for x in range(32):
-            for z in range(32):
-                # start the actual chunk scanning
-                g_coords = r.get_global_chunk_coords(x, z)
-                chunk, tup = scan_chunk(region_file,
-                                      (x, z),
-                                      g_coords,
-                                      entity_limit)
-                if tup:
-                    r[(x, z)] = tup
-                else:
+        # Raw region header, used to find out which chunks haven't changed
+        # since the previous scan
+        header = None
+        if previous is not None or keep_stamps:
+            header = bytes(region_file.get_header())
+        if previous is not None and previous.scan_level == scan_level:
+            old_header = previous.header
+        else:
+            old_header = None
+
+        if chunk_range is not None:
+            x_range = range(*chunk_range)
+        else:
+            x_range = range(32)
+        coords = [(x, z) for x in x_range for z in range(32)]
+        if scan_level == c.SCAN_LEVEL_FULL:
+            # Read the chunks in the order they are in the file, one
+            # sequential pass instead of seeking back and forth
+            coords = region_file.chunks_in_file_order(coords)
+
+        for x, z in coords:
+            if scan_level == c.SCAN_LEVEL_QUICK:
+                status = QUICK_SCAN_STATUS.get(region_file.get_status(x, z))
+                if status is not None:
+                    r[(x, z)] = (None, status)
+                continue
+
+            if old_header is not None and \
+                    _same_header_entry(header, old_header, x, z) and \
+                    region_file.get_status(x, z) != region.STATUS_CHUNK_OVERLAPPING:
+                # Same offset, size and timestamp, use the previous result
+                try:
+                    tup = previous[(x, z)]
+                except KeyError:
                     # chunk not created
                     continue
-
-                if tup[c.TUPLE_STATUS] == c.CHUNK_OK:
+                if not (remove_entities and
+                        tup[c.TUPLE_STATUS] == c.CHUNK_TOO_MANY_ENTITIES):
+                    if tup[c.TUPLE_STATUS] == c.CHUNK_SHARED_OFFSET:
+                        # Computed again below
+                        tup = (tup[c.TUPLE_NUM_ENTITIES], c.CHUNK_WRONG_LOCATED)
+                    r[(x, z)] = tup
                     continue
-                elif tup[c.TUPLE_STATUS] == c.CHUNK_TOO_MANY_ENTITIES:
-                    # Deleting entities is in here because parsing a chunk
-                    # with thousands of wrong entities takes a long time,
-                    # and sometimes GiB of RAM, and once detected is better
-                    # to fix it at once.
-                    if remove_entities:
-                        world.delete_entities(region_file, x, z)
-                        print(("Deleted {0} entities in chunk"
-                               " ({1},{2}) of the region file: {3}").format(tup[c.TUPLE_NUM_ENTITIES], x, z, r.filename))
-                        # entities removed, change chunk status to OK
-                        r[(x, z)] = (0, c.CHUNK_OK)
 
-                    else:
-                        # This stores all the entities in a file,
-                        # comes handy sometimes.
-                        # ~ pretty_tree = chunk['Level']['Entities'].pretty_tree()
-                        # ~ name = "{2}.chunk.{0}.{1}.txt".format(x,z,split(region_file.filename)[1])
-                        # ~ archivo = open(name,'w')
-                        # ~ archivo.write(pretty_tree)
-                        pass
-                elif tup[c.TUPLE_STATUS] == c.CHUNK_CORRUPTED:
-                    pass
-                elif tup[c.TUPLE_STATUS] == c.CHUNK_WRONG_LOCATED:
+            # start the actual chunk scanning
+            g_coords = r.get_global_chunk_coords(x, z)
+            chunk, tup = scan_chunk(region_file,
+                                  (x, z),
+                                  g_coords,
+                                  entity_limit,
+                                  chunk_size_limit)
+            if tup:
+                r[(x, z)] = tup
+            else:
+                # chunk not created
+                continue
+
+            if tup[c.TUPLE_STATUS] == c.CHUNK_OK:
+                continue
+            elif tup[c.TUPLE_STATUS] == c.CHUNK_TOO_MANY_ENTITIES:
+                # Deleting entities is in here because parsing a chunk
+                # with thousands of wrong entities takes a long time,
+                # and sometimes GiB of RAM, and once detected is better
+                # to fix it at once.
+                if remove_entities:
+                    world.delete_entities(region_file, x, z)
+                    print(("Deleted {0} entities in chunk"
+                           " ({1},{2}) of the region file: {3}").format(tup[c.TUPLE_NUM_ENTITIES], x, z, r.filename))
+                    # entities removed, change chunk status to OK
+                    r[(x, z)] = (0, c.CHUNK_OK)
+
+                else:
+                    # The entities can be stored in a file with
+                    # --dump-chunks, see dump_problematic_chunks() in world.py
                     pass
+            elif tup[c.TUPLE_STATUS] == c.CHUNK_CORRUPTED:
+                pass
+            elif tup[c.TUPLE_STATUS] == c.CHUNK_WRONG_LOCATED:
+                pass
 
         # Now check for chunks sharing offsets:
         # Please note! region.py will mark both overlapping chunks
@@ -854,14 +1485,19 @@ def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities):
         # TODO: Why? I don't remember why
         # TODO: Leave this to nbt, which code is much better than this
 
-        metadata = region_file.metadata
-        sharing = [k for k in metadata if (metadata[k].status == region.STATUS_CHUNK_OVERLAPPING and
+        sharing = [k for k in r.keys() if (region_file.get_status(*k) == region.STATUS_CHUNK_OVERLAPPING and
                                            r[k][c.TUPLE_STATUS] == c.CHUNK_WRONG_LOCATED)]
         shared_counter = 0
         for k in sharing:
             r[k] = (r[k][c.TUPLE_NUM_ENTITIES], c.CHUNK_SHARED_OFFSET)
             shared_counter += 1
 
+        if keep_stamps:
+            # Read again, removing entities may have changed the header
+            r.header = bytes(region_file.get_header())
+            region_file.close()
+            r.identity = get_file_identity(r.path)
+
         r.scan_time = time()
         r.status = c.REGION_OK
         r.scanned = True
@@ -885,7 +1521,16 @@ def scan_region_file(scanned_regionfile_obj, entity_limit, remove_entities):
         return r
 
 
-def scan_chunk(region_file, coords, global_coords, entity_limit):
+def _same_header_entry(header, old_header, x, z):
+    """ Returns True if the chunk has the same location and timestamp in both headers. """
+
+    i = 4 * (x + 32 * z)
+    j = region.SECTOR_LENGTH + i
+    return header[i:i + 4] == old_header[i:i + 4] and \
+        header[j:j + 4] == old_header[j:j + 4]
+
+
+def scan_chunk(region_file, coords, global_coords, entity_limit, chunk_size_limit=None):
     """ Scans a chunk returning its status and number of entities.
 
     Keywords arguments:
@@ -893,9 +1538,12 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
     coords -- tuple containing the local (region) coordinates of the chunk
     global_coords -- tuple containing the global (world) coordinates of the chunk
     entity_limit -- the number of entities that is considered to be too many
+    chunk_size_limit -- the size in bytes of the decompressed data of the chunk
+                        that is considered to be too large, or None
 
     Return:
-    chunk -- as a nbt file
+    chunk -- dictionary with the tags of the chunk used to scan it, see
+             get_chunk_info() in world.py
     (num_entities, status) -- tuple with the number of entities of the chunk and
                               the status described by the CHUNK_* variables in
                               world.py
@@ -904,12 +1552,19 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
     
     This function also scan the chunks contained in the POI region files.
 
+    Memory is bounded for every chunk. Chunks larger than chunk_size_limit
+    are never decompressed further than the limit, and the entities are
+    counted from the header of their list, without parsing them. Once a chunk
+    is known to have too many entities the rest of its data is not read.
+
     """
 
     el = entity_limit
 
     try:
-        chunk = region_file.get_chunk(*coords)
+        # Only the tags needed are extracted, the rest of the chunk is skipped
+        data = region_file.get_blockdata(*coords, max_size=chunk_size_limit)
+        chunk = world.get_chunk_info(data, el)
         chunk_type = world.get_chunk_type(chunk)
 
         if chunk_type == c.LEVEL_DIR:
@@ -919,23 +1574,8 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
             # Level chunk
             try:
                 data_coords = world.get_chunk_data_coords(chunk)
-                
                 # Since snapshot 20w45a (1.17), entities MAY BE separated
-                if "DataVersion" in chunk and chunk["DataVersion"].value >= 2681 :
-                    num_entities = None
-                    
-                    # Since snapshot 21w43a (1.18), "Level" tag doesn't exist anymore
-                    # According to the wiki, an "entities" tag can still be there (But I've never seen it)
-                    if chunk["DataVersion"].value >= 2844 :
-                        if "entities" in chunk :
-                            num_entities = len(chunk["entities"])
-                    
-                    # >= 20w45a and < 21w43a
-                    # Don't check if "Level" tag exist, at this point, it should exist
-                    elif "Entities" in chunk["Level"] :
-                        num_entities = len(chunk["Level"]["Entities"])
-                else :
-                    num_entities = len(chunk["Level"]["Entities"])
+                num_entities = world.get_chunk_num_entities(chunk)
                 
                 if data_coords != global_coords:
                     # wrong located chunk
@@ -988,7 +1628,7 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
             
             # Entities chunk
             data_coords = world.get_chunk_data_coords(chunk)
-            num_entities = len(chunk["Entities"])
+            num_entities = world.get_chunk_num_entities(chunk)
             
             if data_coords != global_coords:
                 # wrong located chunk
@@ -1031,6 +1671,22 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
         global_coords = world.get_global_chunk_coords(split(region_file.filename)[1], coords[0], coords[1])
         num_entities = None
 
+    except MalformedFileError:
+        # corrupted chunk, the NBT data can't be parsed
+        status = c.CHUNK_CORRUPTED
+        chunk = None
+        data_coords = None
+        global_coords = world.get_global_chunk_coords(split(region_file.filename)[1], coords[0], coords[1])
+        num_entities = None
+
+    except ChunkTooLarge:
+        # too large to be parsed without using too much memory
+        status = c.CHUNK_TOO_LARGE
+        chunk = None
+        data_coords = None
+        global_coords = world.get_global_chunk_coords(split(region_file.filename)[1], coords[0], coords[1])
+        num_entities = None
+
     except ChunkHeaderError:
         # corrupted chunk, error in the header of the chunk
         status = c.CHUNK_CORRUPTED
@@ -1047,6 +1703,15 @@ def scan_chunk(region_file, coords, global_coords, entity_limit):
         global_coords = world.get_global_chunk_coords(split(region_file.filename)[1], coords[0], coords[1])
         num_entities = None
 
+    except (TypeError, ValueError, IndexError):
+        # corrupted chunk, tags with the wrong type or length, e.g. a string
+        # DataVersion or a Position with one coordinate
+        status = c.CHUNK_CORRUPTED
+        chunk = None
+        data_coords = None
+        global_coords = world.get_global_chunk_coords(split(region_file.filename)[1], coords[0], coords[1])
+        num_entities = None
+
     return chunk, (num_entities, status) if status != c.CHUNK_NOT_CREATED else None
 
 
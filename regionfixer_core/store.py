@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import sqlite3
+from os.path import abspath
+
+import regionfixer_core.constants as c
+from regionfixer_core.cache import is_result_usable
+
+
+# Bump this every time the tables change, old stores are emptied.
+STORE_VERSION = 2
+
+# Number of region files written in every transaction
+STORE_BATCH_SIZE = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+CREATE TABLE IF NOT EXISTS regions (
+    path TEXT PRIMARY KEY,
+    dimension TEXT,
+    region_type TEXT,
+    x INTEGER,
+    z INTEGER,
+    status INTEGER,
+    scan_level INTEGER,
+    scan_time REAL,
+    record BLOB
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    path TEXT,
+    dimension TEXT,
+    region_type TEXT,
+    x INTEGER,
+    z INTEGER,
+    status INTEGER,
+    num_entities INTEGER,
+    PRIMARY KEY (path, x, z)
+);
+CREATE INDEX IF NOT EXISTS chunks_by_status
+    ON chunks (dimension, status, x, z);
+CREATE TABLE IF NOT EXISTS datafiles (
+    path TEXT PRIMARY KEY,
+    status INTEGER
+);
+"""
+
+
+class ResultsStore:
+    """ SQLite database with the results of the scans.
+
+    Inputs:
+     - path -- String with the path of the database file.
+     - entity_limit -- Integer, the entity limit used in the scan. A store
+                       written with a different entity limit is emptied.
+     - use_stored -- Boolean, if True the scanners use the stored results of
+                     the region files that haven't changed instead of
+                     scanning them.
+     - chunk_size_limit -- Integer or None, the chunk size limit used in the
+                           scan. A store written with a different limit is
+                           emptied.
+
+    There is a row in the table regions for every scanned region file, with
+    its full results packed as a record (see ScannedRegionFile.to_record()),
+    so they can be loaded back without scanning. Chunks with problems (see
+    CHUNK_PROBLEMS in constants.py) also get a row in the table chunks, with
+    global coordinates, which is indexed to query them, see query_chunks().
+
+    Results are written in batches of STORE_BATCH_SIZE region files per
+    transaction, call commit() at the end of a scan.
+
+    """
+
+    def __init__(self, path, entity_limit, use_stored=False, chunk_size_limit=None):
+        self.path = path
+        self.entity_limit = entity_limit
+        self.chunk_size_limit = chunk_size_limit
+        self.use_stored = use_stored
+        self._pending = 0
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+        info = dict(self._db.execute("SELECT key, value FROM info"))
+        if (info.get('version') != STORE_VERSION or
+                info.get('entity_limit') != entity_limit or
+                info.get('chunk_size_limit') != chunk_size_limit):
+            if info:
+                print("Warning: The results in {0} were stored by another version or "
+                      "with other limits. Discarding them.".format(path))
+            self.clear()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM regions").fetchone()[0]
+
+    def clear(self):
+        """ Removes all the stored results. """
+
+        with self._db:
+            for table in ('info', 'regions', 'chunks', 'datafiles'):
+                self._db.execute("DELETE FROM " + table)
+            self._db.executemany("INSERT INTO info VALUES (?, ?)",
+                                 [('version', STORE_VERSION),
+                                  ('entity_limit', self.entity_limit),
+                                  ('chunk_size_limit', self.chunk_size_limit)])
+        self._pending = 0
+
+    def commit(self):
+        """ Writes to disk all the results added since the last commit. """
+
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        """ Commits the pending results and closes the database. """
+
+        self.commit()
+        self._db.close()
+
+    def add_region(self, scanned_regionfile, regionset):
+        """ Stores the results of a region file scan.
+
+        Inputs:
+         - scanned_regionfile -- ScannedRegionFile with the results.
+         - regionset -- RegionSet containing the region file, used to know
+                        the dimension and type of the region file.
+
+        """
+
+        r = scanned_regionfile
+        path = abspath(r.path)
+        dimension = regionset._get_dimension_directory()
+        region_type = regionset._get_region_type_directory()
+        db = self._db
+        db.execute("INSERT OR REPLACE INTO regions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                   (path, dimension, region_type, r.x, r.z, r.status,
+                    r.scan_level, r.scan_time, r.to_record()))
+        db.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        rows = []
+        for status in c.CHUNK_PROBLEMS:
+            for (x, z), t in r.list_chunks(status):
+                rows.append((path, dimension, region_type, x, z,
+                             status, t[c.TUPLE_NUM_ENTITIES]))
+        db.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        self._pending += 1
+        if self._pending >= STORE_BATCH_SIZE:
+            self.commit()
+
+    def add_datafiles(self, datafileset):
+        """ Stores the status of all the scanned data files in a DataFileSet. """
+
+        self._db.executemany("INSERT OR REPLACE INTO datafiles VALUES (?, ?)",
+                             [(abspath(d.path), d.status)
+                              for d in datafileset._get_list() if d.status is not None])
+
+    def load_region(self, scanned_regionfile, remove_entities=False,
+                    scan_level=c.SCAN_LEVEL_FULL):
+        """ Loads the stored results of a region file.
+
+        Inputs:
+         - scanned_regionfile -- ScannedRegionFile to fill with the results.
+         - remove_entities -- Boolean, True if the entities are going to be
+                              removed while scanning.
+         - scan_level -- One of the SCAN_LEVEL_* constants, the level of the
+                         scan that would be done.
+
+        Return:
+         - loaded -- True if the results were loaded. False if there are no
+                     stored results or they can't be used (see
+                     is_result_usable() in cache.py), in which case the
+                     ScannedRegionFile is not modified.
+
+        """
+
+        r = scanned_regionfile
+        row = self._db.execute("SELECT record FROM regions WHERE path = ?",
+                               (abspath(r.path),)).fetchone()
+        if row is None:
+            return False
+        stored = r.__class__(r.path, folder=r.folder)
+        stored.load_record(row[0])
+        if not is_result_usable(stored, remove_entities, scan_level):
+            return False
+        r.load_record(row[0])
+        return True
+
+    def load_regionset(self, regionset):
+        """ Loads the stored results of all the region files in a RegionSet.
+
+        Return:
+         - missing -- Integer with the number of region files without usable
+                      stored results. If it's zero the regionset is marked as
+                      scanned.
+
+        """
+
+        missing = 0
+        for r in regionset._get_list():
+            if self.load_region(r):
+                regionset._update_counts(r)
+            else:
+                missing += 1
+        if not missing:
+            regionset.scanned = True
+        return missing
+
+    def load_datafiles(self, datafileset):
+        """ Loads the stored status of the data files in a DataFileSet.
+
+        Return:
+         - missing -- Integer with the number of data files not stored.
+
+        """
+
+        missing = 0
+        for d in datafileset._get_list():
+            row = self._db.execute("SELECT status FROM datafiles WHERE path = ?",
+                                   (abspath(d.path),)).fetchone()
+            if row is None:
+                missing += 1
+            else:
+                d.status = row[0]
+                datafileset._update_counts(d)
+        return missing
+
+    def load_world(self, world_obj):
+        """ Loads the stored results of all the files of a World.
+
+        Return:
+         - missing -- Integer with the number of files without usable stored
+                      results. If it's zero the world is marked as scanned.
+
+        """
+
+        w = world_obj
+        missing = 0
+        for regionset in w.regionsets:
+            missing += self.load_regionset(regionset)
+        for datafileset in w.datafilesets:
+            missing += self.load_datafiles(datafileset)
+        if not missing:
+            w.scanned = True
+        return missing
+
+    def query_chunks(self, status=None, dimension=None, region_type=None,
+                     x_range=None, z_range=None):
+        """ Returns the stored chunks with problems matching the given filters.
+
+        Inputs:
+         - status -- Integer with the status of the chunks, see CHUNK_PROBLEMS
+                     in constants.py. None for all of them.
+         - dimension -- String with the dimension directory, "" for the
+                        overworld, "DIM-1" for the nether, etc.
+         - region_type -- String with the region type directory, "region",
+                          "poi" or "entities".
+         - x_range, z_range -- Tuples (min, max) with inclusive limits for
+                               the global chunk coordinates.
+
+        Return:
+         - list -- List with tuples like (path, global_coordinates, status_tuple)
+                   where status tuple is (number_of_entities, status)
+
+        Filters set to None are ignored.
+
+        """
+
+        conditions = []
+        values = []
+        for column, value in (('dimension', dimension), ('status', status),
+                              ('region_type', region_type)):
+            if value is not None:
+                conditions.append(column + " = ?")
+                values.append(value)
+        for column, limits in (('x', x_range), ('z', z_range)):
+            if limits is not None:
+                conditions.append(column + " BETWEEN ? AND ?")
+                values.extend(limits)
+        query = "SELECT path, x, z, num_entities, status FROM chunks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY path, x, z"
+
+        return [(path, (x, z), (num_entities, status))
+                for path, x, z, num_entities, status in self._db.execute(query, values)]
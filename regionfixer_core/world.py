@@ -23,8 +23,11 @@
 
 from glob import glob
 from os.path import join, split, exists, isfile
-from os import remove
+from os import remove, makedirs
 from shutil import copy
+from array import array
+from struct import Struct
+import sys
 import zlib
 
 import nbt.region as region
@@ -70,6 +73,86 @@ class ScannedDataFile:
         return "File: \"" + self.filename + "\"; status: " + c.DATAFILE_STATUS_TEXT[self.status]
 
 
+# Packed record used to send the results of a region file scan from the
+# child processes to the parent, see ScannedRegionFile.to_record().
+#
+# Header: region x, region z, first and last+1 chunk x column scanned,
+# region status, scan level, scan time and the file identity (size, mtime,
+# inode). Missing values are stored as -1.
+# Then a 1024 bytes array with the status of every chunk, a 1024 int32
+# array with the number of entities of every chunk (both indexed by
+# x + 32*z) and, optionally, the 8KiB region header of the file.
+# Everything is little endian, so records can be moved between machines in
+# caches and stores.
+_RECORD_HEADER = Struct("<iiBBhhdqqq")
+_RECORD_STATUS_START = _RECORD_HEADER.size
+_RECORD_ENTITIES_START = _RECORD_STATUS_START + 1024
+_RECORD_SIZE = _RECORD_ENTITIES_START + 1024 * 4
+
+# Status used in the record for chunks without a status tuple
+_RECORD_NO_CHUNK = -128
+
+# Typecode of the arrays with the number of entities, int32 in the records
+_ENTITIES_TYPECODE = 'i' if array('i').itemsize == 4 else 'l'
+assert array(_ENTITIES_TYPECODE).itemsize == 4
+# array.array uses the byte order of the machine
+_SWAP_ENTITIES = sys.byteorder == 'big'
+
+
+def _chunk_order(i):
+    """ Sort key to list the chunks x-major, as they are scanned. """
+
+    return i & 31, i >> 5
+
+
+def merge_records(records):
+    """ Joins the records of the parts of a region file scanned in parts.
+
+    Inputs:
+     - records -- List of records as returned by ScannedRegionFile.to_record()
+                  for the same region file, every one for a different range
+                  of chunk x columns, in any order.
+
+    Return:
+     - record -- A record with the chunks of all the records.
+
+    The result doesn't depend on the order of the records. The region
+    status is the worst of the parts (the highest REGION_* constant), the
+    scan time the latest one, and the rest of the header is taken from the
+    part with the first columns. If the parts saw different file identities
+    the file changed during the scan, so the identity and the region header
+    are dropped and the file is scanned again next time.
+
+    """
+
+    records = sorted(records, key=lambda record: _RECORD_HEADER.unpack_from(record)[2])
+    headers = [_RECORD_HEADER.unpack_from(record) for record in records]
+    merged = bytearray(records[0][:_RECORD_SIZE])
+    for record, h in zip(records[1:], headers[1:]):
+        x_start, x_stop = h[2], h[3]
+        for z in range(32):
+            a = _RECORD_STATUS_START + 32 * z
+            merged[a + x_start:a + x_stop] = record[a + x_start:a + x_stop]
+            a = _RECORD_ENTITIES_START + 4 * 32 * z
+            merged[a + 4 * x_start:a + 4 * x_stop] = record[a + 4 * x_start:a + 4 * x_stop]
+    h = list(headers[0])
+    h[2], h[3] = 0, 32
+    h[4] = max(part[4] for part in headers)
+    h[6] = max(part[6] for part in headers)
+    if all(part[7:10] == headers[0][7:10] for part in headers):
+        merged += records[0][_RECORD_SIZE:]
+    else:
+        h[7:10] = -1, -1, -1
+    _RECORD_HEADER.pack_into(merged, 0, *h)
+    return bytes(merged)
+
+
+def get_record_coords(record):
+    """ Returns the region coordinates stored in a record. """
+
+    return _RECORD_HEADER.unpack_from(record)[:2]
+
+
 class ScannedChunk:
     """ Stores all the information of a scanned chunk.
     
@@ -99,16 +182,25 @@ class ScannedRegionFile:
         self.x, self.z = self.get_coords()
         self.coords = (self.x, self.z)
 
-        # dictionary storing all the state tuples of all the chunks
-        # in the region file, keys are the local coords of the chunk
-        # sometimes called header coords
-        self._chunks = {}
+        # arrays storing the state of all the chunks in the region file
+        # indexed by x + 32*z, where x, z are the local coords of the chunk
+        # sometimes called header coords. Chunks without state are marked
+        # with _RECORD_NO_CHUNK, unknown number of entities with -1
+        self._statuses = array('b', [_RECORD_NO_CHUNK]) * 1024
+        self._entities = array(_ENTITIES_TYPECODE, [-1]) * 1024
 
         # Dictionary containing counters to for all the chunks
         self._counts = {}
         for s in c.CHUNK_STATUSES:
             self._counts[s] = 0
 
+        # Dictionary with a set of the indexes of the chunks for every
+        # status in CHUNK_PROBLEMS, so they can be listed without looking
+        # at all the chunks
+        self._index = {}
+        for s in c.CHUNK_PROBLEMS:
+            self._index[s] = set()
+
         # time when the scan for this file finished
         self.scan_time = scanned_time
 
@@ -118,6 +210,15 @@ class ScannedRegionFile:
         # has the file been scanned yet?
         self.scanned = False
 
+        # How deep the file has been scanned, see SCAN_LEVEL_* in constants.py
+        self.scan_level = None
+
+        # Only filled when the results are going to be cached, see cache.py.
+        # Identity (size, mtime, inode) of the file at scan time and a copy of
+        # the region header used to detect which chunks changed since then.
+        self.identity = None
+        self.header = None
+
     @property
     def oneliner_status(self):
         """ On line description of the status of the region file. """
@@ -128,6 +229,8 @@ class ScannedRegionFile:
                 for s in c.CHUNK_PROBLEMS:
                     stats += "{0}:{1}, ".format(c.CHUNK_PROBLEMS_ABBR[s], self.count_chunks(s))
                 stats += "t:{0}".format(self.count_chunks())
+                if self.scan_level == c.SCAN_LEVEL_QUICK:
+                    stats += ", quick"
             else:
                 stats = c.REGION_STATUS_TEXT[status]
         else:
@@ -144,12 +247,103 @@ class ScannedRegionFile:
 
         return text
 
+    def _get_index(self, key):
+        x, z = key
+        if not (0 <= x < 32 and 0 <= z < 32):
+            raise KeyError(key)
+        return x + 32 * z
+
     def __getitem__(self, key):
-        return self._chunks[key]
+        i = self._get_index(key)
+        status = self._statuses[i]
+        if status == _RECORD_NO_CHUNK:
+            raise KeyError(key)
+        entities = self._entities[i]
+        return (entities if entities != -1 else None, status)
 
     def __setitem__(self, key, value):
-        self._chunks[key] = value
-        self._counts[value[c.TUPLE_STATUS]] += 1
+        i = self._get_index(key)
+        old = self._statuses[i]
+        if old != _RECORD_NO_CHUNK:
+            self._counts[old] -= 1
+            if old in self._index:
+                self._index[old].discard(i)
+        status = value[c.TUPLE_STATUS]
+        entities = value[c.TUPLE_NUM_ENTITIES]
+        self._statuses[i] = status
+        self._entities[i] = entities if entities is not None else -1
+        self._counts[status] += 1
+        if status in self._index:
+            self._index[status].add(i)
+
+    def __getstate__(self):
+        # Pickle the results as a record, much smaller than the dict
+        return {'path': self.path, 'folder': self.folder,
+                'scanned': self.scanned, 'record': self.to_record()}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], folder=state['folder'])
+        self.load_record(state['record'])
+        self.scanned = state['scanned']
+
+    def to_record(self, x_range=(0, 32)):
+        """ Returns the scan results packed in a bytes object.
+
+        Inputs:
+         - x_range -- Tuple (start, stop) with the range of chunk x columns
+                      scanned, see scan_region_file() in scan.py.
+
+        Return:
+         - record -- Bytes object, can be loaded with load_record() or
+                     joined with other records with merge_records().
+
+        The record has a fixed layout (see _RECORD_HEADER) and is much faster
+        to send between processes than the ScannedRegionFile itself.
+
+        """
+
+        identity = self.identity if self.identity is not None else (-1, -1, -1)
+        entities = self._entities
+        if _SWAP_ENTITIES:
+            entities = array(_ENTITIES_TYPECODE, entities)
+            entities.byteswap()
+        h = _RECORD_HEADER.pack(self.x, self.z, x_range[0], x_range[1],
+                                -1 if self.status is None else self.status,
+                                -1 if self.scan_level is None else self.scan_level,
+                                -1 if self.scan_time is None else self.scan_time,
+                                *identity)
+        return (h + self._statuses.tobytes() + entities.tobytes() +
+                (self.header or b""))
+
+    def load_record(self, record):
+        """ Replaces the results of the scan with the ones in a record.
+
+        Inputs:
+         - record -- Bytes object as returned by to_record()
+
+        """
+
+        h = _RECORD_HEADER.unpack_from(record)
+        self.status = h[4] if h[4] != -1 else None
+        self.scan_level = h[5] if h[5] != -1 else None
+        self.scan_time = h[6] if h[6] != -1 else None
+        self.identity = h[7:10] if h[7] != -1 else None
+        self.header = record[_RECORD_SIZE:] or None
+        self.scanned = True
+
+        statuses = record[_RECORD_STATUS_START:_RECORD_ENTITIES_START]
+        self._statuses = array('b', statuses)
+        self._entities = array(_ENTITIES_TYPECODE, record[_RECORD_ENTITIES_START:_RECORD_SIZE])
+        if _SWAP_ENTITIES:
+            self._entities.byteswap()
+        for s in c.CHUNK_STATUSES:
+            self._counts[s] = statuses.count(s & 0xff)
+        for s, index in self._index.items():
+            index.clear()
+            i = statuses.find(s & 0xff)
+            while i != -1:
+                index.add(i)
+                i = statuses.find(s & 0xff, i + 1)
 
     def get_coords(self):
         """ Returns the region file coordinates as two integers.
@@ -184,7 +378,9 @@ class ScannedRegionFile:
                     region file header as integer tuples
         """
 
-        return list(self._chunks.keys())
+        statuses = self._statuses
+        return [(x, z) for x in range(32) for z in range(32)
+                if statuses[x + 32 * z] != _RECORD_NO_CHUNK]
 
     @property
     def has_problems(self):
@@ -269,13 +465,18 @@ class ScannedRegionFile:
 
         """
 
+        if status in self._index:
+            keys = [(i & 31, i >> 5) for i in sorted(self._index[status], key=_chunk_order)]
+        elif status == None:
+            keys = self.keys()
+        else:
+            statuses = self._statuses
+            keys = [(x, z) for x in range(32) for z in range(32)
+                    if statuses[x + 32 * z] == status]
+
         l = []
-        for ck in list(self.keys()):
-            t = self[ck]
-            if status == t[c.TUPLE_STATUS]:
-                l.append((self.get_global_chunk_coords(*ck), t))
-            elif status == None:
-                l.append((self.get_global_chunk_coords(*ck), t))
+        for ck in keys:
+            l.append((self.get_global_chunk_coords(*ck), self[ck]))
 
         return l
 
@@ -295,9 +496,11 @@ class ScannedRegionFile:
         if self.status in c.REGION_PROBLEMS:
             text += " |- This region has status: {0}.\n".format(c.REGION_STATUS_TEXT[self.status])
         else:
-            for ck in list(self.keys()):
-                if self[ck][c.TUPLE_STATUS] not in c.CHUNK_PROBLEMS:
-                    continue
+            problems = set()
+            for s in c.CHUNK_PROBLEMS:
+                problems.update(self._index[s])
+            for i in sorted(problems, key=_chunk_order):
+                ck = (i & 31, i >> 5)
                 status = self[ck][c.TUPLE_STATUS]
                 h_coords = ck
                 g_coords = self.get_global_chunk_coords(*h_coords)
@@ -306,6 +509,8 @@ class ScannedRegionFile:
                 if self[ck][c.TUPLE_STATUS] == c.CHUNK_TOO_MANY_ENTITIES:
                     text += " | +-No. entities: {0}\n".format(self[ck][c.TUPLE_NUM_ENTITIES])
                 text += " |\n"
+            if text and self.scan_level == c.SCAN_LEVEL_QUICK:
+                text = " |- Quick scan, only the headers have been checked.\n" + text
 
         return text
 
@@ -372,7 +577,9 @@ class ScannedRegionFile:
             region_file = region.RegionFile(self.path)
             # catch the exception of corrupted chunks 
             try:
-                chunk = region_file.get_chunk(*local_coords)
+                # Only a few tags are used, lazy parsing saves parsing and
+                # rendering the rest of the chunk
+                chunk = region_file.get_chunk(*local_coords, lazy=True)
             except region.ChunkDataError:
                 # if we are here the chunk is corrupted, but still
                 if status == c.CHUNK_CORRUPTED:
@@ -480,6 +687,74 @@ class ScannedRegionFile:
 
         return delete_entities( region.RegionFile(self.path), x, z )
 
+    def dump_problematic_chunks(self, status, directory, dump_format, chunk_size_limit=None):
+        """ Writes the chunks with the given status in text files.
+
+        Inputs:
+         - status -- Integer with the status of the chunks to write.
+                     See CHUNK_STATUSES in constants.py
+         - directory -- String with the path of the directory for the files.
+         - dump_format -- The format of the text, see DUMP_FORMATS in constants.py
+         - chunk_size_limit -- Integer or None. Chunks bigger than this number of
+                               bytes once decompressed are skipped, without
+                               decompressing more than that.
+
+        Return:
+         - counter -- An integer with the amount of written chunks.
+
+        Every chunk is written in its own file, named after the region file
+        and the local coordinates of the chunk, e.g. r.0.0.mca.chunk.3.4.snbt.
+        Only the list of entities is written for the chunks with too many
+        entities (one entity per line in JSON), the whole chunk for the rest.
+
+        The text is written while the chunk is read, see write_snbt() in
+        nbt.py, so chunks with thousands of entities don't use much memory.
+        Chunks that can't be read or are too large are skipped, and broken
+        chunks are written up to the error.
+
+        """
+
+        counter = 0
+        bad_chunks = self.list_chunks(status)
+        if not bad_chunks:
+            return counter
+
+        # Only read, so read only mounts and snapshots can be dumped too
+        region_file = region.RegionFile(self.path, readonly=True)
+        try:
+            for ck in bad_chunks:
+                global_coords = ck[0]
+                x, z = _get_local_chunk_coords(*global_coords)
+                try:
+                    data = region_file.get_blockdata(x, z, max_size=chunk_size_limit)
+                except (region.RegionFileFormatError, region.InconceivedChunk,
+                        region.ChunkTooLarge) as e:
+                    print("Can't read the chunk ({0},{1}) of the region file {2}: {3}".format(x, z, self.filename, e))
+                    continue
+
+                path = None
+                if status == c.CHUNK_TOO_MANY_ENTITIES:
+                    try:
+                        path = get_chunk_entities_path(data)
+                    except (nbt.MalformedFileError, AssertionError, KeyError):
+                        # Unknown chunk, write all of it
+                        pass
+
+                name = "{0}.chunk.{1}.{2}{3}".format(self.filename, x, z, c.DUMP_EXTENSIONS[dump_format])
+                with open(join(directory, name), 'w', encoding='utf-8') as f:
+                    try:
+                        if dump_format == c.DUMP_JSON:
+                            nbt.write_json_lines(data, f, path)
+                        else:
+                            nbt.write_snbt(data, f, path, c.DUMP_SNBT_INDENT)
+                    except (nbt.MalformedFileError, UnicodeDecodeError, KeyError) as e:
+                        print("Error writing the chunk ({0},{1}) of the region file {2}: {3}".format(x, z, self.filename, repr(e)))
+                counter += 1
+        finally:
+            region_file.close()
+
+        return counter
+
     def rescan_entities(self, options):
         """ Updates the status of all the chunks after changing entity_limit.
         
@@ -985,6 +1260,35 @@ class RegionSet(DataSet):
             counter += self._set[r].remove_entities()
         return counter
 
+    def dump_problematic_chunks(self, status, directory, dump_format, chunk_size_limit=None):
+        """ Writes all the chunks with the given status in text files.
+
+        Inputs:
+         - status -- Integer with the chunk status to write. See c.CHUNK_STATUSES
+                     in constants.py for a list of possible statuses.
+         - directory -- String with the path of the directory for the files.
+         - dump_format -- The format of the text, see c.DUMP_FORMATS in constants.py
+         - chunk_size_limit -- Integer or None, see ScannedRegionFile.dump_problematic_chunks()
+
+        Return:
+         - counter -- Integer with the number of chunks written
+
+        The files are written in a subdirectory with the dimension and the type
+        of the region files (e.g. DIM-1/region), created if needed. See
+        ScannedRegionFile.dump_problematic_chunks() for the files.
+        """
+
+        counter = 0
+        if self.count_chunks(status):
+            directory = join(directory, self._get_dim_type_string())
+            if not exists(directory):
+                makedirs(directory)
+            for r in list(self._set.keys()):
+                counter += self._set[r].dump_problematic_chunks(status, directory, dump_format,
+                                                                chunk_size_limit)
+
+        return counter
+
     def rescan_entities(self, options):
         """ Updates the c.CHUNK_TOO_MANY_ENTITIES status of all the chunks in the RegionSet.
         
@@ -1390,8 +1694,8 @@ class World:
                                 status = status_tuple[c.TUPLE_STATUS]
 
                             if status == c.CHUNK_OK:
-                                backup_region_file = region.RegionFile(backup_region_path)
-                                working_chunk = backup_region_file.get_chunk(local_coords[0], local_coords[1])
+                                backup_region_file = region.RegionFile(backup_region_path, readonly=True)
+                                working_chunk = backup_region_file.get_chunk(local_coords[0], local_coords[1], lazy=True)
 
                                 print("Replacing...")
                                 # the chunk exists and is healthy, fix it!
@@ -1451,6 +1755,29 @@ class World:
             counter += regionset.fix_problematic_chunks(status)
         return counter
 
+    def dump_problematic_chunks(self, status, directory, dump_format, chunk_size_limit=None):
+        """ Writes all the chunks with the given status in text files.
+
+        Inputs:
+         - status -- Integer with the chunk status to write. See CHUNK_STATUSES in constants.py
+                     for a list of possible statuses.
+         - directory -- String with the path of the directory for the files.
+         - dump_format -- The format of the text, see DUMP_FORMATS in constants.py
+         - chunk_size_limit -- Integer or None, see ScannedRegionFile.dump_problematic_chunks()
+
+        Return:
+         - counter -- Integer with the number of chunks written.
+
+        This method calls dump_problematic_chunks() in the RegionSets.
+
+        """
+
+        counter = 0
+        for regionset in self.regionsets:
+            counter += regionset.dump_problematic_chunks(status, directory, dump_format,
+                                                         chunk_size_limit)
+        return counter
+
     def replace_problematic_regions(self, backup_worlds, status, entity_limit, delete_entities):
         """ Replaces problematic region files using backups.
         
@@ -1503,7 +1830,7 @@ class World:
                             print("Backup region file found in:\n  {0}".format(backup_region_path))
                             # check the region file, just open it.
                             try:
-                                backup_region_file = region.RegionFile(backup_region_path)
+                                backup_region_file = region.RegionFile(backup_region_path, readonly=True)
                             except region.NoRegionHeader as e:
                                 print("Can't use this backup directory, the error while opening the region file: {0}".format(e))
                                 continue
@@ -1758,7 +2085,8 @@ def delete_entities(region_file, x, z):
 
     """
 
-    chunk = region_file.get_chunk(x, z)
+    # The entities are replaced without parsing them, see NBTFile.parse_data()
+    chunk = region_file.get_chunk(x, z, lazy=True)
     chunk_type = get_chunk_type(chunk)
     empty_tag_list = nbt.TAG_List(nbt.TAG_Byte, '', 'Entities')
 
@@ -1818,39 +2146,112 @@ def get_chunk_region(chunkX, chunkZ):
     return region_name
 
 
+# Tags of a chunk needed to know its type, its coordinates and its number
+# of entities, see get_chunk_info(). Tags used only to know if they exist
+# are asked with "#exists", so they are neither parsed nor walked.
+CHUNK_INFO_PATHS = ["DataVersion",
+                    "Level#exists",
+                    "structures#exists",
+                    "sections#exists",
+                    "Sections#exists",
+                    "Entities#len",
+                    "entities#len",
+                    "xPos",
+                    "zPos",
+                    "Level/xPos",
+                    "Level/zPos",
+                    "Level/Entities#len",
+                    "Position"]
+
+
+def get_chunk_info(chunk, entity_limit=None):
+    """ Extracts the tags of CHUNK_INFO_PATHS from a chunk.
+
+    Inputs:
+     - chunk -- The uncompressed NBT data of a chunk, as returned by
+                RegionFile.get_blockdata(), or a chunk from the NBT module.
+     - entity_limit -- Integer or None. If given, the data stops being parsed
+                       as soon as the chunk is known to have more entities
+                       than entity_limit, see has_too_many_entities().
+
+    Return:
+     - info -- Dictionary with the paths found, see extract_paths() in nbt.py.
+               Only these tags are parsed from the data.
+
+    The entities are counted from the header of their list, so a chunk with
+    thousands of entities is never fully parsed. With entity_limit, the rest
+    of the data of such a chunk is not even walked (nor checked).
+
+    """
+
+    if entity_limit is None:
+        return nbt.extract_paths(chunk, CHUNK_INFO_PATHS)
+    return nbt.extract_paths(chunk, CHUNK_INFO_PATHS,
+                             lambda info: has_too_many_entities(info, entity_limit))
+
+
+def has_too_many_entities(info, entity_limit):
+    """ Returns True if a partial chunk info already tells that the chunk has too many entities.
+
+    Inputs:
+     - info -- Dictionary returned by get_chunk_info(), it may miss tags
+               that are after the entities in the data.
+     - entity_limit -- Integer, threshold of entities for a chunk to be
+                       considered with too many entities.
+
+    The type and the coordinates of the chunk have to be known too, so a
+    chunk with too many entities is still found to be wrong located. A chunk
+    with the Level compound is taken as a level chunk older than 21w43a (1.18)
+    without waiting for DataVersion, that Minecraft writes after Level.
+
+    """
+
+    if "DataVersion" not in info and "Level#exists" not in info:
+        # The type of the chunk could still change with the next tags
+        return False
+    try:
+        get_chunk_data_coords(info)
+        num_entities = get_chunk_num_entities(info)
+    except (AssertionError, KeyError, TypeError, ValueError, IndexError):
+        # Missing or malformed tags, scan_chunk() decides what is wrong
+        return False
+    return num_entities is not None and num_entities > entity_limit
+
+
 def get_chunk_type(chunk):
     """Get the type of the chunk (Region/level, POIs or entities)
     
     Input:
-     - chunk -- A chunk, from the NBT module
+     - chunk -- A chunk, from the NBT module, or a dictionary returned by
+                get_chunk_info()
     
     Return:
      - type -- The chunk type (LEVEL_DIR, POI_DIR or ENTITIES_DIR)
     """
-    
+
+    info = chunk if isinstance(chunk, dict) else get_chunk_info(chunk)
+
     # DataVersion was introduced in snapshot 15w32a (1.9)
     # https://minecraft.fandom.com/wiki/Data_version
-    data_version = 0
-    if "DataVersion" in chunk:
-        data_version = chunk["DataVersion"].value
+    data_version = info.get("DataVersion", 0)
     
     # Region/level < 21w43a (1.17)
-    if data_version < 2844 and "Level" in chunk:
+    if data_version < 2844 and "Level#exists" in info:
         return c.LEVEL_DIR
     
     # Region/level >= 21w43a (1.18)
     # The "or" is important, because some tags doesn't seem to be mandatory
-    if data_version >= 2844 and ("structures" in chunk or "sections" in chunk):
+    if data_version >= 2844 and ("structures#exists" in info or "sections#exists" in info):
         return c.LEVEL_DIR
     
     # POIs >= 1.14 (Which snapshot ?)
     # I couldn't find when POI files were added
     # But it's certainly a snapshot after 18w43a (DataVersion = 1901)
-    if data_version >= 1901 and "Sections" in chunk:
+    if data_version >= 1901 and "Sections#exists" in info:
         return c.POI_DIR
     
     # Entities >= 20w45a (1.17)
-    if data_version >= 2681 and "Entities" in chunk:
+    if data_version >= 2681 and "Entities#len" in info:
         return c.ENTITIES_DIR
     
     raise AssertionError("Unrecognized chunk type in get_chunk_type().")
@@ -1860,7 +2261,8 @@ def get_chunk_data_coords(nbt_file):
     """ Gets and returns the coordinates stored in the NBT structure of the chunk.
     
     Inputs:
-     - nbt_file -- An NBT file. From the nbt module.
+     - nbt_file -- An NBT file. From the nbt module, or a dictionary returned
+                   by get_chunk_info().
      
     Return:
      - coordX, coordZ -- Integers with the X and Z global coordinates of the chunk.
@@ -1870,22 +2272,22 @@ def get_chunk_data_coords(nbt_file):
 
     """
 
-    chunk_type = get_chunk_type(nbt_file)
+    info = nbt_file if isinstance(nbt_file, dict) else get_chunk_info(nbt_file)
+    chunk_type = get_chunk_type(info)
 
     # Region file
     if chunk_type == c.LEVEL_DIR :
         # Since snapshot 21w43a (1.18), "Level" tag doesn't exist anymore
-        if "DataVersion" in nbt_file and nbt_file["DataVersion"].value >= 2844 :
-            level = nbt_file
+        if info.get("DataVersion", 0) >= 2844 :
+            coordX = info['xPos']
+            coordZ = info['zPos']
         else :
-            level = nbt_file.__getitem__('Level')
-
-        coordX = level.__getitem__('xPos').value
-        coordZ = level.__getitem__('zPos').value
+            coordX = info['Level/xPos']
+            coordZ = info['Level/zPos']
 
     # Entities file :
     elif chunk_type == c.ENTITIES_DIR :
-        coordX, coordZ = nbt_file.__getitem__('Position').value
+        coordX, coordZ = info['Position']
 
     else :
         raise AssertionError("Unrecognized chunk in get_chunk_data_coords().")
@@ -1893,6 +2295,63 @@ def get_chunk_data_coords(nbt_file):
     return coordX, coordZ
 
 
+def get_chunk_num_entities(chunk):
+    """ Gets and returns the number of entities stored in a chunk.
+
+    Inputs:
+     - chunk -- A chunk from the NBT module, or a dictionary returned by
+                get_chunk_info().
+
+    Return:
+     - num_entities -- Integer or None if the chunk doesn't store entities.
+
+    Raises KeyError if a level chunk older than 20w45a (1.17) doesn't have
+    the mandatory Entities tag.
+
+    """
+
+    info = chunk if isinstance(chunk, dict) else get_chunk_info(chunk)
+    path = get_chunk_entities_path(info)
+
+    if path is None:
+        return None
+
+    # Since snapshot 20w45a (1.17), entities MAY BE separated
+    if info.get("DataVersion", 0) >= 2681:
+        return info.get(path + "#len")
+    return info[path + "#len"]
+
+
+def get_chunk_entities_path(chunk):
+    """ Gets and returns the path of the list of entities of a chunk.
+
+    Inputs:
+     - chunk -- A chunk from the NBT module, the uncompressed NBT data of a
+                chunk or a dictionary returned by get_chunk_info().
+
+    Return:
+     - path -- String with the names of the tags separated by "/" (e.g.
+               "Level/Entities"), as used by extract_paths() in nbt.py, or
+               None if the chunk doesn't store entities. The list may not
+               exist in the chunk.
+
+    """
+
+    info = chunk if isinstance(chunk, dict) else get_chunk_info(chunk)
+    chunk_type = get_chunk_type(info)
+
+    if chunk_type == c.ENTITIES_DIR:
+        return "Entities"
+    elif chunk_type != c.LEVEL_DIR:
+        return None
+
+    # Since snapshot 21w43a (1.18), "Level" tag doesn't exist anymore
+    # According to the wiki, an "entities" tag can still be there (But I've never seen it)
+    if info.get("DataVersion", 0) >= 2844:
+        return "entities"
+    return "Level/Entities"
+
+
 def get_region_coords(filename):
     """ Get and return a region file coordinates from path.
     
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import nbt.nbt as nbt
+import nbt.region as region
+import regionfixer_core.constants as c
+from regionfixer_core import cache, world
+from regionfixer_core.scan import scan_region_file
+
+
+def _add(compound, tag, name):
+    tag.name = name
+    compound.tags.append(tag)
+    return tag
+
+
+def _chunk(x, z, num_entities=0):
+    """ Returns a level chunk older than 1.18 with global coords x, z. """
+
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    level = _add(chunk, nbt.TAG_Compound(), "Level")
+    _add(level, nbt.TAG_Int(x), "xPos")
+    _add(level, nbt.TAG_Int(z), "zPos")
+    entities = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Entities")
+    for i in range(num_entities):
+        entities.append(nbt.TAG_Compound())
+    _add(chunk, nbt.TAG_Int(1343), "DataVersion")
+    return chunk
+
+
+def _scan(path, previous=None):
+    return scan_region_file(world.ScannedRegionFile(path), 5, False, previous,
+                            keep_stamps=True)
+
+
+class ScanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.region_path = os.path.join(self.directory, "r.0.0.mca")
+        open(self.region_path, "wb").close()
+        region_file = region.RegionFile(self.region_path)
+        region_file.write_chunk(0, 0, _chunk(0, 0))
+        region_file.write_chunk(1, 0, _chunk(1, 0))
+        region_file.close()
+        self.cache_path = os.path.join(self.directory, "cache.dat")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def stored(self):
+        """ Scans the region file and stores the results in a new cache. """
+
+        scan_cache = cache.ScanCache(self.cache_path, 5)
+        scan_cache.store(_scan(self.region_path))
+        scan_cache.save()
+        return cache.ScanCache(self.cache_path, 5)
+
+    def test_hit(self):
+        scan_cache = self.stored()
+        cached = scan_cache.get(self.region_path)
+        self.assertEqual(cached.identity, cache.get_file_identity(self.region_path))
+        self.assertTrue(scan_cache.is_unchanged(cached, False))
+        self.assertEqual(cached[(1, 0)], (0, c.CHUNK_OK))
+
+    def test_miss_size(self):
+        scan_cache = self.stored()
+        with open(self.region_path, "ab") as f:
+            f.write(b"\x00" * region.SECTOR_LENGTH)
+        self.assertFalse(scan_cache.is_unchanged(scan_cache.get(self.region_path), False))
+
+    def test_miss_mtime(self):
+        scan_cache = self.stored()
+        st = os.stat(self.region_path)
+        os.utime(self.region_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        self.assertFalse(scan_cache.is_unchanged(scan_cache.get(self.region_path), False))
+
+    def test_miss_inode(self):
+        scan_cache = self.stored()
+        # Same size and modification time, another file
+        copy_path = self.region_path + ".copy"
+        shutil.copy2(self.region_path, copy_path)
+        os.replace(copy_path, self.region_path)
+        cached = scan_cache.get(self.region_path)
+        identity = cache.get_file_identity(self.region_path)
+        self.assertEqual(cached.identity[:2], identity[:2])
+        self.assertNotEqual(cached.identity[2], identity[2])
+        self.assertFalse(scan_cache.is_unchanged(cached, False))
+
+    def test_miss_rescans_changed_chunks(self):
+        cached = self.stored().get(self.region_path)
+        region_file = region.RegionFile(self.region_path)
+        region_file.write_chunk(1, 0, _chunk(1, 0, 10))
+        region_file.close()
+        # Saved by Minecraft a second later, same offset and sector count
+        with open(self.region_path, "r+b") as f:
+            f.seek(region.SECTOR_LENGTH + 4)
+            timestamp = int.from_bytes(f.read(4), "big")
+            f.seek(region.SECTOR_LENGTH + 4)
+            f.write((timestamp + 1).to_bytes(4, "big"))
+        r = _scan(self.region_path, cached)
+        self.assertEqual(r[(0, 0)], (0, c.CHUNK_OK))
+        self.assertEqual(r[(1, 0)], (10, c.CHUNK_TOO_MANY_ENTITIES))
+
+    def test_quick_scan_results_not_used_for_full_scan(self):
+        cached = self.stored().get(self.region_path)
+        cached.scan_level = c.SCAN_LEVEL_QUICK
+        self.assertTrue(cache.is_result_usable(cached, False, c.SCAN_LEVEL_QUICK))
+        self.assertFalse(cache.is_result_usable(cached, False, c.SCAN_LEVEL_FULL))
+
+    def test_other_entity_limit(self):
+        self.stored()
+        self.assertEqual(len(cache.ScanCache(self.cache_path, 6)), 0)
+
+    def test_invalidate(self):
+        # What --invalidate-cache does before scanning
+        scan_cache = self.stored()
+        self.assertEqual(len(scan_cache), 1)
+        scan_cache.invalidate()
+        self.assertEqual(len(scan_cache), 0)
+        self.assertFalse(os.path.exists(self.cache_path))
+        self.assertEqual(len(cache.ScanCache(self.cache_path, 5)), 0)
+        scan_cache.invalidate()
+
+    def test_record_round_trip(self):
+        r = _scan(self.region_path)
+        self.assertEqual(len(r.header), 2 * region.SECTOR_LENGTH)
+        loaded = world.ScannedRegionFile(self.region_path)
+        loaded.load_record(r.to_record())
+        unpickled = pickle.loads(pickle.dumps(r, pickle.HIGHEST_PROTOCOL))
+        for other in (loaded, unpickled):
+            self.assertEqual(other.to_record(), r.to_record())
+            self.assertEqual(other.identity, r.identity)
+            self.assertEqual(other.header, r.header)
+            self.assertEqual(other.count_chunks(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
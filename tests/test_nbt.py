@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from gzip import GzipFile
+from io import BytesIO, StringIO
+import json
+import unittest
+
+import nbt.nbt as nbt
+
+
+def _add(compound, tag, name):
+    tag.name = name
+    compound.tags.append(tag)
+    return tag
+
+
+def _sample():
+    """ Returns a small NBTFile with a tag of every type. """
+
+    root = nbt.NBTFile()
+    root.name = "root"
+    _add(root, nbt.TAG_Byte(-1), "byte")
+    _add(root, nbt.TAG_Short(2), "short")
+    _add(root, nbt.TAG_Int(3), "int")
+    _add(root, nbt.TAG_Long(-4), "long")
+    _add(root, nbt.TAG_Float(0.5), "float")
+    _add(root, nbt.TAG_Double(1.5), "double")
+    _add(root, nbt.TAG_String("text"), "string")
+    byte_array = _add(root, nbt.TAG_Byte_Array(), "byte array")
+    byte_array.value = bytearray(b"\xff\x00\x01")
+    int_array = _add(root, nbt.TAG_Int_Array(), "int array")
+    int_array.value = [1, -2]
+    long_array = _add(root, nbt.TAG_Long_Array(), "long array")
+    long_array.value = [3, -4]
+    numbers = _add(root, nbt.TAG_List(nbt.TAG_Short), "list")
+    numbers.append(nbt.TAG_Short(7))
+    compound = _add(root, nbt.TAG_Compound(), "compound")
+    _add(compound, nbt.TAG_Int(8), "x")
+    return root
+
+
+class ExtractPathsTest(unittest.TestCase):
+    def test_exists(self):
+        data = bytes(_sample().render_data())
+        paths = ["compound#exists", "string#exists", "missing#exists",
+                 "compound/x#exists", "compound/y#exists"]
+        expected = {"compound#exists": True, "string#exists": True,
+                    "compound/x#exists": True}
+        self.assertEqual(nbt.extract_paths(data, paths), expected)
+        self.assertEqual(nbt.extract_paths(_sample(), paths), expected)
+
+    def test_bytes_like(self):
+        data = bytes(_sample().render_data())
+        paths = ["byte", "long", "double", "string", "byte array", "int array",
+                 "long array", "list", "compound", "compound/x", "list#len",
+                 "string#len", "compound#exists"]
+        expected = nbt.extract_paths(data, paths)
+        self.assertEqual(len(expected), len(paths))
+        for other in (memoryview(data), bytearray(data)):
+            result = nbt.extract_paths(other, paths)
+            self.assertEqual(sorted(result), sorted(expected))
+            for path, value in expected.items():
+                if isinstance(value, nbt.TAG):
+                    self.assertEqual(result[path].pretty_tree(), value.pretty_tree())
+                else:
+                    self.assertEqual(result[path], value)
+
+    def test_exists_before_payload(self):
+        # The stop function gets the compound before its tags are walked
+        data = bytes(_sample().render_data())
+        seen = []
+
+        def stop(result):
+            seen.append(sorted(result))
+            return False
+
+        nbt.extract_paths(data, ["compound#exists", "compound/x"], stop)
+        self.assertEqual(seen, [["compound#exists"], ["compound#exists", "compound/x"]])
+
+
+def _non_finite():
+    """ Returns the data of a root compound with NaN and infinities. """
+
+    root = nbt.NBTFile()
+    root.name = ""
+    _add(root, nbt.TAG_Double(float("nan")), "nan")
+    _add(root, nbt.TAG_Float(float("inf")), "inf")
+    doubles = _add(root, nbt.TAG_List(nbt.TAG_Double), "doubles")
+    doubles.append(nbt.TAG_Double(float("-inf")))
+    doubles.append(nbt.TAG_Double(2.5))
+    return bytes(root.render_data())
+
+
+def _strict_constant(name):
+    raise ValueError("Not strict JSON: %s" % name)
+
+
+class RenderTest(unittest.TestCase):
+    def test_render_data(self):
+        root = nbt.NBTFile()
+        root.name = "r"
+        _add(root, nbt.TAG_Short(2), "s")
+        numbers = _add(root, nbt.TAG_List(nbt.TAG_Int), "l")
+        numbers.extend([nbt.TAG_Int(1), nbt.TAG_Int(-1)])
+        array = _add(root, nbt.TAG_Long_Array(), "a")
+        array.value = [1]
+        _add(root, nbt.TAG_String("\u00e9"), "t")
+        self.assertEqual(bytes(root.render_data()),
+                         b"\x0a\x00\x01r"
+                         b"\x02\x00\x01s\x00\x02"
+                         b"\x09\x00\x01l\x03\x00\x00\x00\x02"
+                         b"\x00\x00\x00\x01\xff\xff\xff\xff"
+                         b"\x0c\x00\x01a\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x01"
+                         b"\x08\x00\x01t\x00\x02\xc3\xa9"
+                         b"\x00")
+
+    def test_round_trip(self):
+        data = bytes(_sample().render_data())
+        self.assertEqual(bytes(nbt.NBTFile(buffer=BytesIO(data)).render_data()), data)
+        buffer = BytesIO()
+        _sample()._render_buffer(buffer)
+        self.assertEqual(buffer.getvalue(), data[len(b"\x0a\x00\x04root"):])
+        fileobj = BytesIO()
+        _sample().write_file(fileobj=fileobj)
+        self.assertEqual(GzipFile(fileobj=BytesIO(fileobj.getvalue())).read(), data)
+
+    def test_wrong_list_element(self):
+        root = _sample()
+        root["list"].tags.append(nbt.TAG_Int(8))
+        buffer = BytesIO()
+        self.assertRaises(ValueError, root.write_file, buffer=buffer)
+        self.assertEqual(buffer.getvalue(), b"")
+
+
+class CompoundIndexTest(unittest.TestCase):
+    def compound(self):
+        compound = nbt.TAG_Compound()
+        for value, name in ((1, "a"), (2, "b"), (3, "a"), (4, "c")):
+            _add(compound, nbt.TAG_Int(value), name)
+        return compound
+
+    def test_first_match(self):
+        compound = self.compound()
+        self.assertEqual(compound["a"].value, 1)
+        self.assertIn("c", compound)
+        self.assertNotIn("d", compound)
+        del compound["a"]
+        self.assertEqual(compound["a"].value, 3)
+        self.assertEqual([tag.name for tag in compound.tags], ["b", "a", "c"])
+
+    def test_setitem(self):
+        compound = self.compound()
+        compound["b"].value
+        compound["b"] = nbt.TAG_Int(5)
+        compound["d"] = nbt.TAG_Int(6)
+        self.assertEqual(compound["b"].value, 5)
+        self.assertEqual(compound["d"].value, 6)
+        self.assertEqual([tag.name for tag in compound.tags], ["a", "b", "a", "c", "d"])
+
+    def test_list_changes(self):
+        compound = self.compound()
+        compound["c"]
+        compound.tags.insert(0, nbt.TAG_Int(7, "c"))
+        self.assertEqual(compound["c"].value, 7)
+        compound.tags.append(nbt.TAG_Int(8, "e"))
+        self.assertEqual(compound["e"].value, 8)
+        compound.tags.reverse()
+        self.assertEqual(compound["a"].value, 3)
+        compound.tags = [nbt.TAG_Int(9, "a")]
+        self.assertEqual(compound["a"].value, 9)
+        self.assertNotIn("c", compound)
+
+    def test_rename(self):
+        compound = self.compound()
+        other = self.compound()
+        self.assertEqual(compound["a"].value, 1)
+        self.assertEqual(other["c"].value, 4)
+        compound["a"].name = "z"
+        other.tags[1].name = "c"
+        self.assertEqual(compound["a"].value, 3)
+        self.assertEqual(compound["z"].value, 1)
+        self.assertEqual(other["c"].value, 2)
+
+    def test_parsed(self):
+        root = nbt.NBTFile(data=bytes(_sample().render_data()))
+        self.assertEqual(root["compound"]["x"].value, 8)
+        self.assertEqual(root["string"].value, "text")
+        self.assertNotIn("missing", root)
+
+
+class LazyTest(unittest.TestCase):
+    def test_untouched(self):
+        data = bytes(_sample().render_data())
+        lazy = nbt.NBTFile(data=data, lazy=True)
+        self.assertEqual(len(lazy["list"]), 1)
+        self.assertIsNotNone(lazy["list"]._span)
+        self.assertIsNotNone(lazy["compound"]._span)
+        self.assertEqual(bytes(lazy.render_data()), data)
+
+    def test_fully_parsed(self):
+        data = bytes(_sample().render_data())
+        lazy = nbt.NBTFile(data=data, lazy=True)
+        self.assertEqual(lazy.pretty_tree(), nbt.NBTFile(data=data).pretty_tree())
+        self.assertEqual(bytes(lazy.render_data()), data)
+
+    def test_changed(self):
+        data = bytes(_sample().render_data())
+        lazy = nbt.NBTFile(data=data, lazy=True)
+        eager = nbt.NBTFile(data=data)
+        for root in (lazy, eager):
+            root["compound"]["x"].value = 9
+            root["list"].append(nbt.TAG_Short(10))
+            del root["string"]
+        self.assertEqual(bytes(lazy.render_data()), bytes(eager.render_data()))
+
+    def test_broken(self):
+        data = bytes(_sample().render_data())
+        self.assertRaises(nbt.MalformedFileError, nbt.NBTFile,
+                          data=data[:data.index(b"\x03\x00\x01x") + 5], lazy=True)
+
+
+def _rebuild(events):
+    """ Returns the value of the root compound from iterparse() events. """
+
+    stack = [[]]
+    for event, tagid, name, value in events:
+        if event == "start":
+            stack.append({} if tagid == nbt.TAG_COMPOUND else [])
+            continue
+        if event == "end":
+            value = stack.pop()
+        parent = stack[-1]
+        if isinstance(parent, dict):
+            parent.setdefault(name, value)
+        else:
+            parent.append(value)
+    return stack[0][0]
+
+
+class DecodeTest(unittest.TestCase):
+    def test_decode(self):
+        data = bytes(_sample().render_data())
+        root = nbt.NBTFile(data=data)
+        decoded = nbt.decode(data)
+        self.assertEqual(list(decoded), [tag.name for tag in root.tags])
+        for tag in root.tags:
+            if tag.id == nbt.TAG_LIST:
+                self.assertEqual(decoded[tag.name], [item.value for item in tag.tags])
+            elif tag.id == nbt.TAG_COMPOUND:
+                self.assertEqual(decoded[tag.name], {"x": 8})
+            else:
+                self.assertEqual(decoded[tag.name], tag.value)
+                self.assertIs(type(decoded[tag.name]), type(tag.value))
+        for other in (bytearray(data), memoryview(data)):
+            self.assertEqual(nbt.decode(other), decoded)
+
+    def test_decode_types(self):
+        decoded = nbt.decode(bytes(_sample().render_data()), types=True)
+        self.assertEqual(decoded[0], nbt.TAG_COMPOUND)
+        self.assertEqual(decoded[1]["short"], (nbt.TAG_SHORT, 2))
+        self.assertEqual(decoded[1]["list"], (nbt.TAG_LIST, [(nbt.TAG_SHORT, 7)]))
+        self.assertEqual(decoded[1]["compound"], (nbt.TAG_COMPOUND, {"x": (nbt.TAG_INT, 8)}))
+
+    def test_iterparse(self):
+        data = bytes(_sample().render_data())
+        events = list(nbt.iterparse(data))
+        self.assertEqual(events[0], ("start", nbt.TAG_COMPOUND, "root", None))
+        self.assertEqual(events[-1], ("end", nbt.TAG_COMPOUND, "root", None))
+        self.assertIn(("start", nbt.TAG_LIST, "list", 1), events)
+        self.assertIn(("value", nbt.TAG_SHORT, None, 7), events)
+        self.assertEqual(_rebuild(events), nbt.decode(data))
+
+    def test_broken(self):
+        data = bytes(_sample().render_data())
+        truncated = data[:data.index(b"\x03\x00\x01x") + 5]
+        self.assertRaises(nbt.MalformedFileError, nbt.decode, truncated)
+        events = nbt.iterparse(truncated)
+        self.assertEqual(next(events), ("start", nbt.TAG_COMPOUND, "root", None))
+        self.assertRaises(nbt.MalformedFileError, list, events)
+
+
+class TextExportTest(unittest.TestCase):
+    def test_snbt_non_finite(self):
+        out = StringIO()
+        nbt.write_snbt(_non_finite(), out)
+        self.assertEqual(out.getvalue(),
+                         '{nan:"NaN",inf:1.0e999f,doubles:[-1.0e999d,2.5d]}')
+        self.assertEqual(float("-1.0e999"), float("-inf"))
+
+    def test_json_lines_non_finite(self):
+        out = StringIO()
+        nbt.write_json_lines(_non_finite(), out)
+        lines = [json.loads(line, parse_constant=_strict_constant)
+                 for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, [{"nan": "NaN"}, {"inf": "Infinity"},
+                                 {"doubles": ["-Infinity", 2.5]}])
+
+    def test_json_lines_path(self):
+        out = StringIO()
+        nbt.write_json_lines(_non_finite(), out, "doubles")
+        self.assertEqual(out.getvalue(), '"-Infinity"\n2.5\n')
+
+
+class ArrayTest(unittest.TestCase):
+    def test_fmt(self):
+        data = bytes(_sample().render_data())
+        parsed = nbt.NBTFile(buffer=BytesIO(data))
+        for tag_class, name in ((nbt.TAG_Int_Array, "int array"),
+                                (nbt.TAG_Long_Array, "long array")):
+            for tag in (tag_class(), parsed[name], nbt.NBTFile(data=data)[name]):
+                self.assertEqual(tag.fmt.size, tag.itemsize)
+                self.assertEqual(tag.fmt.format[-1], tag.typecode)
+            fmt = tag.update_fmt(len(tag))
+            self.assertEqual(list(fmt.unpack(fmt.pack(*tag.value))), list(tag.value))
+
+
+if __name__ == "__main__":
+    unittest.main()
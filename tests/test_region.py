@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from io import BytesIO, UnsupportedOperation
+import os
+import shutil
+import tempfile
+import unittest
+
+import nbt.nbt as nbt
+import nbt.region as region
+
+
+def _chunk(x):
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    tag = nbt.TAG_Int(x)
+    tag.name = "x"
+    chunk.tags.append(tag)
+    return chunk
+
+
+class ParseHeaderTest(unittest.TestCase):
+    def test_parse_header_again(self):
+        f = BytesIO()
+        region_file = region.RegionFile(fileobj=f)
+        region_file.write_chunk(0, 0, _chunk(0))
+        region_file.write_chunk(1, 0, _chunk(1))
+        self.assertTrue(region_file.metadata[0, 0].is_created())
+        # Break the length of a chunk in its header and forget the other one
+        f.seek(3 * region.SECTOR_LENGTH)
+        f.write(b"\x00\x00\xff\xff")
+        f.seek(0)
+        f.write(b"\x00" * 4)
+        region_file._parse_header()
+        region_file._parse_chunk_headers()
+        self.assertFalse(region_file.metadata[0, 0].is_created())
+        self.assertEqual(region_file.metadata[0, 0].status, region.STATUS_CHUNK_NOT_CREATED)
+        self.assertEqual(region_file.metadata.get_status(1, 0), region.STATUS_CHUNK_OUT_OF_FILE)
+
+    def test_parse_empty_header(self):
+        f = BytesIO()
+        region_file = region.RegionFile(fileobj=f)
+        region_file.write_chunk(0, 0, _chunk(0))
+        region_file.metadata[0, 0]
+        f.truncate(0)
+        region_file._parse_header()
+        self.assertEqual(region_file.get_chunk_coords(), [])
+        self.assertEqual(region_file.metadata.get_status(0, 0), region.STATUS_CHUNK_NOT_CREATED)
+
+
+class ReadOnlyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "r.0.0.mca")
+        open(self.path, "wb").close()
+        region_file = region.RegionFile(self.path)
+        for x in range(3):
+            region_file.write_chunk(x, 1, _chunk(x))
+        region_file.close()
+        with open(self.path, "rb") as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check(self, region_file):
+        self.assertEqual(bytes(region_file.get_header()), self.data[:2 * region.SECTOR_LENGTH])
+        self.assertEqual([(m.x, m.z, m.status) for m in region_file.get_metadata()],
+                         [(x, 1, region.STATUS_CHUNK_OK) for x in range(3)])
+        for x in range(3):
+            self.assertEqual(region_file.get_nbt(x, 1)["x"].value, x)
+            self.assertEqual(bytes(region_file.get_blockdata(x, 1)),
+                             bytes(_chunk(x).render_data()))
+        self.assertRaises(UnsupportedOperation, region_file.write_chunk, 3, 1, _chunk(3))
+        self.assertRaises(UnsupportedOperation, region_file.write_blockdata, 3, 1, b"")
+        self.assertRaises(UnsupportedOperation, region_file.unlink_chunk, 0, 1)
+
+    def test_file(self):
+        region_file = region.RegionFile(self.path, readonly=True)
+        self.check(region_file)
+        region_file.close()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_fileobj(self):
+        # Can't be memory mapped, read at once
+        f = BytesIO(self.data)
+        region_file = region.RegionFile(fileobj=f, readonly=True)
+        self.check(region_file)
+        self.assertEqual(f.getvalue(), self.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
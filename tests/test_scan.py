@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import nbt.nbt as nbt
+import nbt.region as region
+import regionfixer_core.constants as c
+from regionfixer_core import scan, world
+
+
+class RegionFileCostTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_region(self, data):
+        path = os.path.join(self.directory, "r.0.0.mca")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_truncated_header(self):
+        # Lengths that are not a multiple of the size of the entries
+        for length in (0, 3, 4094, region.SECTOR_LENGTH - 1):
+            path = self.write_region(b"\x01" * length)
+            self.assertEqual(scan._region_file_cost(path), length)
+
+    def test_chunks_in_header(self):
+        header = bytearray(2 * region.SECTOR_LENGTH)
+        header[0:4] = b"\x00\x00\x02\x01"
+        header[8:12] = b"\x00\x00\x03\x01"
+        path = self.write_region(bytes(header))
+        self.assertEqual(scan._region_file_cost(path),
+                         len(header) + 2 * scan.CHUNK_SCAN_COST)
+
+    def test_missing_file(self):
+        self.assertEqual(scan._region_file_cost(os.path.join(self.directory, "r.1.1.mca")), 0)
+
+
+class ChildProcessExceptionTest(unittest.TestCase):
+    def test_bad_region_file_name(self):
+        path = os.path.join(tempfile.gettempdir(), "r.a.b.mca")
+        result = scan.multiprocess_scan_regionfile((path, None, None))
+        self.assertEqual(result[0], path)
+        e = scan.ChildProcessException(result[0], *result[1])
+        self.assertEqual(e.filename, "r.a.b.mca")
+        self.assertIn("*** r.a.b.mca\n", e.printable_traceback)
+
+
+class _RegionFile(object):
+    """ Stands for a RegionFile with a single chunk. """
+
+    filename = "r.0.0.mca"
+
+    def __init__(self, chunk):
+        self.data = bytes(chunk.render_data())
+
+    def get_blockdata(self, x, z, max_size=None):
+        return self.data
+
+
+def _entities_chunk(position):
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    for tag, name in ((nbt.TAG_Int(2700), "DataVersion"),
+                      (position, "Position"),
+                      (nbt.TAG_List(nbt.TAG_Compound), "Entities")):
+        tag.name = name
+        chunk.tags.append(tag)
+    return chunk
+
+
+class ScanChunkTest(unittest.TestCase):
+    def scan(self, chunk):
+        return scan.scan_chunk(_RegionFile(chunk), (0, 0), (0, 0), 300)[1]
+
+    def test_entities_chunk(self):
+        position = nbt.TAG_Int_Array()
+        position.value = [0, 0]
+        self.assertEqual(self.scan(_entities_chunk(position)), (0, c.CHUNK_OK))
+
+    def test_malformed_position(self):
+        position = nbt.TAG_Int_Array()
+        position.value = [0]
+        self.assertEqual(self.scan(_entities_chunk(position)), (None, c.CHUNK_CORRUPTED))
+        self.assertEqual(self.scan(_entities_chunk(nbt.TAG_Int(0))), (None, c.CHUNK_CORRUPTED))
+
+    def test_malformed_data_version(self):
+        chunk = _entities_chunk(nbt.TAG_Int_Array())
+        chunk.tags[0] = nbt.TAG_String("2700", name="DataVersion")
+        self.assertEqual(self.scan(chunk), (None, c.CHUNK_CORRUPTED))
+
+
+def _level_chunk(x, z, num_entities):
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    level = nbt.TAG_Compound(name="Level")
+    chunk.tags.append(level)
+    level.tags.extend([nbt.TAG_Int(x, "xPos"), nbt.TAG_Int(z, "zPos"),
+                       nbt.TAG_List(nbt.TAG_Compound, name="Entities")])
+    for i in range(num_entities):
+        level["Entities"].append(nbt.TAG_Compound())
+    chunk.tags.append(nbt.TAG_Int(1343, "DataVersion"))
+    return chunk
+
+
+class SplitScanTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "r.0.0.mca")
+        open(self.path, "wb").close()
+        region_file = region.RegionFile(self.path)
+        for x in range(32):
+            # Chunks with problems in every part
+            region_file.write_chunk(x, x, _level_chunk(x, x, x))
+            region_file.write_chunk(x, 0, _level_chunk(x + 1, 0, 0))
+        region_file.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(scan.SPLIT_REGION_FILE_SIZE + region.SECTOR_LENGTH)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_split_scan(self):
+        expected = scan.scan_region_file(world.ScannedRegionFile(self.path), 5, False)
+        regionset = world.RegionSet(region_list=[self.path])
+        pool = scan.create_pool(3, 5, backend=c.BACKEND_THREADS)
+        try:
+            scanner = scan.AsyncRegionsetScanner(regionset, 3, 5, pool=pool)
+            ranges = [item[2] for item in scanner.list_files_to_scan]
+            self.assertEqual(ranges, [(0, 11), (11, 22), (22, 32)])
+            scanner.scan()
+            results = []
+            while not scanner.finished:
+                r = scanner.get_last_result()
+                if r is not None:
+                    results.append(r)
+        finally:
+            pool.terminate()
+        self.assertEqual(len(results), 1)
+        r = regionset[(0, 0)]
+        self.assertEqual(r.status, c.REGION_OK)
+        for status in c.CHUNK_STATUSES:
+            self.assertEqual(r.count_chunks(status), expected.count_chunks(status))
+        self.assertEqual(r.to_record()[world._RECORD_STATUS_START:],
+                         expected.to_record()[world._RECORD_STATUS_START:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import nbt.nbt as nbt
+import nbt.region as region
+import regionfixer_core.constants as c
+from regionfixer_core import world
+from regionfixer_core.scan import scan_region_file
+from regionfixer_core.store import ResultsStore
+
+
+def _add(compound, tag, name):
+    tag.name = name
+    compound.tags.append(tag)
+    return tag
+
+
+def _chunk(x, z, num_entities=0):
+    """ Returns a level chunk older than 1.18 with global coords x, z. """
+
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    level = _add(chunk, nbt.TAG_Compound(), "Level")
+    _add(level, nbt.TAG_Int(x), "xPos")
+    _add(level, nbt.TAG_Int(z), "zPos")
+    entities = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Entities")
+    for i in range(num_entities):
+        entities.append(nbt.TAG_Compound())
+    _add(chunk, nbt.TAG_Int(1343), "DataVersion")
+    return chunk
+
+
+class ResultsStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.region_directory = os.path.join(self.directory, "region")
+        os.mkdir(self.region_directory)
+        for rx in (0, 1):
+            path = os.path.join(self.region_directory, "r.{0}.0.mca".format(rx))
+            open(path, "wb").close()
+            region_file = region.RegionFile(path)
+            region_file.write_chunk(0, 0, _chunk(32 * rx, 0))
+            region_file.write_chunk(1, 0, _chunk(32 * rx + 1, 0, 10 * rx))
+            region_file.close()
+        self.store_path = os.path.join(self.directory, "store.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def stored(self):
+        """ Scans the region files, stores the results and returns the records. """
+
+        store = ResultsStore(self.store_path, 5)
+        regionset = world.RegionSet(self.region_directory)
+        records = {}
+        for r in regionset._get_list():
+            scan_region_file(r, 5, False, keep_stamps=True)
+            store.add_region(r, regionset)
+            records[r.filename] = r.to_record()
+        store.close()
+        return records
+
+    def test_load_regionset(self):
+        records = self.stored()
+        store = ResultsStore(self.store_path, 5, use_stored=True)
+        regionset = world.RegionSet(self.region_directory)
+        self.assertEqual(store.load_regionset(regionset), 0)
+        self.assertTrue(regionset.scanned)
+        for r in regionset._get_list():
+            self.assertEqual(r.to_record(), records[r.filename])
+        self.assertEqual(regionset.count_chunks(), 4)
+        self.assertEqual(regionset.count_chunks(c.CHUNK_TOO_MANY_ENTITIES), 1)
+        self.assertEqual(store.query_chunks(c.CHUNK_TOO_MANY_ENTITIES),
+                         [(os.path.abspath(regionset[(1, 0)].path), (33, 0),
+                           (10, c.CHUNK_TOO_MANY_ENTITIES))])
+        store.close()
+
+    def test_load_changed_file(self):
+        records = self.stored()
+        path = os.path.join(self.region_directory, "r.1.0.mca")
+        with open(path, "ab") as f:
+            f.write(b"\x00" * region.SECTOR_LENGTH)
+        store = ResultsStore(self.store_path, 5, use_stored=True)
+        regionset = world.RegionSet(self.region_directory)
+        self.assertEqual(store.load_regionset(regionset), 1)
+        self.assertFalse(regionset.scanned)
+        self.assertEqual(regionset[(0, 0)].to_record(), records["r.0.0.mca"])
+        changed = regionset[(1, 0)]
+        self.assertFalse(store.load_region(changed))
+        self.assertFalse(changed.scanned)
+        self.assertEqual(changed.count_chunks(), 0)
+        self.assertEqual(regionset.count_chunks(), 2)
+        store.close()
+
+    def test_other_entity_limit(self):
+        self.stored()
+        store = ResultsStore(self.store_path, 6, use_stored=True)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.load_regionset(world.RegionSet(self.region_directory)), 2)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#   Region Fixer.
+#   Fix your region files with a backup copy of your Minecraft world.
+#   Copyright (C) 2020  Alejandro Aguilera (Fenixin)
+#   https://github.com/Fenixin/Minecraft-Region-Fixer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from io import BytesIO
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import nbt.nbt as nbt
+import nbt.region as region
+import regionfixer_core.constants as c
+from regionfixer_core import world
+
+
+def _add(compound, tag, name):
+    tag.name = name
+    compound.tags.append(tag)
+    return tag
+
+
+def _level_chunk(num_entities, data_version=1343):
+    """ Returns the data of a chunk older than 1.18, with the tags in the
+    order Minecraft writes them (DataVersion after Level). """
+
+    chunk = nbt.NBTFile()
+    chunk.name = ""
+    level = _add(chunk, nbt.TAG_Compound(), "Level")
+    _add(level, nbt.TAG_Int(3), "xPos")
+    _add(level, nbt.TAG_Int(-4), "zPos")
+    entities = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Entities")
+    for i in range(num_entities):
+        entity = nbt.TAG_Compound()
+        _add(entity, nbt.TAG_String("minecraft:item"), "id")
+        entities.append(entity)
+    sections = _add(level, nbt.TAG_List(nbt.TAG_Compound), "Sections")
+    for y in range(4):
+        section = nbt.TAG_Compound()
+        _add(section, nbt.TAG_Byte(y), "Y")
+        sections.append(section)
+    _add(chunk, nbt.TAG_Int(data_version), "DataVersion")
+    return bytes(chunk.render_data())
+
+
+class ChunkInfoTest(unittest.TestCase):
+    def test_level_chunk(self):
+        info = world.get_chunk_info(_level_chunk(10))
+        self.assertEqual(world.get_chunk_type(info), c.LEVEL_DIR)
+        self.assertEqual(world.get_chunk_data_coords(info), (3, -4))
+        self.assertEqual(world.get_chunk_num_entities(info), 10)
+
+    def test_level_chunk_stops_at_entity_limit(self):
+        data = _level_chunk(1000)
+        full = world.get_chunk_info(data)
+        limited = world.get_chunk_info(data, 300)
+        # Stopped after the entities, before Sections and DataVersion
+        self.assertNotIn("DataVersion", limited)
+        for info in (full, limited):
+            self.assertEqual(world.get_chunk_type(info), c.LEVEL_DIR)
+            self.assertEqual(world.get_chunk_data_coords(info), (3, -4))
+            self.assertEqual(world.get_chunk_num_entities(info), 1000)
+
+    def test_level_chunk_truncated_after_entities(self):
+        # The rest of the data is not walked once the limit is passed
+        data = _level_chunk(1000)
+        truncated = data[:data.index(b"Sections")]
+        self.assertRaises(nbt.MalformedFileError, world.get_chunk_info, truncated)
+        info = world.get_chunk_info(truncated, 300)
+        self.assertEqual(world.get_chunk_num_entities(info), 1000)
+
+    def test_level_chunk_under_entity_limit(self):
+        data = _level_chunk(10)
+        self.assertEqual(world.get_chunk_info(data, 300), world.get_chunk_info(data))
+
+
+    def test_malformed_tags_under_entity_limit(self):
+        # Left to scan_chunk(), the stop condition never raises
+        self.assertFalse(world.has_too_many_entities(
+            {"DataVersion": "1343", "Level#exists": True, "Level/Entities#len": 1000}, 300))
+        self.assertFalse(world.has_too_many_entities(
+            {"DataVersion": 2700, "Entities#len": 1000, "Position": [3]}, 300))
+        self.assertFalse(world.has_too_many_entities(
+            {"DataVersion": 2700, "Entities#len": 1000, "Position": 3}, 300))
+
+
+class RecordTest(unittest.TestCase):
+    def scanned(self):
+        scanned = world.ScannedRegionFile("r.1.-2.mca")
+        scanned[(0, 0)] = (0, c.CHUNK_OK)
+        scanned[(5, 7)] = (100000, c.CHUNK_TOO_MANY_ENTITIES)
+        scanned[(31, 31)] = (-1, c.CHUNK_CORRUPTED)
+        return scanned
+
+    def test_entities_layout(self):
+        # Little endian int32, whatever the machine
+        record = self.scanned().to_record()
+        start = world._RECORD_ENTITIES_START
+        entities = struct.unpack_from("<1024i", record, start)
+        self.assertEqual(entities[5 + 32 * 7], 100000)
+        self.assertEqual(entities[0], 0)
+        self.assertEqual(entities[31 + 32 * 31], -1)
+        self.assertEqual(len(record), world._RECORD_SIZE)
+
+    def test_round_trip_swapped(self):
+        # As a big endian machine would do it
+        with mock.patch.object(world, "_SWAP_ENTITIES", True):
+            record = self.scanned().to_record()
+            loaded = world.ScannedRegionFile("r.1.-2.mca")
+            loaded.load_record(record)
+        self.assertEqual(struct.unpack_from(">i", record, world._RECORD_ENTITIES_START + 4 * (5 + 32 * 7)),
+                         (100000,))
+        self.assertEqual(loaded[(5, 7)], (100000, c.CHUNK_TOO_MANY_ENTITIES))
+
+
+    def parts(self):
+        # The whole file scanned in three parts, as scan_region_file() does
+        parts = []
+        for x_range, status, scan_time in (((0, 11), c.REGION_OK, 10.0),
+                                           ((11, 22), c.REGION_UNREADABLE, 30.0),
+                                           ((22, 32), c.REGION_OK, 20.0)):
+            part = world.ScannedRegionFile("r.1.-2.mca")
+            part.status = status
+            part.scan_level = c.SCAN_LEVEL_FULL
+            part.scan_time = scan_time
+            part.identity = (1, 2, 3)
+            part.header = bytes(8192)
+            for x in range(*x_range):
+                part[(x, x)] = (x, c.CHUNK_OK)
+            parts.append(part.to_record(x_range))
+        return parts
+
+    def test_merge_records_out_of_order(self):
+        parts = self.parts()
+        merged = world.merge_records(parts)
+        self.assertEqual(world.merge_records(parts[::-1]), merged)
+        self.assertEqual(world.merge_records([parts[1], parts[2], parts[0]]), merged)
+        loaded = world.ScannedRegionFile("r.1.-2.mca")
+        loaded.load_record(merged)
+        self.assertEqual(loaded.count_chunks(), 32)
+        self.assertEqual(loaded[(20, 20)], (20, c.CHUNK_OK))
+        self.assertEqual(loaded.status, c.REGION_UNREADABLE)
+        self.assertEqual(loaded.scan_time, 30.0)
+        self.assertEqual(loaded.identity, (1, 2, 3))
+        self.assertEqual(loaded.header, bytes(8192))
+
+    def test_merge_records_file_changed(self):
+        parts = self.parts()
+        h = list(world._RECORD_HEADER.unpack_from(parts[2]))
+        h[7] = 2
+        parts[2] = world._RECORD_HEADER.pack(*h) + parts[2][world._RECORD_HEADER.size:]
+        loaded = world.ScannedRegionFile("r.1.-2.mca")
+        loaded.load_record(world.merge_records(parts))
+        self.assertIsNone(loaded.identity)
+        self.assertIsNone(loaded.header)
+
+
+class DumpChunksTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "r.0.-1.mca")
+        open(self.path, "wb").close()
+        region_file = region.RegionFile(self.path)
+        region_file.write_chunk(3, 28, nbt.NBTFile(buffer=BytesIO(_level_chunk(5))))
+        region_file.close()
+        self.scanned = world.ScannedRegionFile(self.path)
+        self.scanned[(3, 28)] = (5, c.CHUNK_TOO_MANY_ENTITIES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def dump(self, dump_format):
+        opened = []
+
+        def open_region_file(*args, **kwargs):
+            opened.append(region_file_class(*args, **kwargs))
+            return opened[-1]
+
+        region_file_class = region.RegionFile
+        with mock.patch.object(world.region, "RegionFile", open_region_file):
+            counter = self.scanned.dump_problematic_chunks(c.CHUNK_TOO_MANY_ENTITIES,
+                                                           self.directory, dump_format)
+        self.assertEqual(counter, 1)
+        # Opened only for reading, and closed
+        self.assertEqual([r.readonly for r in opened], [True])
+        self.assertTrue(opened[0].file.closed)
+        name = "r.0.-1.mca.chunk.3.28" + c.DUMP_EXTENSIONS[dump_format]
+        with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_dump_too_large(self):
+        # Not decompressed beyond the limit, and skipped
+        self.scanned[(3, 28)] = (5, c.CHUNK_TOO_LARGE)
+        counter = self.scanned.dump_problematic_chunks(c.CHUNK_TOO_LARGE, self.directory,
+                                                       c.DUMP_SNBT, chunk_size_limit=64)
+        self.assertEqual(counter, 0)
+        self.assertEqual(os.listdir(self.directory), ["r.0.-1.mca"])
+
+    def test_dump_json(self):
+        lines = self.dump(c.DUMP_JSON).splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{"id": "minecraft:item"}] * 5)
+
+    def test_dump_snbt(self):
+        text = self.dump(c.DUMP_SNBT)
+        self.assertEqual(text.count('id: "minecraft:item"'), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()